@@ -0,0 +1,53 @@
+"""outbox events
+
+Revision ID: 0a7e3c5d9b21
+Revises: f2b6c8d4a913
+Create Date: 2026-10-20 09:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0a7e3c5d9b21'
+down_revision: Union[str, None] = 'f2b6c8d4a913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+outbox_status = sa.Enum("PENDING", "DONE", "FAILED", name="outboxstatus")
+
+
+def upgrade() -> None:
+    # Databases the app started on already have it from Base.metadata.create_all
+    if sa.inspect(op.get_bind()).has_table("outbox_events"):
+        return
+    op.create_table(
+        "outbox_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("event_type", sa.String(length=100), nullable=False),
+        sa.Column("aggregate_id", sa.Integer(), nullable=False),
+        sa.Column("payload", postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        sa.Column("status", outbox_status, nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_outbox_events_id"), "outbox_events", ["id"], unique=False)
+    op.create_index(
+        "ix_outbox_events_pending", "outbox_events", ["available_at", "id"],
+        postgresql_where=sa.text("status = 'PENDING'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_events_pending", table_name="outbox_events")
+    op.drop_index(op.f("ix_outbox_events_id"), table_name="outbox_events")
+    op.drop_table("outbox_events")
+    outbox_status.drop(op.get_bind(), checkfirst=True)
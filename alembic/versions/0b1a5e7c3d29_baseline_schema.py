@@ -0,0 +1,258 @@
+"""baseline schema
+
+Revision ID: 0b1a5e7c3d29
+Revises:
+Create Date: 2026-10-19 08:00:00.000000
+
+The tables as they were before the first migration, when the app only
+relied on Base.metadata.create_all. Each table is skipped if it already
+exists, so databases created by the app upgrade through here unchanged.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0b1a5e7c3d29'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+order_status = sa.Enum("PENDING", "PAID", "CANCELLED", "EXPIRED", "REFUNDED", name="orderstatus")
+order_item_type = sa.Enum("PRICING_PLAN", "TEMPLATE", name="orderitemtype")
+payment_gateway = sa.Enum("MIDTRANS", "XENDIT", name="paymentgateway")
+payment_status = sa.Enum("PENDING", "SUCCESS", "FAILED", "CANCELLED", name="paymentstatus")
+
+
+def upgrade() -> None:
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    # ---------- Dev 1: auth_user ----------
+    if "users" not in existing:
+        op.create_table(
+            "users",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(length=100), nullable=False),
+            sa.Column("email", sa.String(length=100), nullable=False),
+            sa.Column("password", sa.String(length=255), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(op.f("ix_users_id"), "users", ["id"], unique=False)
+        op.create_index(op.f("ix_users_email"), "users", ["email"], unique=True)
+
+    # ---------- Dev 2: transactions ----------
+    if "pricing_plans" not in existing:
+        op.create_table(
+            "pricing_plans",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(length=100), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("price", sa.Numeric(precision=12, scale=2), nullable=False),
+            sa.Column("duration_months", sa.Integer(), nullable=False),
+            sa.Column("features", postgresql.JSON(astext_type=sa.Text()), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("name"),
+        )
+        op.create_index(op.f("ix_pricing_plans_id"), "pricing_plans", ["id"], unique=False)
+
+    if "templates" not in existing:
+        op.create_table(
+            "templates",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(length=100), nullable=False),
+            sa.Column("category", sa.String(length=50), nullable=True),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("preview_image", sa.String(length=500), nullable=True),
+            sa.Column("price_adjustment", sa.Numeric(precision=12, scale=2), nullable=False),
+            sa.Column("is_active", sa.Boolean(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("name"),
+        )
+        op.create_index(op.f("ix_templates_id"), "templates", ["id"], unique=False)
+
+    if "subscription_plans" not in existing:
+        op.create_table(
+            "subscription_plans",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("pricing_plan_id", sa.Integer(), nullable=False),
+            sa.Column("template_id", sa.Integer(), nullable=True),
+            sa.Column("custom_price", sa.Numeric(precision=12, scale=2), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(["pricing_plan_id"], ["pricing_plans.id"]),
+            sa.ForeignKeyConstraint(["template_id"], ["templates.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(op.f("ix_subscription_plans_id"), "subscription_plans", ["id"], unique=False)
+
+    if "orders" not in existing:
+        op.create_table(
+            "orders",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("subscription_plan_id", sa.Integer(), nullable=False),
+            sa.Column("status", order_status, nullable=False),
+            sa.Column("total_price", sa.Numeric(precision=12, scale=2), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("paid_at", sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(["subscription_plan_id"], ["subscription_plans.id"]),
+            sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(op.f("ix_orders_id"), "orders", ["id"], unique=False)
+        op.create_index(op.f("ix_orders_user_id"), "orders", ["user_id"], unique=False)
+        op.create_index(op.f("ix_orders_status"), "orders", ["status"], unique=False)
+        op.create_index(op.f("ix_orders_created_at"), "orders", ["created_at"], unique=False)
+
+    if "order_items" not in existing:
+        op.create_table(
+            "order_items",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("order_id", sa.Integer(), nullable=False),
+            sa.Column("item_type", order_item_type, nullable=False),
+            sa.Column("item_id", sa.Integer(), nullable=False),
+            sa.Column("item_name", sa.String(length=200), nullable=False),
+            sa.Column("price", sa.Numeric(precision=12, scale=2), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(["order_id"], ["orders.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(op.f("ix_order_items_id"), "order_items", ["id"], unique=False)
+
+    if "payments" not in existing:
+        # raw_response moves to payment_events in e5a8c3d92b47
+        op.create_table(
+            "payments",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("order_id", sa.Integer(), nullable=False),
+            sa.Column("payment_gateway", payment_gateway, nullable=False),
+            sa.Column("transaction_id", sa.String(length=100), nullable=True),
+            sa.Column("amount", sa.Numeric(precision=12, scale=2), nullable=False),
+            sa.Column("status", payment_status, nullable=False),
+            sa.Column("payment_url", sa.String(length=500), nullable=True),
+            sa.Column("payment_method", sa.String(length=50), nullable=True),
+            sa.Column("raw_response", postgresql.JSON(astext_type=sa.Text()), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("paid_at", sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(["order_id"], ["orders.id"]),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("transaction_id"),
+        )
+        op.create_index(op.f("ix_payments_id"), "payments", ["id"], unique=False)
+        op.create_index(op.f("ix_payments_order_id"), "payments", ["order_id"], unique=False)
+        op.create_index(op.f("ix_payments_status"), "payments", ["status"], unique=False)
+
+    if "invoices" not in existing:
+        # Render state columns come in c6a2f08d1e73
+        op.create_table(
+            "invoices",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("order_id", sa.Integer(), nullable=False),
+            sa.Column("invoice_number", sa.String(length=50), nullable=False),
+            sa.Column("pdf_url", sa.String(length=500), nullable=True),
+            sa.Column("sent_via_email", sa.Boolean(), nullable=False),
+            sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(["order_id"], ["orders.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(op.f("ix_invoices_id"), "invoices", ["id"], unique=False)
+        op.create_index(op.f("ix_invoices_order_id"), "invoices", ["order_id"], unique=True)
+        op.create_index(op.f("ix_invoices_invoice_number"), "invoices", ["invoice_number"], unique=True)
+
+    # ---------- CMS ----------
+    if "cms_pages" not in existing:
+        op.create_table(
+            "cms_pages",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("title", sa.String(length=150), nullable=False),
+            sa.Column("slug", sa.String(length=150), nullable=False),
+            sa.Column("content", sa.Text(), nullable=False),
+            sa.Column("is_published", sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(op.f("ix_cms_pages_id"), "cms_pages", ["id"], unique=False)
+        op.create_index(op.f("ix_cms_pages_slug"), "cms_pages", ["slug"], unique=True)
+
+    # ---------- Dev 3: service_delivery ----------
+    if "website_instances" not in existing:
+        op.create_table(
+            "website_instances",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("order_id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=False),
+            sa.Column("subdomain", sa.String(), nullable=True),
+            sa.Column("custom_domain", sa.String(), nullable=True),
+            sa.Column("server_ip", sa.String(), nullable=True),
+            sa.Column("stage", sa.String(), nullable=True),
+            sa.Column("repo_url", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(op.f("ix_website_instances_id"), "website_instances", ["id"], unique=False)
+        op.create_index(op.f("ix_website_instances_order_id"), "website_instances", ["order_id"], unique=False)
+        op.create_index(op.f("ix_website_instances_user_id"), "website_instances", ["user_id"], unique=False)
+        op.create_index(op.f("ix_website_instances_subdomain"), "website_instances", ["subdomain"], unique=True)
+
+    if "project_milestones" not in existing:
+        op.create_table(
+            "project_milestones",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("website_instance_id", sa.Integer(), nullable=True),
+            sa.Column("task_name", sa.String(), nullable=False),
+            sa.Column("is_completed", sa.Boolean(), nullable=True),
+            sa.Column("completed_at", sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(["website_instance_id"], ["website_instances.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(op.f("ix_project_milestones_id"), "project_milestones", ["id"], unique=False)
+
+    if "tickets" not in existing:
+        op.create_table(
+            "tickets",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("user_id", sa.Integer(), nullable=True),
+            sa.Column("subject", sa.String(), nullable=False),
+            sa.Column("priority", sa.String(), nullable=True),
+            sa.Column("status", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(op.f("ix_tickets_id"), "tickets", ["id"], unique=False)
+        op.create_index(op.f("ix_tickets_user_id"), "tickets", ["user_id"], unique=False)
+
+    if "ticket_messages" not in existing:
+        op.create_table(
+            "ticket_messages",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("ticket_id", sa.Integer(), nullable=True),
+            sa.Column("sender_id", sa.Integer(), nullable=True),
+            sa.Column("message", sa.Text(), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(["ticket_id"], ["tickets.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index(op.f("ix_ticket_messages_id"), "ticket_messages", ["id"], unique=False)
+
+
+def downgrade() -> None:
+    for table in (
+        "ticket_messages", "tickets", "project_milestones", "website_instances", "cms_pages",
+        "invoices", "payments", "order_items", "orders", "subscription_plans", "templates",
+        "pricing_plans", "users",
+    ):
+        op.drop_table(table)
+    for enum in (payment_status, payment_gateway, order_item_type, order_status):
+        enum.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,56 @@
+"""webhook inbox
+
+Revision ID: 1c9d4f6e2a87
+Revises: 0a7e3c5d9b21
+Create Date: 2026-10-20 09:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1c9d4f6e2a87'
+down_revision: Union[str, None] = '0a7e3c5d9b21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+inbox_status = sa.Enum("PENDING", "DONE", "DEAD", name="inboxstatus")
+
+
+def upgrade() -> None:
+    # Databases the app started on already have it from Base.metadata.create_all
+    if sa.inspect(op.get_bind()).has_table("webhook_inbox"):
+        return
+    op.create_table(
+        "webhook_inbox",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column(
+            "gateway", postgresql.ENUM(name="paymentgateway", create_type=False), nullable=False
+        ),
+        sa.Column("transaction_id", sa.String(length=100), nullable=False),
+        sa.Column("transaction_status", sa.String(length=50), nullable=True),
+        sa.Column("payload", postgresql.JSON(astext_type=sa.Text()), nullable=False),
+        sa.Column("status", inbox_status, nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("received_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("processed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_webhook_inbox_pending", "webhook_inbox", ["available_at", "id"],
+        postgresql_where=sa.text("status = 'PENDING'")
+    )
+    op.create_index("ix_webhook_inbox_transaction_id", "webhook_inbox", ["transaction_id", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_webhook_inbox_transaction_id", table_name="webhook_inbox")
+    op.drop_index("ix_webhook_inbox_pending", table_name="webhook_inbox")
+    op.drop_table("webhook_inbox")
+    inbox_status.drop(op.get_bind(), checkfirst=True)
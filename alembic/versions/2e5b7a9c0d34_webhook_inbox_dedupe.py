@@ -0,0 +1,50 @@
+"""webhook inbox dedupe key
+
+Revision ID: 2e5b7a9c0d34
+Revises: 1c9d4f6e2a87
+Create Date: 2026-10-20 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2e5b7a9c0d34'
+down_revision: Union[str, None] = '1c9d4f6e2a87'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    if "status_code" not in {column["name"] for column in inspector.get_columns("webhook_inbox")}:
+        op.add_column("webhook_inbox", sa.Column("status_code", sa.String(length=10), nullable=True))
+        op.execute("UPDATE webhook_inbox SET status_code = payload ->> 'status_code'")
+
+    if "uq_webhook_inbox_notification" in {
+        constraint["name"] for constraint in inspector.get_unique_constraints("webhook_inbox")
+    }:
+        return
+    # Redeliveries stored before the key existed: keep the first row of each notification
+    op.execute("""
+        DELETE FROM webhook_inbox w
+        USING webhook_inbox keep
+        WHERE w.transaction_id = keep.transaction_id
+          AND w.transaction_status IS NOT DISTINCT FROM keep.transaction_status
+          AND w.status_code IS NOT DISTINCT FROM keep.status_code
+          AND w.id > keep.id
+    """)
+    op.create_unique_constraint(
+        "uq_webhook_inbox_notification",
+        "webhook_inbox",
+        ["transaction_id", "transaction_status", "status_code"],
+        postgresql_nulls_not_distinct=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_webhook_inbox_notification", "webhook_inbox", type_="unique")
+    op.drop_column("webhook_inbox", "status_code")
@@ -0,0 +1,57 @@
+"""unique subscription plan combination
+
+Revision ID: 3f1c9a2b7d10
+Revises: 0b1a5e7c3d29
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1c9a2b7d10'
+down_revision: Union[str, None] = '0b1a5e7c3d29'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Re-point orders from duplicate subscription plans to the oldest row of each combination
+    op.execute("""
+        WITH ranked AS (
+            SELECT id,
+                   MIN(id) OVER (PARTITION BY pricing_plan_id, template_id) AS keep_id
+            FROM subscription_plans
+        )
+        UPDATE orders o
+        SET subscription_plan_id = ranked.keep_id
+        FROM ranked
+        WHERE o.subscription_plan_id = ranked.id
+          AND ranked.id <> ranked.keep_id
+    """)
+    op.execute("""
+        DELETE FROM subscription_plans sp
+        USING subscription_plans keep
+        WHERE sp.pricing_plan_id = keep.pricing_plan_id
+          AND sp.template_id IS NOT DISTINCT FROM keep.template_id
+          AND sp.id > keep.id
+    """)
+    # Already there if the app's Base.metadata.create_all created the table
+    inspector = sa.inspect(op.get_bind())
+    if "uq_subscription_plans_plan_template" in {
+        constraint["name"] for constraint in inspector.get_unique_constraints("subscription_plans")
+    }:
+        return
+    op.create_unique_constraint(
+        "uq_subscription_plans_plan_template",
+        "subscription_plans",
+        ["pricing_plan_id", "template_id"],
+        postgresql_nulls_not_distinct=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint("uq_subscription_plans_plan_template", "subscription_plans", type_="unique")
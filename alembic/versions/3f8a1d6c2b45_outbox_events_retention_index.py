@@ -0,0 +1,33 @@
+"""outbox events retention index
+
+Revision ID: 3f8a1d6c2b45
+Revises: 2e5b7a9c0d34
+Create Date: 2026-10-20 09:40:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f8a1d6c2b45'
+down_revision: Union[str, None] = '2e5b7a9c0d34'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Already there if the app's Base.metadata.create_all created the table
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("outbox_events")}
+    if "ix_outbox_events_finished" in existing:
+        return
+    op.create_index(
+        "ix_outbox_events_finished", "outbox_events", ["created_at"],
+        postgresql_where=sa.text("status IN ('DONE', 'FAILED')")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_events_finished", table_name="outbox_events")
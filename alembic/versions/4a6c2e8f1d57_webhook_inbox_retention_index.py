@@ -0,0 +1,33 @@
+"""webhook inbox retention index
+
+Revision ID: 4a6c2e8f1d57
+Revises: 3f8a1d6c2b45
+Create Date: 2026-10-20 09:50:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a6c2e8f1d57'
+down_revision: Union[str, None] = '3f8a1d6c2b45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Already there if the app's Base.metadata.create_all created the table
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("webhook_inbox")}
+    if "ix_webhook_inbox_finished" in existing:
+        return
+    op.create_index(
+        "ix_webhook_inbox_finished", "webhook_inbox", ["received_at"],
+        postgresql_where=sa.text("status IN ('DONE', 'DEAD')")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_webhook_inbox_finished", table_name="webhook_inbox")
@@ -0,0 +1,34 @@
+"""partial index for pending order expiry sweeper
+
+Revision ID: 8b4e2d61c5a3
+Revises: 3f1c9a2b7d10
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4e2d61c5a3'
+down_revision: Union[str, None] = '3f1c9a2b7d10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Already there if the app's Base.metadata.create_all created the table
+    if "ix_orders_pending_created_at" in {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("orders")}:
+        return
+    op.create_index(
+        "ix_orders_pending_created_at",
+        "orders",
+        ["created_at"],
+        postgresql_where=sa.text("status = 'PENDING'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_orders_pending_created_at", table_name="orders")
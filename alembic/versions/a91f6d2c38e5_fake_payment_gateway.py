@@ -0,0 +1,28 @@
+"""add FAKE to paymentgateway enum
+
+Revision ID: a91f6d2c38e5
+Revises: e5a8c3d92b47
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a91f6d2c38e5'
+down_revision: Union[str, None] = 'e5a8c3d92b47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # ALTER TYPE ... ADD VALUE can't run inside a transaction block on older Postgres
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE paymentgateway ADD VALUE IF NOT EXISTS 'FAKE'")
+
+
+def downgrade() -> None:
+    # Postgres can't drop an enum value; an unused 'FAKE' label is harmless
+    pass
@@ -0,0 +1,45 @@
+"""invoice_sequences table for per-day invoice numbers
+
+Revision ID: b3d7e1f94a20
+Revises: a91f6d2c38e5
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d7e1f94a20'
+down_revision: Union[str, None] = 'a91f6d2c38e5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The app's Base.metadata.create_all may have created the (empty) table already
+    if not sa.inspect(op.get_bind()).has_table("invoice_sequences"):
+        op.create_table(
+            "invoice_sequences",
+            sa.Column("day", sa.Date(), nullable=False),
+            sa.Column("last_value", sa.Integer(), nullable=False),
+            sa.PrimaryKeyConstraint("day"),
+        )
+    # Continue from the numbers already issued (INV/YYYYMMDD/XXXXX)
+    op.execute(
+        """
+        INSERT INTO invoice_sequences (day, last_value)
+        SELECT to_date(split_part(invoice_number, '/', 2), 'YYYYMMDD'),
+               max(split_part(invoice_number, '/', 3)::integer)
+        FROM invoices
+        WHERE invoice_number ~ '^INV/[0-9]{8}/[0-9]+$'
+        GROUP BY 1
+        ON CONFLICT (day) DO UPDATE SET last_value = GREATEST(invoice_sequences.last_value, EXCLUDED.last_value)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("invoice_sequences")
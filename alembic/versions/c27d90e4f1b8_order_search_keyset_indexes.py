@@ -0,0 +1,32 @@
+"""keyset indexes for admin order search
+
+Revision ID: c27d90e4f1b8
+Revises: 8b4e2d61c5a3
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c27d90e4f1b8'
+down_revision: Union[str, None] = '8b4e2d61c5a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Skipped if the app's Base.metadata.create_all created them with the table
+    existing = {index["name"] for index in sa.inspect(op.get_bind()).get_indexes("orders")}
+    if "ix_orders_created_at_id" not in existing:
+        op.create_index("ix_orders_created_at_id", "orders", ["created_at", "id"])
+    if "ix_orders_status_created_at_id" not in existing:
+        op.create_index("ix_orders_status_created_at_id", "orders", ["status", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_orders_status_created_at_id", table_name="orders")
+    op.drop_index("ix_orders_created_at_id", table_name="orders")
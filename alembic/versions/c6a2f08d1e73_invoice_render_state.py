@@ -0,0 +1,53 @@
+"""invoice render state for the background PDF renderer
+
+Revision ID: c6a2f08d1e73
+Revises: b3d7e1f94a20
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6a2f08d1e73'
+down_revision: Union[str, None] = 'b3d7e1f94a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+render_status = sa.Enum("PENDING", "DONE", "FAILED", name="invoicerenderstatus")
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # Skipped where the app's Base.metadata.create_all created the invoices table with these
+    if "render_status" not in {column["name"] for column in inspector.get_columns("invoices")}:
+        _add_render_columns()
+    if "ix_invoices_render_pending" not in {index["name"] for index in inspector.get_indexes("invoices")}:
+        op.create_index(
+            "ix_invoices_render_pending", "invoices", ["render_available_at", "id"],
+            postgresql_where=sa.text("render_status = 'PENDING'")
+        )
+
+
+def _add_render_columns() -> None:
+    render_status.create(op.get_bind(), checkfirst=True)
+    # Existing invoices were rendered inline; those without a PDF get queued
+    op.add_column("invoices", sa.Column("render_status", render_status, nullable=False, server_default="PENDING"))
+    op.add_column("invoices", sa.Column("render_attempts", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("invoices", sa.Column("render_available_at", sa.DateTime(timezone=True),
+                                        nullable=False, server_default=sa.func.now()))
+    op.add_column("invoices", sa.Column("render_error", sa.Text(), nullable=True))
+    op.add_column("invoices", sa.Column("rendered_at", sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE invoices SET render_status = 'DONE', rendered_at = created_at WHERE pdf_url IS NOT NULL")
+    for column in ("render_status", "render_attempts", "render_available_at"):
+        op.alter_column("invoices", column, server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_invoices_render_pending", table_name="invoices")
+    for column in ("rendered_at", "render_error", "render_available_at", "render_attempts", "render_status"):
+        op.drop_column("invoices", column)
+    render_status.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,57 @@
+"""invoice email queue
+
+Revision ID: d4b8e27a9c61
+Revises: c6a2f08d1e73
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4b8e27a9c61'
+down_revision: Union[str, None] = 'c6a2f08d1e73'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+email_status = sa.Enum("PENDING", "SENT", "FAILED", name="invoiceemailstatus")
+
+
+def upgrade() -> None:
+    # Already there if the app's Base.metadata.create_all created it
+    if sa.inspect(op.get_bind()).has_table("invoice_emails"):
+        return
+    op.create_table(
+        "invoice_emails",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("invoice_id", sa.Integer(), sa.ForeignKey("invoices.id"), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("recipient", sa.String(length=100), nullable=True),
+        sa.Column("status", email_status, nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("available_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("sent_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_invoice_emails_id"), "invoice_emails", ["id"], unique=False)
+    op.create_index(
+        "ix_invoice_emails_pending", "invoice_emails", ["available_at", "id"],
+        postgresql_where=sa.text("status = 'PENDING'")
+    )
+    op.create_index(
+        "uq_invoice_emails_invoice", "invoice_emails", ["invoice_id"], unique=True,
+        postgresql_where=sa.text("kind = 'invoice'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("uq_invoice_emails_invoice", table_name="invoice_emails")
+    op.drop_index("ix_invoice_emails_pending", table_name="invoice_emails")
+    op.drop_index(op.f("ix_invoice_emails_id"), table_name="invoice_emails")
+    op.drop_table("invoice_emails")
+    email_status.drop(op.get_bind(), checkfirst=True)
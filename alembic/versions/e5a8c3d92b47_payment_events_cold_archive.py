@@ -0,0 +1,73 @@
+"""payment_events table replaces payments.raw_response
+
+Revision ID: e5a8c3d92b47
+Revises: c27d90e4f1b8
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a8c3d92b47'
+down_revision: Union[str, None] = 'c27d90e4f1b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    # The app's Base.metadata.create_all may have created the (empty) table already
+    if not inspector.has_table("payment_events"):
+        _create_payment_events()
+    if "raw_response" in {column["name"] for column in inspector.get_columns("payments")}:
+        _move_raw_responses()
+
+
+def _create_payment_events() -> None:
+    op.create_table(
+        "payment_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("payment_id", sa.Integer(), nullable=False),
+        sa.Column("event_type", sa.String(length=50), nullable=False),
+        sa.Column("transaction_status", sa.String(length=50), nullable=True),
+        sa.Column("payload", postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_payment_events_payment_id", "payment_events", ["payment_id"])
+    op.create_index("ix_payment_events_created_at_id", "payment_events", ["created_at", "id"])
+    op.execute("ALTER TABLE payment_events SET (toast_tuple_target = 256)")
+
+
+def _move_raw_responses() -> None:
+    # Latest payload per payment is all raw_response ever kept
+    op.execute("""
+        INSERT INTO payment_events (payment_id, event_type, transaction_status, payload, created_at)
+        SELECT id, 'backfill', raw_response::jsonb ->> 'transaction_status', raw_response::jsonb,
+               COALESCE(updated_at, created_at, now())
+        FROM payments
+        WHERE raw_response IS NOT NULL
+        ORDER BY id
+    """)
+    op.drop_column("payments", "raw_response")
+
+
+def downgrade() -> None:
+    op.add_column("payments", sa.Column("raw_response", postgresql.JSON(astext_type=sa.Text()), nullable=True))
+    op.execute("""
+        UPDATE payments SET raw_response = latest.payload::json
+        FROM (
+            SELECT DISTINCT ON (payment_id) payment_id, payload
+            FROM payment_events
+            ORDER BY payment_id, id DESC
+        ) latest
+        WHERE latest.payment_id = payments.id
+    """)
+    op.drop_index("ix_payment_events_created_at_id", table_name="payment_events")
+    op.drop_index("ix_payment_events_payment_id", table_name="payment_events")
+    op.drop_table("payment_events")
@@ -0,0 +1,72 @@
+"""monthly customer statements
+
+Revision ID: e7c3a91f5b20
+Revises: d4b8e27a9c61
+Create Date: 2026-10-19 23:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7c3a91f5b20'
+down_revision: Union[str, None] = 'd4b8e27a9c61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+run_status = sa.Enum("RUNNING", "DONE", name="statementrunstatus")
+
+
+def upgrade() -> None:
+    # Skipped where the app's Base.metadata.create_all got there first
+    inspector = sa.inspect(op.get_bind())
+    if "ix_orders_paid_user_id_paid_at" not in {index["name"] for index in inspector.get_indexes("orders")}:
+        op.create_index(
+            "ix_orders_paid_user_id_paid_at", "orders", ["user_id", "paid_at"],
+            postgresql_where=sa.text("status = 'PAID'")
+        )
+    if inspector.has_table("statement_runs"):
+        return
+    op.create_table(
+        "statement_runs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("status", run_status, nullable=False),
+        sa.Column("last_user_id", sa.Integer(), nullable=False),
+        sa.Column("statements", sa.Integer(), nullable=False),
+        sa.Column("failed", sa.Integer(), nullable=False),
+        sa.Column("locked_until", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("period_start"),
+    )
+    op.create_index(op.f("ix_statement_runs_id"), "statement_runs", ["id"], unique=False)
+    op.create_table(
+        "customer_statements",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("period_start", sa.Date(), nullable=False),
+        sa.Column("run_id", sa.Integer(), sa.ForeignKey("statement_runs.id"), nullable=True),
+        sa.Column("order_count", sa.Integer(), nullable=False),
+        sa.Column("invoice_count", sa.Integer(), nullable=False),
+        sa.Column("total_amount", sa.Numeric(12, 2), nullable=False),
+        sa.Column("pdf_url", sa.String(length=500), nullable=True),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("user_id", "period_start", name="uq_customer_statements_user_period"),
+    )
+    op.create_index(op.f("ix_customer_statements_id"), "customer_statements", ["id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_customer_statements_id"), table_name="customer_statements")
+    op.drop_table("customer_statements")
+    op.drop_index(op.f("ix_statement_runs_id"), table_name="statement_runs")
+    op.drop_table("statement_runs")
+    run_status.drop(op.get_bind(), checkfirst=True)
+    op.drop_index("ix_orders_paid_user_id_paid_at", table_name="orders")
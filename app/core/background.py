@@ -0,0 +1,125 @@
+"""
+Background Workers
+In-app periodic jobs, started and stopped from the FastAPI lifespan, and
+the lease / retry helpers shared by the table-backed job queues
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Union
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+from sqlalchemy.sql.dml import Update
+
+
+# A job returns True when it stopped with work left over (e.g. a full batch),
+# so the task runs it again right away instead of sleeping for the interval.
+Job = Callable[[], Union[bool, None, Awaitable[Optional[bool]]]]
+
+
+class PeriodicTask:
+    """Runs a job every `interval` seconds; sync jobs run in the threadpool"""
+
+    def __init__(self, name: str, interval: float, job: Job):
+        self.name = name
+        self.interval = interval
+        self.job = job
+        self._task: Optional[asyncio.Task] = None
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _run_job(self) -> Any:
+        if asyncio.iscoroutinefunction(self.job):
+            return await self.job()
+        return await run_in_threadpool(self.job)
+
+    async def _run(self):
+        while True:
+            try:
+                has_more = await self._run_job()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[{self.name.upper()} ERROR] {str(e)}")
+                has_more = False
+
+            if has_more:
+                await asyncio.sleep(0)
+                continue
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name=self.name)
+
+    def wake(self):
+        """Run the job now instead of waiting for the interval (thread-safe)"""
+        if self._loop and self._wake:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+_tasks: List[PeriodicTask] = []
+
+
+def register(task: PeriodicTask) -> PeriodicTask:
+    """Register a task to be started with the app"""
+    _tasks.append(task)
+    return task
+
+
+async def start():
+    for task in _tasks:
+        task.start()
+        print(f"[BACKGROUND] Started {task.name} (every {task.interval}s)")
+
+
+async def stop():
+    for task in reversed(_tasks):
+        await task.stop()
+    _tasks.clear()
+
+
+# ---------- Job queues (outbox, webhook inbox, invoice render / email) ----------
+
+def claim_due(model: Any, id_column: Any, status_column: Any, pending: Any, available_column: Any,
+              attempts_column: Any, batch_size: int, lease_seconds: float,
+              where: Sequence[Any] = (), order_by: Sequence[Any] = ()) -> Update:
+    """UPDATE that leases up to batch_size due PENDING rows; add .returning(...) and execute
+
+    SKIP LOCKED lets every worker claim its own rows. A claim counts as an
+    attempt and pushes available_at past the lease, so a worker that dies
+    mid-job leaves the row to be claimed again once the lease runs out.
+    """
+    now = datetime.utcnow()
+    due_ids = select(id_column).where(
+        status_column == pending,
+        available_column <= now,
+        *where
+    ).order_by(*(order_by or (id_column,))).limit(batch_size).with_for_update(skip_locked=True)
+
+    return update(model).where(id_column.in_(due_ids)).values({
+        attempts_column: attempts_column + 1,
+        available_column: now + timedelta(seconds=lease_seconds)
+    }).execution_options(synchronize_session=False)
+
+
+def retry_at(attempts: int, max_attempts: int, base_seconds: float = 5) -> Optional[datetime]:
+    """When to run a failed job again (exponential backoff, capped at an hour), None once out of attempts"""
+    if attempts >= max_attempts:
+        return None
+    return datetime.utcnow() + timedelta(seconds=min(base_seconds * 2 ** attempts, 3600))
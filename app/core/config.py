@@ -18,11 +18,152 @@ class Settings(BaseSettings):
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
     # 3rd Party Integrations (Dev 2 & 3)
+    PAYMENT_GATEWAY: str = "midtrans"  # Gateway for new payments: midtrans | fake
     # Midtrans Payment Gateway (Dev 2)
     MIDTRANS_SERVER_KEY: str = ""
     MIDTRANS_CLIENT_KEY: str = ""
     MIDTRANS_PAYMENT_URL: str = "https://app.sandbox.midtrans.com/snap/v1/transactions"
+    MIDTRANS_STATUS_URL: str = "https://api.sandbox.midtrans.com/v2/{transaction_id}/status"
     MIDTRANS_PRODUCTION: bool = False
+    # Shared Midtrans client (one keep-alive pool per worker, see transactions/midtrans.py)
+    MIDTRANS_MAX_CONNECTIONS: int = 20
+    MIDTRANS_MAX_KEEPALIVE_CONNECTIONS: int = 20  # Same as max, so bursts (e.g. reconciliation) do not churn connections
+    MIDTRANS_KEEPALIVE_EXPIRY_SECONDS: float = 60.0
+    MIDTRANS_HTTP2: bool = False  # Needs httpx[http2]
+    MIDTRANS_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    MIDTRANS_READ_TIMEOUT_SECONDS: float = 30.0
+    MIDTRANS_WRITE_TIMEOUT_SECONDS: float = 10.0
+    MIDTRANS_POOL_TIMEOUT_SECONDS: float = 5.0
+    # Overall deadline per call (all phases, attempts and backoff), enforced by the outbound policy
+    MIDTRANS_SNAP_TIMEOUT_SECONDS: float = 15.0
+    MIDTRANS_STATUS_TIMEOUT_SECONDS: float = 5.0
+
+    # Local fake gateway (load testing only): registered, webhooks included, only with
+    # PAYMENT_GATEWAY=fake or FAKE_GATEWAY_ENABLED, and its notifications need FAKE_GATEWAY_SECRET
+    FAKE_GATEWAY_ENABLED: bool = False
+    FAKE_GATEWAY_URL: str = "http://localhost:9000"
+    FAKE_GATEWAY_NOTIFICATION_URL: str = "http://localhost:8000/api/v1/payments/webhooks/fake"
+    FAKE_GATEWAY_SECRET: str = ""  # No default: an empty secret rejects every notification
+
+    # Outbound call policy (app/core/resilience.py) for Midtrans / Cloudflare
+    OUTBOUND_MAX_RETRIES: int = 2  # Idempotent calls only, others only if the request was never sent
+    OUTBOUND_RETRY_BUDGET_RATIO: float = 0.2  # Retries add at most ~20% extra load
+    OUTBOUND_BREAKER_FAILURES: int = 5  # Consecutive failures before the circuit opens
+    OUTBOUND_BREAKER_RECOVERY_SECONDS: float = 30.0
+    CLOUDFLARE_TIMEOUT_SECONDS: float = 10.0
+
+    # Idempotency-Key (POST /orders, POST /payments/create)
+    IDEMPOTENCY_TTL_HOURS: int = 24  # How long a stored response is replayed
+    IDEMPOTENCY_LOCK_SECONDS: int = 60  # In-progress claim is taken over after this
+    IDEMPOTENCY_WAIT_TIMEOUT_SECONDS: float = 30.0  # Max wait for a concurrent duplicate
+    IDEMPOTENCY_CACHE_SIZE: int = 1024  # In-process hot cache entries
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: int = 3600
+
+    # Pending order expiry sweeper (runs on every worker, SKIP LOCKED batches)
+    ORDER_EXPIRY_SWEEPER_ENABLED: bool = True
+    ORDER_EXPIRY_SWEEP_INTERVAL_SECONDS: int = 300
+    ORDER_PENDING_TTL_MINUTES: int = 1440  # Since the order or its latest pending payment; Midtrans Snap default expiry (24h)
+    ORDER_EXPIRY_BATCH_SIZE: int = 500
+
+    # Monthly partitions for orders/payments (only used once migrated, see transactions/partitioning.py)
+    PARTITION_MONTHS_AHEAD: int = 3
+    PARTITION_MAINTENANCE_INTERVAL_SECONDS: int = 86400
+
+    # Raw gateway payloads (payment_events) older than the retention window move to gzip NDJSON files
+    PAYMENT_EVENTS_RETENTION_DAYS: int = 90
+    PAYMENT_EVENTS_ARCHIVE_DIR: str = "/archive/payment_events"
+    PAYMENT_EVENTS_ARCHIVE_BATCH_SIZE: int = 5000
+    PAYMENT_EVENTS_ARCHIVE_INTERVAL_SECONDS: int = 3600
+
+    # Postgres LISTEN/NOTIFY wake-ups for background workers
+    PG_LISTEN_ENABLED: bool = True
+
+    # Transactional outbox (order/payment lifecycle events)
+    OUTBOX_POLL_INTERVAL_SECONDS: int = 30  # Fallback poll, NOTIFY wakes the dispatcher earlier
+    OUTBOX_BATCH_SIZE: int = 50
+    OUTBOX_MAX_ATTEMPTS: int = 8
+    OUTBOX_LEASE_SECONDS: int = 300  # Claimed events become visible again after this
+    OUTBOX_RETENTION_DAYS: int = 7  # Delivered / failed events are deleted after this
+    OUTBOX_PURGE_INTERVAL_SECONDS: int = 3600
+
+    # Webhook inbox (notifications are queued by the endpoint, processed by workers)
+    WEBHOOK_INBOX_POLL_INTERVAL_SECONDS: int = 10  # Fallback poll, NOTIFY wakes the workers earlier
+    WEBHOOK_INBOX_BATCH_SIZE: int = 50
+    WEBHOOK_INBOX_CONCURRENCY: int = 8  # Notifications processed in parallel (one per transaction)
+    WEBHOOK_INBOX_MAX_ATTEMPTS: int = 10
+    WEBHOOK_INBOX_LEASE_SECONDS: int = 120
+    WEBHOOK_INBOX_RETENTION_DAYS: int = 14  # Processed / dead-lettered notifications are deleted after this
+    WEBHOOK_INBOX_PURGE_INTERVAL_SECONDS: int = 3600
+
+    # Payment reconciliation (pending payments whose webhook never arrived)
+    RECONCILE_INTERVAL_SECONDS: int = 900
+    RECONCILE_STALE_MINUTES: int = 30  # Only payments pending longer than this are checked
+    RECONCILE_BATCH_SIZE: int = 200
+    RECONCILE_CONCURRENCY: int = 10  # Parallel status API calls, keep <= MIDTRANS_MAX_KEEPALIVE_CONNECTIONS
+
+    # Invoice branding / locale (templates/invoice.html)
+    INVOICE_BRAND_NAME: str = "DIGADOIN"
+    INVOICE_BRAND_COLOR: str = "#2563eb"
+    INVOICE_SUPPORT_EMAIL: str = "support@digadoin.com"
+    INVOICE_LOCALE: str = "en"  # en | id (labels, month names, number format)
+    INVOICE_CURRENCY: str = "Rp"
+
+    # Invoice PDF rendering (process pool, filled in after the invoice record is created)
+    INVOICE_RENDER_MODE: str = "eager"  # eager: render when paid | lazy: render on first download
+    INVOICE_RENDER_WORKERS: int = 2  # Render processes per app worker (~1 CPU core each)
+    INVOICE_RENDER_QUEUE_SIZE: int = 8  # Max invoices handed to the pool at once, the rest wait in the table
+    INVOICE_RENDER_POLL_INTERVAL_SECONDS: int = 30  # Fallback poll, NOTIFY wakes the renderer earlier
+    INVOICE_RENDER_MAX_ATTEMPTS: int = 5
+    INVOICE_RENDER_LEASE_SECONDS: int = 300
+    # Content-addressed PDF storage: local (sharded INVOICE_CACHE_DIR) | s3 (S3-compatible, e.g. MinIO)
+    INVOICE_STORAGE_BACKEND: str = "local"
+    INVOICE_CACHE_DIR: str = "/invoices"  # Local backend root, render staging area for s3
+    INVOICE_CACHE_MAX_BYTES: int = 2 * 1024 ** 3  # Local backend: least recently used PDFs evicted past this
+    INVOICE_CACHE_EVICT_INTERVAL_SECONDS: int = 600
+    INVOICE_S3_ENDPOINT_URL: str = "http://localhost:9002"  # MinIO from docker-compose (--profile s3)
+    INVOICE_S3_PUBLIC_URL: str = ""  # Endpoint in signed URLs if clients reach it elsewhere (app on http://minio:9000)
+    INVOICE_S3_BUCKET: str = "invoices"
+    INVOICE_S3_PREFIX: str = "invoices/"
+    INVOICE_S3_REGION: str = "us-east-1"
+    INVOICE_S3_ACCESS_KEY: str = ""
+    INVOICE_S3_SECRET_KEY: str = ""
+    INVOICE_S3_TIMEOUT_SECONDS: float = 30.0
+    # Downloads
+    INVOICE_DOWNLOAD_URL_TTL_SECONDS: int = 300  # Signed download URLs (and S3 download redirects)
+    INVOICE_PUBLIC_BASE_URL: str = ""  # Prefix for local signed URLs, e.g. https://api.digadoin.com
+    INVOICE_SENDFILE_HEADER: str = ""  # X-Accel-Redirect (nginx) | X-Sendfile: the proxy sends local PDFs with sendfile
+    INVOICE_SENDFILE_PREFIX: str = "/protected-invoices/"  # nginx internal location aliased to INVOICE_CACHE_DIR
+    INVOICE_EXPORT_BATCH_SIZE: int = 50  # Invoices fetched (and missing PDFs rendered) ahead of the ZIP stream
+
+    # Monthly customer statements (one PDF per user with the month's paid orders and invoices)
+    STATEMENT_AUTO_RUN: bool = True  # Start the previous month's run automatically
+    STATEMENT_RUN_DAY: int = 1  # Day of the month from which that run is started
+    STATEMENT_POLL_INTERVAL_SECONDS: int = 3600  # Fallback poll, NOTIFY wakes the runner for manual runs
+    STATEMENT_BATCH_SIZE: int = 200  # Users per grouped query; their statements and the run cursor commit together
+    STATEMENT_RENDER_CONCURRENCY: int = 4  # Statements in the render pool at once, leaves room for invoices
+    STATEMENT_LEASE_SECONDS: int = 900  # A run whose worker died is picked up again after this
+
+    # SMTP (invoice emails); locally any sink works, e.g. python -m aiosmtpd -n -l localhost:1025
+    MAIL_SERVER: str = "localhost"
+    MAIL_PORT: int = 1025
+    MAIL_USERNAME: str = ""
+    MAIL_PASSWORD: str = ""
+    MAIL_FROM: str = "billing@digadoin.com"
+    MAIL_FROM_NAME: str = "DIGADOIN"
+    MAIL_STARTTLS: bool = False
+    MAIL_SSL_TLS: bool = False
+    MAIL_TIMEOUT_SECONDS: float = 30.0
+    MAIL_POOL_SIZE: int = 4  # Reused SMTP connections (= concurrent sends) per app worker
+    MAIL_MAX_MESSAGES_PER_CONNECTION: int = 100  # Reconnect after this many, servers cap messages per session
+    # Invoice email queue (batched, retried with backoff)
+    INVOICE_EMAIL_BATCH_SIZE: int = 50
+    INVOICE_EMAIL_POLL_INTERVAL_SECONDS: int = 30  # Fallback poll, NOTIFY wakes the mailer earlier
+    INVOICE_EMAIL_MAX_ATTEMPTS: int = 6
+    INVOICE_EMAIL_LEASE_SECONDS: int = 300
+
+    # Payment status SSE stream (pushed via LISTEN/NOTIFY instead of client polling)
+    PAYMENT_STREAM_HEARTBEAT_SECONDS: int = 15  # Keeps proxies from closing idle streams
+    PAYMENT_STREAM_MAX_SECONDS: int = 600  # Stream is closed after this, EventSource reconnects
     # CLOUDFLARE_API_TOKEN: str = ""  # Dev 3
 
     @property
@@ -0,0 +1,106 @@
+"""
+SMTP Connection Pool
+Keeps up to MAIL_POOL_SIZE SMTP sessions open per process and reuses
+them across messages, instead of a connect / EHLO / STARTTLS / AUTH
+handshake for every email. Used by the invoice email queue.
+"""
+import asyncio
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+import aiosmtplib
+
+from app.core.config import settings
+
+
+class _Connection:
+    def __init__(self, smtp: aiosmtplib.SMTP):
+        self.smtp = smtp
+        self.sent = 0
+
+
+class SmtpPool:
+    """At most `size` concurrent sends, each on a reused connection"""
+
+    def __init__(self, size: int, max_messages_per_connection: int):
+        self.size = size
+        self.max_messages_per_connection = max_messages_per_connection
+        self._idle: List[_Connection] = []
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._connections_opened = 0
+        self._messages_sent = 0
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created on first use, inside the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.size)
+        return self._semaphore
+
+    async def _connect(self) -> _Connection:
+        smtp = aiosmtplib.SMTP(
+            hostname=settings.MAIL_SERVER,
+            port=settings.MAIL_PORT,
+            use_tls=settings.MAIL_SSL_TLS,
+            start_tls=settings.MAIL_STARTTLS,
+            timeout=settings.MAIL_TIMEOUT_SECONDS
+        )
+        await smtp.connect()
+        if settings.MAIL_USERNAME:
+            await smtp.login(settings.MAIL_USERNAME, settings.MAIL_PASSWORD)
+        self._connections_opened += 1
+        return _Connection(smtp)
+
+    @staticmethod
+    async def _close(connection: _Connection):
+        try:
+            await connection.smtp.quit()
+        except (aiosmtplib.SMTPException, OSError):
+            connection.smtp.close()
+
+    async def _checkout(self) -> _Connection:
+        while self._idle:
+            connection = self._idle.pop()
+            if connection.smtp.is_connected and connection.sent < self.max_messages_per_connection:
+                return connection
+            # Used up (servers cap messages per session) or dropped
+            await self._close(connection)
+        return await self._connect()
+
+    async def send(self, message: EmailMessage):
+        """Send one message; raises aiosmtplib.SMTPException / OSError on failure"""
+        async with self.semaphore:
+            connection = await self._checkout()
+            try:
+                try:
+                    await connection.smtp.send_message(message)
+                except aiosmtplib.SMTPServerDisconnected:
+                    # Idle connection closed by the server since its last use: retry once on a new one
+                    connection.smtp.close()
+                    connection = await self._connect()
+                    await connection.smtp.send_message(message)
+            except (aiosmtplib.SMTPResponseException, aiosmtplib.SMTPRecipientsRefused):
+                # Message rejected; aiosmtplib has reset the envelope, the session stays usable
+                if connection.smtp.is_connected:
+                    self._idle.append(connection)
+                raise
+            except BaseException:
+                # Don't reuse a session in an unknown state
+                connection.smtp.close()
+                raise
+            connection.sent += 1
+            self._messages_sent += 1
+            self._idle.append(connection)
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for connection in idle:
+            await self._close(connection)
+
+    def get_metrics(self) -> Dict[str, int]:
+        return {
+            "pool_size": self.size,
+            "idle_connections": len(self._idle),
+            "connections_opened": self._connections_opened,
+            "messages_sent": self._messages_sent,
+        }
@@ -0,0 +1,125 @@
+"""
+Postgres LISTEN/NOTIFY
+NOTIFY helper for services and a per-process listener used to wake up
+background workers (outbox dispatcher, dll) across uvicorn workers
+"""
+import asyncio
+import select as select_module
+import threading
+from typing import Callable, Dict, List, Optional, Sequence
+
+import psycopg2
+from sqlalchemy import func, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+
+def notify(db: Session, channel: str, payload: str = "") -> None:
+    """Queue a NOTIFY on the current transaction (delivered on commit)"""
+    db.execute(select(func.pg_notify(channel, payload)))
+
+
+def notify_many(db: Session, channel: str, payloads: Sequence[str]) -> None:
+    """One NOTIFY per payload, queued with a single statement (delivered on commit)
+
+    Separate notifications rather than one combined payload: NOTIFY
+    payloads are limited to 8000 bytes.
+    """
+    if payloads:
+        db.execute(
+            text("SELECT pg_notify(:channel, payload) FROM unnest(CAST(:payloads AS text[])) AS payload"),
+            {"channel": channel, "payloads": list(payloads)}
+        )
+
+
+class PgListener:
+    """Dedicated LISTEN connection running in a thread; callbacks run on the event loop"""
+
+    RECONNECT_DELAY_SECONDS = 5.0
+
+    def __init__(self):
+        self._callbacks: Dict[str, List[Callable[[str], None]]] = {}
+        self._reconnect_callbacks: List[Callable[[], None]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def subscribe(self, channel: str, callback: Callable[[str], None]):
+        """Register callback(payload) for a channel; call before start()"""
+        self._callbacks.setdefault(channel, []).append(callback)
+
+    def on_reconnect(self, callback: Callable[[], None]):
+        """Register callback() for when LISTEN is back after a dropped connection
+
+        NOTIFYs sent while the connection was down are lost; the callback
+        re-reads whatever state it was relying on them for. Call before start().
+        """
+        self._reconnect_callbacks.append(callback)
+
+    def _dispatch(self, channel: str, payload: str):
+        for callback in self._callbacks.get(channel, []):
+            try:
+                callback(payload)
+            except Exception as e:
+                print(f"[PG-LISTEN ERROR] Callback for {channel} failed: {str(e)}")
+
+    def _reconnected(self):
+        print("[PG-LISTEN] Reconnected, notifications sent in between were missed")
+        for callback in self._reconnect_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[PG-LISTEN ERROR] Reconnect callback failed: {str(e)}")
+
+    def _listen(self, reconnected: bool):
+        conn = psycopg2.connect(settings.SQLALCHEMY_DATABASE_URI)
+        try:
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                for channel in self._callbacks:
+                    cursor.execute(f'LISTEN "{channel}"')
+            if reconnected:
+                self._loop.call_soon_threadsafe(self._reconnected)
+
+            while not self._stop.is_set():
+                if select_module.select([conn], [], [], 1.0) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notification = conn.notifies.pop(0)
+                    self._loop.call_soon_threadsafe(
+                        self._dispatch, notification.channel, notification.payload
+                    )
+        finally:
+            conn.close()
+
+    def _run(self):
+        reconnected = False
+        while not self._stop.is_set():
+            try:
+                self._listen(reconnected)
+            except Exception as e:
+                print(f"[PG-LISTEN ERROR] {str(e)}, reconnecting in {self.RECONNECT_DELAY_SECONDS}s")
+                self._stop.wait(self.RECONNECT_DELAY_SECONDS)
+            reconnected = True
+
+    def start(self):
+        if not self._callbacks or self._thread:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="pg-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._callbacks.clear()
+        self._reconnect_callbacks.clear()
+
+
+# Satu listener per proses
+listener = PgListener()
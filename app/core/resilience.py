@@ -0,0 +1,207 @@
+"""
+Outbound Call Policy
+Timeout, jittered retries, retry budget and circuit breaker for calls to
+third-party APIs (Midtrans, Cloudflare, dll). One policy per endpoint.
+"""
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the endpoint while its circuit is open"""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"{name} circuit is open, retry in {retry_in:.1f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+def is_transient(error: Exception) -> bool:
+    """Errors worth retrying / counting against the breaker (network, timeouts, 429, 5xx)"""
+    if isinstance(error, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return False
+
+
+def is_not_sent(error: Exception) -> bool:
+    """Errors where the request never reached the server (safe to retry any method)"""
+    return isinstance(error, (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+class CircuitBreaker:
+    """CLOSED -> OPEN after `failure_threshold` consecutive failures; OPEN fails fast for
+    `recovery_seconds`, then HALF_OPEN lets one trial call through"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, recovery_seconds: float,
+                 on_state_change: Optional[Callable[[str, str, str], None]] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._on_state_change = on_state_change
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            previous, self.state = self.state, state
+            if self._on_state_change:
+                self._on_state_change(self.name, previous, state)
+
+    def before_call(self):
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.recovery_seconds - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(self.name, remaining)
+            self._set_state(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._trial_in_flight:
+                raise CircuitOpenError(self.name, 0.0)
+            self._trial_in_flight = True
+
+    def record_success(self):
+        self._trial_in_flight = False
+        self.failures = 0
+        self._set_state(self.CLOSED)
+
+    def record_failure(self):
+        self._trial_in_flight = False
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+
+    def release(self):
+        """Call finished with a non-transient error: neither success nor failure"""
+        self._trial_in_flight = False
+
+
+class RetryBudget:
+    """Retries may add at most `ratio` extra load: every request deposits `ratio`
+    tokens, every retry spends one (capped at `max_tokens`)"""
+
+    def __init__(self, ratio: float, max_tokens: float):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = max_tokens
+
+    def deposit(self):
+        self.tokens = min(self.tokens + self.ratio, self.max_tokens)
+
+    def withdraw(self) -> bool:
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class OutboundPolicy:
+    """Wraps an async call with a deadline, retries (budgeted, full jitter) and a circuit breaker
+
+    `timeout` is the deadline for the whole call: every attempt and backoff
+    sleep has to fit in it, so retries never stretch a call past it.
+    """
+
+    def __init__(self, name: str, timeout: float, max_retries: int = 2, base_delay: float = 0.2,
+                 max_delay: float = 2.0, failure_threshold: int = 5, recovery_seconds: float = 30.0,
+                 retry_budget_ratio: float = 0.2, retry_budget_max: float = 10.0):
+        self.name = name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.breaker = CircuitBreaker(name, failure_threshold, recovery_seconds, self._on_state_change)
+        self.budget = RetryBudget(retry_budget_ratio, retry_budget_max)
+        self.metrics: Dict[str, Any] = {
+            "calls": 0, "successes": 0, "failures": 0, "retries": 0,
+            "timeouts": 0, "rejected": 0, "budget_exhausted": 0, "state_changes": [],
+        }
+
+    def _on_state_change(self, name: str, previous: str, state: str):
+        print(f"[CIRCUIT] {name}: {previous} -> {state}")
+        self.metrics["state_changes"] = (self.metrics["state_changes"] + [
+            {"from": previous, "to": state, "at": time.time()}
+        ])[-20:]
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    async def call(self, func: Callable[[], Awaitable[Any]], idempotent: bool = False) -> Any:
+        """Run func under the policy; non-idempotent calls are only retried if never sent"""
+        self.metrics["calls"] += 1
+        self.budget.deposit()
+        deadline = time.monotonic() + self.timeout
+        attempt = 0
+        while True:
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                self.metrics["rejected"] += 1
+                raise
+
+            returned = False
+            try:
+                result = await asyncio.wait_for(func(), timeout=deadline - time.monotonic())
+                returned = True
+            except Exception as e:
+                returned = True
+                if isinstance(e, asyncio.TimeoutError):
+                    self.metrics["timeouts"] += 1
+                if not is_transient(e):
+                    self.breaker.release()
+                    raise
+                self.breaker.record_failure()
+
+                retryable = idempotent or is_not_sent(e)
+                delay = self._backoff(attempt)
+                if not retryable or attempt >= self.max_retries or time.monotonic() + delay >= deadline:
+                    self.metrics["failures"] += 1
+                    raise
+                if not self.budget.withdraw():
+                    self.metrics["budget_exhausted"] += 1
+                    self.metrics["failures"] += 1
+                    raise
+                self.metrics["retries"] += 1
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            finally:
+                if not returned:
+                    # Cancelled (client gone, shutdown): says nothing about the endpoint, but a
+                    # half-open trial must give its slot back or the circuit never closes again
+                    self.breaker.release()
+
+            self.breaker.record_success()
+            self.metrics["successes"] += 1
+            return result
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "retry_tokens": round(self.budget.tokens, 2),
+        }
+
+
+_policies: Dict[str, OutboundPolicy] = {}
+
+
+def register(policy: OutboundPolicy) -> OutboundPolicy:
+    _policies[policy.name] = policy
+    return policy
+
+
+def get_metrics() -> List[Dict[str, Any]]:
+    return [{"name": name, **policy.get_metrics()} for name, policy in _policies.items()]
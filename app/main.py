@@ -1,23 +1,51 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.core.database import engine, Base
+from app.core import background
+from app.core.notify import listener
 
 # --- Import Router Modul (Uncomment saat modul sudah dibuat developer) ---
 from app.modules.auth_user import router as auth_router
 from app.modules.cms.router import router as cms_router
 from app.modules.transactions.router import router as transaction_router
 from app.modules.service_delivery import router as delivery_router
+from app.modules.transactions import workers as transaction_workers
+from app.modules.transactions.midtrans import midtrans_client
+from app.modules.transactions.gateways import close_gateways
+from app.modules.transactions.storage import close_storage
+from app.modules.transactions.rendering import renderer as invoice_renderer
+from app.modules.transactions.invoice_email import mailer as invoice_mailer
 
 # 1. Create Tables (Otomatis buat tabel jika belum ada saat restart)
 # Idealnya pakai Alembic untuk production, tapi ini membantu untuk MVP/Dev
 Base.metadata.create_all(bind=engine)
 
+
+# Background workers (sweeper, dll) jalan di setiap worker uvicorn selama app hidup
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await midtrans_client.start()
+    transaction_workers.register_background_tasks()
+    await background.start()
+    listener.start()
+    yield
+    listener.stop()
+    await background.stop()
+    await invoice_renderer.stop()
+    await invoice_mailer.stop()
+    await midtrans_client.aclose()
+    await close_gateways()
+    close_storage()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     openapi_url=f"{settings.API_V1_STR}/openapi.json",
     description="Backend API untuk WaaS Platform (Order, Invoice, Project Tracking)",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # 2. Setup CORS (PENTING untuk Frontend Next.js)
@@ -1,18 +1,36 @@
 import httpx
 from sqlalchemy.orm import Session
 from fastapi import HTTPException
+from app.core import resilience
+from app.core.config import settings
+from app.core.resilience import OutboundPolicy
 from . import models, schemas
 
+# Timeout, retry & circuit breaker untuk Cloudflare API (lihat app/core/resilience.py)
+cloudflare_policy = resilience.register(OutboundPolicy(
+    "cloudflare.dns",
+    timeout=settings.CLOUDFLARE_TIMEOUT_SECONDS,
+    max_retries=settings.OUTBOUND_MAX_RETRIES,
+    failure_threshold=settings.OUTBOUND_BREAKER_FAILURES,
+    recovery_seconds=settings.OUTBOUND_BREAKER_RECOVERY_SECONDS,
+    retry_budget_ratio=settings.OUTBOUND_RETRY_BUDGET_RATIO
+))
+
 # --- Logic 1: Cloudflare Integration (Simulasi) ---
 async def register_domain_on_cloudflare(subdomain: str, ip_address: str):
     """
     Simulasi hit ke Cloudflare API untuk add DNS Record.
     Nanti diganti dengan Real API Call menggunakan CLOUDFLARE_API_TOKEN dari config.
     """
-    print(f"[CLOUDFLARE] Adding A Record: {subdomain} -> {ip_address}")
-    # async with httpx.AsyncClient() as client:
-    #     response = await client.post("https://api.cloudflare.com/...", ...)
-    return True
+    async def add_record():
+        print(f"[CLOUDFLARE] Adding A Record: {subdomain} -> {ip_address}")
+        # async with httpx.AsyncClient() as client:
+        #     response = await client.post("https://api.cloudflare.com/...", ...)
+        #     response.raise_for_status()
+        return True
+
+    # Record yang sama ditolak Cloudflare (already exists), jadi aman di-retry
+    return await cloudflare_policy.call(add_record, idempotent=True)
 
 # --- Logic 2: Notifikasi (Simulasi) ---
 def send_notification(user_id: int, message: str, channel: str = "email"):
@@ -0,0 +1,101 @@
+"""
+Payment Event Archiver
+Dev 2: Transaction, Billing & Order Engine
+
+Moves payment_events older than PAYMENT_EVENTS_RETENTION_DAYS out of
+Postgres into gzip-compressed NDJSON files:
+
+    {PAYMENT_EVENTS_ARCHIVE_DIR}/YYYY/MM/payment_events_<first_id>_<last_id>.ndjson.gz
+
+A batch is deleted with SKIP LOCKED and only committed after its file is
+fsynced, so a crash can at worst archive the same ids twice (the file
+names make duplicates easy to spot), never lose them.
+"""
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.modules.transactions.models import PaymentEvent
+
+
+class PaymentEventArchiver:
+    """Batch-move old payment events to compressed files on local disk"""
+
+    @staticmethod
+    def _archive_path(first: Dict[str, Any]) -> Path:
+        created_at = first["created_at"]
+        directory = Path(settings.PAYMENT_EVENTS_ARCHIVE_DIR) / f"{created_at:%Y}" / f"{created_at:%m}"
+        directory.mkdir(parents=True, exist_ok=True)
+        return directory
+
+    @staticmethod
+    def _write_batch(rows: list) -> Path:
+        """Write rows as gzip NDJSON via a temp file + rename, returns the final path"""
+        directory = PaymentEventArchiver._archive_path(rows[0])
+        path = directory / f"payment_events_{rows[0]['id']}_{rows[-1]['id']}.ndjson.gz"
+        tmp_path = path.with_suffix(".tmp")
+
+        with open(tmp_path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb") as archive:
+                for row in rows:
+                    line = json.dumps({**row, "created_at": row["created_at"].isoformat()}, separators=(",", ":"))
+                    archive.write(line.encode() + b"\n")
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+        return path
+
+    @staticmethod
+    def archive_batch(db: Session, cutoff: datetime, batch_size: Optional[int] = None) -> int:
+        """Archive and delete one batch of events created before cutoff, returns rows moved"""
+        batch_size = batch_size or settings.PAYMENT_EVENTS_ARCHIVE_BATCH_SIZE
+        due_ids = select(PaymentEvent.id).where(
+            PaymentEvent.created_at < cutoff
+        ).order_by(PaymentEvent.id).limit(batch_size).with_for_update(skip_locked=True)
+
+        try:
+            rows = db.execute(
+                delete(PaymentEvent).where(PaymentEvent.id.in_(due_ids)).returning(
+                    PaymentEvent.id, PaymentEvent.payment_id, PaymentEvent.event_type,
+                    PaymentEvent.transaction_status, PaymentEvent.payload, PaymentEvent.created_at
+                ).execution_options(synchronize_session=False)
+            ).mappings().all()
+            if not rows:
+                db.rollback()
+                return 0
+
+            rows = sorted((dict(row) for row in rows), key=lambda row: row["id"])
+            path = PaymentEventArchiver._write_batch(rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        print(f"[PAYMENT-ARCHIVE] Archived {len(rows)} payment events to {path}")
+        return len(rows)
+
+    @staticmethod
+    def read_archive(path: Path) -> Iterator[Dict[str, Any]]:
+        """Iterate events back out of an archive file"""
+        with gzip.open(path, "rt") as archive:
+            for line in archive:
+                yield json.loads(line)
+
+
+def archive_payment_events() -> bool:
+    """Archive one batch of events past the retention window"""
+    cutoff = datetime.utcnow() - timedelta(days=settings.PAYMENT_EVENTS_RETENTION_DAYS)
+    db = SessionLocal()
+    try:
+        archived = PaymentEventArchiver.archive_batch(db, cutoff)
+    finally:
+        db.close()
+    return archived >= settings.PAYMENT_EVENTS_ARCHIVE_BATCH_SIZE
@@ -0,0 +1,72 @@
+"""
+Outbox Event Handlers for Transaction Module
+Dev 2: Transaction, Billing & Order Engine
+
+Imported at startup (see workers.register_background_tasks) so the handlers
+are registered before the dispatcher runs. Handlers may run more than once
+for the same event and must be idempotent.
+"""
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from app.modules.transactions.models import Order, OutboxEvent
+from app.modules.transactions.outbox import OutboxService, ORDER_PAID, PAYMENT_LATE_SETTLEMENT
+from app.modules.transactions.services import InvoiceService
+
+# [REVISION] Import Dev 3 Modules for Project Automation
+from app.modules.service_delivery import models as delivery_models
+from app.modules.service_delivery import services as delivery_services
+from app.modules.service_delivery import schemas as delivery_schemas
+
+
+@OutboxService.handler(ORDER_PAID)
+def generate_invoice(db: Session, event: OutboxEvent):
+    """Generate invoice for the paid order (no-op if it already exists)"""
+    InvoiceService.generate_invoice(db, event.aggregate_id)
+
+
+@OutboxService.handler(ORDER_PAID)
+def provision_project(db: Session, event: OutboxEvent):
+    """Automatically create the website project (Bridge to Dev 3)"""
+    existing = db.query(delivery_models.WebsiteInstance).filter(
+        delivery_models.WebsiteInstance.order_id == event.aggregate_id
+    ).first()
+    if existing:
+        return
+
+    db_order = db.query(Order).filter(Order.id == event.aggregate_id).first()
+    if not db_order:
+        return
+
+    # Generate unique subdomain suggestion
+    default_subdomain = f"project-{db_order.id}-{int(datetime.utcnow().timestamp())}"
+
+    project_data = delivery_schemas.WebsiteInstanceCreate(
+        order_id=db_order.id,
+        user_id=db_order.user_id,
+        subdomain=default_subdomain
+    )
+    delivery_services.create_website_instance(db, project_data)
+    print(f"[AUTO-PROJECT] Project created for Order #{db_order.id}")
+
+
+@OutboxService.handler(ORDER_PAID)
+def notify_customer(db: Session, event: OutboxEvent):
+    """Tell the customer the payment went through"""
+    delivery_services.send_notification(
+        event.payload["user_id"],
+        f"Pembayaran Order #{event.aggregate_id} berhasil, project website Anda sedang disiapkan."
+    )
+
+
+@OutboxService.handler(PAYMENT_LATE_SETTLEMENT)
+def notify_late_settlement(db: Session, event: OutboxEvent):
+    """Tell the customer a payment arrived for an order that will not be fulfilled"""
+    if event.payload.get("user_id") is None:
+        return
+    delivery_services.send_notification(
+        event.payload["user_id"],
+        f"Pembayaran Order #{event.payload['order_id']} diterima setelah order tidak aktif lagi. "
+        f"Tim kami akan memproses pengembalian dana Anda."
+    )
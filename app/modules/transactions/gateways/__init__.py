@@ -0,0 +1,46 @@
+"""
+Payment Gateways
+Dev 2: Transaction, Billing & Order Engine
+
+New payments use settings.PAYMENT_GATEWAY; webhooks, status checks and
+reconciliation use the gateway stored on each payment. The fake gateway
+is only registered when it is selected (PAYMENT_GATEWAY=fake) or
+FAKE_GATEWAY_ENABLED is set, so /payments/webhooks/fake is a 404 otherwise.
+"""
+from typing import Dict, List, Optional
+
+from app.core.config import settings
+from app.modules.transactions.gateways.base import ChargeResult, GatewayStatus, PaymentGatewayClient
+from app.modules.transactions.gateways.fake import FakeGateway
+from app.modules.transactions.gateways.midtrans import MidtransGateway
+from app.modules.transactions.models import PaymentGateway
+
+
+_gateways: Dict[PaymentGateway, PaymentGatewayClient] = {
+    PaymentGateway.MIDTRANS: MidtransGateway(),
+}
+if settings.PAYMENT_GATEWAY == PaymentGateway.FAKE.value or settings.FAKE_GATEWAY_ENABLED:
+    _gateways[PaymentGateway.FAKE] = FakeGateway()
+
+
+def get_gateway(gateway: Optional[PaymentGateway] = None) -> PaymentGatewayClient:
+    """Gateway implementation by enum, defaults to the configured PAYMENT_GATEWAY"""
+    gateway = gateway or PaymentGateway(settings.PAYMENT_GATEWAY)
+    if gateway not in _gateways:
+        raise ValueError(f"Payment gateway '{gateway.value}' is not supported")
+    return _gateways[gateway]
+
+
+def enabled_gateways() -> List[PaymentGateway]:
+    """Gateways registered in this process"""
+    return list(_gateways)
+
+
+async def close_gateways():
+    """Close gateway-owned HTTP clients (the Midtrans client is closed by the app lifespan)"""
+    for client in _gateways.values():
+        if isinstance(client, FakeGateway):
+            await client.aclose()
+
+
+__all__ = ["ChargeResult", "GatewayStatus", "PaymentGatewayClient", "get_gateway", "enabled_gateways", "close_gateways"]
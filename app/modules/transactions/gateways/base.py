@@ -0,0 +1,51 @@
+"""
+Payment Gateway Interface
+Dev 2: Transaction, Billing & Order Engine
+"""
+from abc import ABC, abstractmethod
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from pydantic import BaseModel
+
+from app.modules.transactions.models import OrderStatus, PaymentGateway, PaymentStatus
+
+
+class ChargeResult(BaseModel):
+    """Outcome of creating a charge / payment link at the gateway"""
+    transaction_id: str
+    payment_url: str
+    raw: Dict[str, Any]
+
+
+class GatewayStatus(BaseModel):
+    """A webhook or status-API answer normalized to our statuses"""
+    transaction_id: str
+    transaction_status: Optional[str] = None  # Gateway's own status string
+    status_code: Optional[str] = None
+    payment_status: Optional[PaymentStatus] = None  # Target status, None = nothing to apply
+    order_status: Optional[OrderStatus] = None
+    payment_method: Optional[str] = None
+    raw: Dict[str, Any]
+
+
+class PaymentGatewayClient(ABC):
+    """What PaymentService needs from a gateway"""
+
+    gateway: PaymentGateway
+
+    @abstractmethod
+    async def create_charge(self, order_id: int, amount: Decimal, user_id: int, finish_url: str) -> ChargeResult:
+        """Create a charge and return where to send the customer"""
+
+    @abstractmethod
+    def verify_notification(self, payload: Dict[str, Any]) -> bool:
+        """Check the webhook signature"""
+
+    @abstractmethod
+    def parse_notification(self, payload: Dict[str, Any]) -> Optional[GatewayStatus]:
+        """Normalize a webhook payload, None if it isn't a usable notification"""
+
+    @abstractmethod
+    async def get_status(self, transaction_id: str) -> Optional[GatewayStatus]:
+        """Query the gateway for a transaction, None when it is unknown there"""
@@ -0,0 +1,114 @@
+"""
+Fake Payment Gateway (client side)
+Dev 2: Transaction, Billing & Order Engine
+
+Talks to the local fake gateway server (gateways/fake_server.py) so the
+whole checkout -> webhook -> paid flow can be load-tested offline. Select
+it with PAYMENT_GATEWAY=fake and a FAKE_GATEWAY_SECRET shared with the server.
+"""
+import hashlib
+import hmac
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core import resilience
+from app.core.config import settings
+from app.core.resilience import OutboundPolicy
+from app.modules.transactions.gateways.base import ChargeResult, GatewayStatus, PaymentGatewayClient
+from app.modules.transactions.models import OrderStatus, PaymentGateway, PaymentStatus
+
+
+# transaction_status -> (payment target, order target)
+FAKE_STATUSES = {
+    "settlement": (PaymentStatus.SUCCESS, OrderStatus.PAID),
+    "failure": (PaymentStatus.FAILED, None),
+    "expire": (PaymentStatus.CANCELLED, OrderStatus.EXPIRED),
+}
+
+
+def sign(transaction_id: str, transaction_status: str, secret: str) -> str:
+    """Signature shared with the fake server: HMAC-SHA256(transaction_id + status)"""
+    return hmac.new(secret.encode(), f"{transaction_id}{transaction_status}".encode(), hashlib.sha256).hexdigest()
+
+
+charge_policy = resilience.register(OutboundPolicy(
+    "fake.charge",
+    timeout=settings.MIDTRANS_SNAP_TIMEOUT_SECONDS,
+    max_retries=settings.OUTBOUND_MAX_RETRIES,
+    failure_threshold=settings.OUTBOUND_BREAKER_FAILURES,
+    recovery_seconds=settings.OUTBOUND_BREAKER_RECOVERY_SECONDS,
+    retry_budget_ratio=settings.OUTBOUND_RETRY_BUDGET_RATIO
+))
+
+
+class FakeGateway(PaymentGatewayClient):
+    """Client for the local fake gateway"""
+
+    gateway = PaymentGateway.FAKE
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=settings.FAKE_GATEWAY_URL,
+                limits=httpx.Limits(
+                    max_connections=settings.MIDTRANS_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.MIDTRANS_MAX_KEEPALIVE_CONNECTIONS
+                )
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _send(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> httpx.Response:
+        response = await self.client.request(method, path, json=payload)
+        if response.status_code == 429 or response.status_code >= 500:
+            response.raise_for_status()
+        return response
+
+    async def create_charge(self, order_id: int, amount: Decimal, user_id: int, finish_url: str) -> ChargeResult:
+        payload = {
+            "order_ref": f"ORDER-{order_id}",
+            "amount": str(amount),
+            "notification_url": settings.FAKE_GATEWAY_NOTIFICATION_URL,
+        }
+        response = await charge_policy.call(lambda: self._send("POST", "/charges", payload))
+        response.raise_for_status()
+        result = response.json()
+        return ChargeResult(transaction_id=result["transaction_id"], payment_url=result["redirect_url"], raw=result)
+
+    def verify_notification(self, payload: Dict[str, Any]) -> bool:
+        if not settings.FAKE_GATEWAY_SECRET:
+            return False
+        expected = sign(str(payload.get("transaction_id", "")), str(payload.get("transaction_status", "")),
+                        settings.FAKE_GATEWAY_SECRET)
+        return hmac.compare_digest(expected, str(payload.get("signature", "")))
+
+    def parse_notification(self, payload: Dict[str, Any]) -> Optional[GatewayStatus]:
+        if not payload.get("transaction_id"):
+            return None
+        payment_status, order_status = FAKE_STATUSES.get(payload.get("transaction_status"), (None, None))
+        return GatewayStatus(
+            transaction_id=str(payload["transaction_id"]),
+            transaction_status=payload.get("transaction_status"),
+            status_code=str(payload.get("status_code", "200")),
+            payment_status=payment_status,
+            order_status=order_status,
+            payment_method=payload.get("payment_type"),
+            raw=payload
+        )
+
+    async def get_status(self, transaction_id: str) -> Optional[GatewayStatus]:
+        response = await self._send("GET", f"/charges/{transaction_id}")
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return self.parse_notification(response.json())
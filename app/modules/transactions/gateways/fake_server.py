@@ -0,0 +1,131 @@
+"""
+Fake Payment Gateway Server
+Dev 2: Transaction, Billing & Order Engine
+
+Standalone ASGI app standing in for Midtrans during load tests. Charges
+are kept in memory; after a delay each one settles (or expires / fails)
+and a signed notification is POSTed to the notification_url sent with
+the charge, like a real gateway webhook.
+
+    FAKE_GATEWAY_SECRET=... FAKE_GATEWAY_LATENCY_MS=80 FAKE_GATEWAY_ERROR_RATE=0.02 \\
+        uvicorn app.modules.transactions.gateways.fake_server:app --port 9000
+
+Configured from the environment only (no database / app settings needed):
+FAKE_GATEWAY_LATENCY_MS, FAKE_GATEWAY_ERROR_RATE (share of 503s),
+FAKE_GATEWAY_WEBHOOK_DELAY_MS, FAKE_GATEWAY_SETTLE_RATE (rest expire),
+FAKE_GATEWAY_SECRET (required, must match the app's FAKE_GATEWAY_SECRET).
+"""
+import asyncio
+import hashlib
+import hmac
+import os
+import random
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Set
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+
+LATENCY_MS = float(os.environ.get("FAKE_GATEWAY_LATENCY_MS", "50"))
+ERROR_RATE = float(os.environ.get("FAKE_GATEWAY_ERROR_RATE", "0"))
+WEBHOOK_DELAY_MS = float(os.environ.get("FAKE_GATEWAY_WEBHOOK_DELAY_MS", "500"))
+SETTLE_RATE = float(os.environ.get("FAKE_GATEWAY_SETTLE_RATE", "1.0"))
+SECRET = os.environ.get("FAKE_GATEWAY_SECRET", "")
+if not SECRET:
+    raise RuntimeError("FAKE_GATEWAY_SECRET must be set (and match the app's)")
+
+charges: Dict[str, Dict[str, Any]] = {}
+stats = {"charges": 0, "errors": 0, "webhooks_sent": 0, "webhooks_failed": 0}
+_pending: Set[asyncio.Task] = set()
+_client: httpx.AsyncClient = None
+
+
+class ChargeRequest(BaseModel):
+    order_ref: str
+    amount: str
+    notification_url: str
+
+
+def _sign(transaction_id: str, transaction_status: str) -> str:
+    # Same as gateways.fake.sign (kept here so the server has no app imports)
+    return hmac.new(SECRET.encode(), f"{transaction_id}{transaction_status}".encode(), hashlib.sha256).hexdigest()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _client
+    _client = httpx.AsyncClient(timeout=10.0)
+    yield
+    for task in list(_pending):
+        task.cancel()
+    await _client.aclose()
+
+
+app = FastAPI(title="Fake Payment Gateway", lifespan=lifespan)
+
+
+async def _latency():
+    if LATENCY_MS:
+        await asyncio.sleep(random.uniform(0.5, 1.5) * LATENCY_MS / 1000)
+
+
+async def _send_notification(transaction_id: str, notification_url: str):
+    await asyncio.sleep(WEBHOOK_DELAY_MS / 1000)
+    charge = charges[transaction_id]
+    charge["transaction_status"] = "settlement" if random.random() < SETTLE_RATE else "expire"
+    notification = {
+        **charge,
+        "signature": _sign(transaction_id, charge["transaction_status"]),
+    }
+    # Retry like a real gateway while the app is unavailable
+    for attempt in range(5):
+        try:
+            response = await _client.post(notification_url, json=notification)
+            if response.status_code < 500:
+                stats["webhooks_sent"] += 1
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.5 * 2 ** attempt)
+    stats["webhooks_failed"] += 1
+
+
+@app.post("/charges")
+async def create_charge(charge: ChargeRequest):
+    await _latency()
+    if random.random() < ERROR_RATE:
+        stats["errors"] += 1
+        raise HTTPException(status_code=503, detail="Injected gateway error")
+
+    transaction_id = uuid.uuid4().hex
+    charges[transaction_id] = {
+        "transaction_id": transaction_id,
+        "order_ref": charge.order_ref,
+        "gross_amount": charge.amount,
+        "transaction_status": "pending",
+        "status_code": "200",
+        "payment_type": "qris",
+    }
+    stats["charges"] += 1
+
+    task = asyncio.create_task(_send_notification(transaction_id, charge.notification_url))
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+    return {"transaction_id": transaction_id, "redirect_url": f"http://fake-gateway.local/pay/{transaction_id}"}
+
+
+@app.get("/charges/{transaction_id}")
+async def get_charge(transaction_id: str):
+    await _latency()
+    charge = charges.get(transaction_id)
+    if not charge:
+        raise HTTPException(status_code=404, detail="Unknown transaction")
+    return charge
+
+
+@app.get("/stats")
+def get_stats():
+    return {**stats, "in_flight_webhooks": len(_pending)}
@@ -0,0 +1,96 @@
+"""
+Midtrans Snap Gateway
+Dev 2: Transaction, Billing & Order Engine
+"""
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.modules.transactions.gateways.base import ChargeResult, GatewayStatus, PaymentGatewayClient
+from app.modules.transactions.midtrans import MidtransClient, midtrans_client
+from app.modules.transactions.models import OrderStatus, PaymentGateway, PaymentStatus
+
+
+class MidtransGateway(PaymentGatewayClient):
+    """Snap payment links, HTTP notifications and the v2 status API"""
+
+    gateway = PaymentGateway.MIDTRANS
+
+    async def create_charge(self, order_id: int, amount: Decimal, user_id: int, finish_url: str) -> ChargeResult:
+        # Our id for the transaction at Midtrans: notifications carry it and the status API accepts it
+        gateway_order_id = f"ORDER-{order_id}-{int(datetime.utcnow().timestamp())}"
+
+        # Prepare Midtrans payload
+        transaction_details = {
+            "order_id": gateway_order_id,
+            "gross_amount": int(amount)
+        }
+
+        customer_details = {
+            "user_id": user_id,
+            # Add more details when user system is integrated
+        }
+
+        payload = {
+            "transaction_details": transaction_details,
+            "customer_details": customer_details,
+            "enabled_payments": ["gopay", "bank_transfer", "qris", "credit_card"],
+            "callbacks": {
+                "finish": finish_url
+            }
+        }
+
+        result = await midtrans_client.post(settings.MIDTRANS_PAYMENT_URL, payload)
+        # The Snap token only identifies the payment page, the status API doesn't know it
+        return ChargeResult(
+            transaction_id=gateway_order_id,
+            payment_url=result.get("redirect_url", ""),
+            raw=result
+        )
+
+    def verify_notification(self, payload: Dict[str, Any]) -> bool:
+        return MidtransClient.verify_signature(payload)
+
+    @staticmethod
+    def _targets(payload: Dict[str, Any]) -> Tuple[Optional[PaymentStatus], Optional[OrderStatus]]:
+        """Map a Midtrans transaction_status to (payment target, order target)"""
+        transaction_status = payload.get("transaction_status")
+
+        if transaction_status == "capture":
+            if payload.get("fraud_status") == "accept":
+                return PaymentStatus.SUCCESS, OrderStatus.PAID
+            return None, None
+        if transaction_status == "settlement":
+            return PaymentStatus.SUCCESS, OrderStatus.PAID
+        if transaction_status in ("cancel", "deny"):
+            return PaymentStatus.CANCELLED, None
+        if transaction_status == "expire":
+            return PaymentStatus.CANCELLED, OrderStatus.EXPIRED
+        return None, None
+
+    def _to_status(self, transaction_id: str, payload: Dict[str, Any]) -> GatewayStatus:
+        payment_status, order_status = self._targets(payload)
+        status_code = payload.get("status_code")
+        return GatewayStatus(
+            transaction_id=transaction_id,
+            transaction_status=payload.get("transaction_status"),
+            status_code=str(status_code) if status_code is not None else None,
+            payment_status=payment_status,
+            order_status=order_status,
+            payment_method=payload.get("payment_type"),
+            raw=payload
+        )
+
+    def parse_notification(self, payload: Dict[str, Any]) -> Optional[GatewayStatus]:
+        # Matched on the order_id sent to Snap (stored as Payment.transaction_id)
+        if not payload.get("order_id"):
+            return None
+        return self._to_status(str(payload["order_id"]), payload)
+
+    async def get_status(self, transaction_id: str) -> Optional[GatewayStatus]:
+        """transaction_id is the order_id sent to Snap (/v2/{order_id}/status)"""
+        body = await midtrans_client.get_status(transaction_id)
+        if body is None:
+            return None
+        return self._to_status(transaction_id, body)
@@ -0,0 +1,238 @@
+"""
+Idempotency-Key Support for Transaction Module
+Dev 2: Transaction, Billing & Order Engine
+
+Stores the response of a keyed POST request so client retries replay it
+instead of creating duplicate orders / payment links.
+"""
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.modules.transactions.models import IdempotencyKey, IdempotencyStatus
+
+
+# (expires_at monotonic, request_hash, response_code, response_body)
+CachedResponse = Tuple[float, str, int, Any]
+# (status, expires_at, request_hash, response_code, response_body), read before commit
+StoredKey = Tuple[IdempotencyStatus, datetime, str, Optional[int], Any]
+
+
+class IdempotencyService:
+    """Keyed response store: DB table with TTL plus an in-process hot cache"""
+
+    _cache: "OrderedDict[str, CachedResponse]" = OrderedDict()
+    _inflight: Dict[str, asyncio.Future] = {}
+
+    POLL_INTERVAL_SECONDS = 0.2
+
+    # ---------- Hot cache ----------
+
+    @staticmethod
+    def _cache_get(cache_key: str) -> Optional[CachedResponse]:
+        entry = IdempotencyService._cache.get(cache_key)
+        if not entry:
+            return None
+        if entry[0] < time.monotonic():
+            IdempotencyService._cache.pop(cache_key, None)
+            return None
+        IdempotencyService._cache.move_to_end(cache_key)
+        return entry
+
+    @staticmethod
+    def _cache_put(cache_key: str, request_hash: str, response_code: int, response_body: Any, ttl_seconds: float):
+        IdempotencyService._cache[cache_key] = (
+            time.monotonic() + ttl_seconds, request_hash, response_code, response_body
+        )
+        IdempotencyService._cache.move_to_end(cache_key)
+        while len(IdempotencyService._cache) > settings.IDEMPOTENCY_CACHE_SIZE:
+            IdempotencyService._cache.popitem(last=False)
+
+    # ---------- DB store (sync, run in threadpool) ----------
+
+    @staticmethod
+    def _read(db: Session, scope: str, key: str) -> Optional[StoredKey]:
+        # Plain values, not the ORM object: commit would expire it and the next attribute
+        # access would run a refresh SELECT from the event loop
+        row = db.execute(
+            select(
+                IdempotencyKey.status, IdempotencyKey.expires_at, IdempotencyKey.request_hash,
+                IdempotencyKey.response_code, IdempotencyKey.response_body
+            ).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        ).first()
+        db.commit()
+        return tuple(row) if row else None
+
+    @staticmethod
+    def _claim(db: Session, scope: str, key: str, request_hash: str) -> Optional[StoredKey]:
+        """Claim the key; returns None when claimed, otherwise the existing record"""
+        now = datetime.utcnow()
+        stmt = pg_insert(IdempotencyKey).values(
+            scope=scope,
+            key=key,
+            request_hash=request_hash,
+            status=IdempotencyStatus.IN_PROGRESS,
+            created_at=now,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+        )
+        # Take over rows whose TTL (or in-progress lock) has run out
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_idempotency_keys_scope_key",
+            set_={
+                "request_hash": stmt.excluded.request_hash,
+                "status": stmt.excluded.status,
+                "response_code": None,
+                "response_body": None,
+                "created_at": stmt.excluded.created_at,
+                "expires_at": stmt.excluded.expires_at
+            },
+            where=IdempotencyKey.expires_at < now
+        ).returning(IdempotencyKey.id)
+
+        claimed = db.execute(stmt).scalar()
+        if claimed is not None:
+            db.commit()
+            return None
+        return IdempotencyService._read(db, scope, key)
+
+    @staticmethod
+    def _complete(db: Session, scope: str, key: str, response_code: int, response_body: Any):
+        record = db.execute(
+            select(IdempotencyKey).where(IdempotencyKey.scope == scope, IdempotencyKey.key == key)
+        ).scalar_one()
+        record.status = IdempotencyStatus.COMPLETED
+        record.response_code = response_code
+        record.response_body = response_body
+        record.expires_at = datetime.utcnow() + timedelta(hours=settings.IDEMPOTENCY_TTL_HOURS)
+        db.commit()
+
+    @staticmethod
+    def _release(db: Session, scope: str, key: str):
+        """Drop an in-progress claim so a retry re-executes the request"""
+        db.rollback()
+        db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.scope == scope,
+                IdempotencyKey.key == key,
+                IdempotencyKey.status == IdempotencyStatus.IN_PROGRESS
+            )
+        )
+        db.commit()
+
+    @staticmethod
+    def purge_expired(db: Session, batch_size: int = 1000) -> int:
+        """Delete one batch of expired keys, returns number of rows removed"""
+        expired_ids = select(IdempotencyKey.id).where(
+            IdempotencyKey.expires_at < datetime.utcnow()
+        ).limit(batch_size).with_for_update(skip_locked=True).scalar_subquery()
+        result = db.execute(delete(IdempotencyKey).where(IdempotencyKey.id.in_(expired_ids)))
+        db.commit()
+        return result.rowcount
+
+    # ---------- Request flow ----------
+
+    @staticmethod
+    def fingerprint(payload: Any) -> str:
+        """Stable SHA-256 of the request payload"""
+        encoded = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    @staticmethod
+    def _replay(request_hash: str, stored_hash: str, response_code: int, response_body: Any) -> JSONResponse:
+        if stored_hash != request_hash:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Idempotency-Key was already used with a different request payload"
+            )
+        return JSONResponse(
+            content=response_body,
+            status_code=response_code,
+            headers={"Idempotent-Replayed": "true"}
+        )
+
+    @staticmethod
+    async def execute(
+        db: Session,
+        scope: str,
+        key: str,
+        payload: Any,
+        handler: Callable[[], Awaitable[Any]],
+        status_code: int = status.HTTP_200_OK
+    ) -> JSONResponse:
+        """Run handler once per (scope, key); duplicates get the stored response"""
+        cache_key = f"{scope}:{key}"
+        request_hash = IdempotencyService.fingerprint(payload)
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS
+
+        while True:
+            cached = IdempotencyService._cache_get(cache_key)
+            if cached:
+                return IdempotencyService._replay(request_hash, cached[1], cached[2], cached[3])
+
+            # Concurrent duplicate in this process: wait for the in-flight request
+            inflight = IdempotencyService._inflight.get(cache_key)
+            if inflight:
+                remaining = deadline - time.monotonic()
+                try:
+                    await asyncio.wait_for(asyncio.shield(inflight), timeout=max(remaining, 0))
+                except asyncio.TimeoutError:
+                    break
+                continue
+
+            future = asyncio.get_running_loop().create_future()
+            IdempotencyService._inflight[cache_key] = future
+            try:
+                record = await run_in_threadpool(IdempotencyService._claim, db, scope, key, request_hash)
+
+                if record is None:
+                    try:
+                        body = jsonable_encoder(await handler())
+                    except BaseException:
+                        await run_in_threadpool(IdempotencyService._release, db, scope, key)
+                        raise
+                    await run_in_threadpool(IdempotencyService._complete, db, scope, key, status_code, body)
+                    IdempotencyService._cache_put(
+                        cache_key, request_hash, status_code, body,
+                        settings.IDEMPOTENCY_TTL_HOURS * 3600
+                    )
+                    return JSONResponse(content=body, status_code=status_code)
+
+                # Claimed by another worker: poll the store until it completes
+                while record and record[0] == IdempotencyStatus.IN_PROGRESS:
+                    if time.monotonic() >= deadline:
+                        break
+                    await asyncio.sleep(IdempotencyService.POLL_INTERVAL_SECONDS)
+                    record = await run_in_threadpool(IdempotencyService._read, db, scope, key)
+
+                if record and record[0] == IdempotencyStatus.COMPLETED:
+                    _, expires_at, stored_hash, response_code, response_body = record
+                    now = datetime.now(timezone.utc) if expires_at.tzinfo else datetime.utcnow()
+                    ttl = (expires_at - now).total_seconds()
+                    IdempotencyService._cache_put(cache_key, stored_hash, response_code, response_body, ttl)
+                    return IdempotencyService._replay(request_hash, stored_hash, response_code, response_body)
+            finally:
+                IdempotencyService._inflight.pop(cache_key, None)
+                if not future.done():
+                    future.set_result(None)
+
+            # Claim was released (original request failed) or still running past the deadline
+            if time.monotonic() >= deadline:
+                break
+
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still being processed"
+        )
@@ -0,0 +1,174 @@
+"""
+Webhook Inbox for Transaction Module
+Dev 2: Transaction, Billing & Order Engine
+
+The webhook endpoint only verifies and stores a notification, so the
+gateway gets its 200 in a few milliseconds; redeliveries of the same
+notification are dropped at insert time. Workers then apply the
+notifications through PaymentService.handle_webhook, at most one in
+flight per transaction and in arrival order, with retry/backoff and a
+dead-letter state.
+"""
+import asyncio
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, delete, exists, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session, aliased
+
+from app.core.background import claim_due, retry_at
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.notify import notify
+from app.modules.transactions.gateways import GatewayStatus
+from app.modules.transactions.models import InboxStatus, PaymentGateway, WebhookInbox
+from app.modules.transactions.services import PaymentService
+
+
+INBOX_CHANNEL = "webhook_inbox"
+
+
+class WebhookInboxService:
+    """Queue gateway notifications and process them in the background"""
+
+    @staticmethod
+    def receive(db: Session, gateway: PaymentGateway, notification: GatewayStatus) -> Optional[int]:
+        """Store a verified, parsed notification and wake the workers
+
+        Returns the inbox id, or None when the same (transaction_id,
+        transaction_status, status_code) was already received.
+        """
+        entry_id = db.scalar(
+            pg_insert(WebhookInbox).values(
+                gateway=gateway,
+                transaction_id=notification.transaction_id,
+                transaction_status=notification.transaction_status,
+                status_code=notification.status_code,
+                payload=notification.raw,
+                status=InboxStatus.PENDING,
+                attempts=0,
+                available_at=datetime.utcnow(),
+                received_at=datetime.utcnow()
+            ).on_conflict_do_nothing(constraint="uq_webhook_inbox_notification").returning(WebhookInbox.id)
+        )
+        if entry_id is not None:
+            notify(db, INBOX_CHANNEL)
+        db.commit()
+        return entry_id
+
+    @staticmethod
+    def _claim_batch(db: Session, batch_size: int) -> List[WebhookInbox]:
+        """Lease due notifications that are the oldest unfinished one of their transaction"""
+        earlier = aliased(WebhookInbox)
+        entries = db.scalars(
+            claim_due(
+                WebhookInbox, WebhookInbox.id, WebhookInbox.status, InboxStatus.PENDING,
+                WebhookInbox.available_at, WebhookInbox.attempts, batch_size, settings.WEBHOOK_INBOX_LEASE_SECONDS,
+                where=[~exists().where(and_(
+                    earlier.transaction_id == WebhookInbox.transaction_id,
+                    earlier.id < WebhookInbox.id,
+                    earlier.status == InboxStatus.PENDING
+                ))]
+            ).returning(WebhookInbox)
+        ).all()
+        # Keep the RETURNING values after commit (processed from other threads)
+        for entry in entries:
+            db.expunge(entry)
+        db.commit()
+        return sorted(entries, key=lambda entry: entry.id)
+
+    @staticmethod
+    def _process(entry: WebhookInbox) -> Optional[str]:
+        """Apply one notification; returns the error message on failure"""
+        db = SessionLocal()
+        try:
+            if not PaymentService.handle_webhook(db, entry.payload, entry.gateway):
+                return f"Unknown transaction {entry.transaction_id}"
+            return None
+        except Exception as e:
+            db.rollback()
+            return f"{type(e).__name__}: {str(e)}"
+        finally:
+            db.close()
+
+    @staticmethod
+    def _finish(entry: WebhookInbox, error: Optional[str]):
+        values: Dict[str, Any] = {"last_error": error}
+        next_attempt = retry_at(entry.attempts, settings.WEBHOOK_INBOX_MAX_ATTEMPTS)
+        if error is None:
+            values.update(status=InboxStatus.DONE, processed_at=datetime.utcnow())
+        elif next_attempt is None:
+            values.update(status=InboxStatus.DEAD)
+            print(f"[WEBHOOK-INBOX ERROR] #{entry.id} ({entry.transaction_id}) dead-lettered: {error}")
+        else:
+            values.update(available_at=next_attempt)
+            print(f"[WEBHOOK-INBOX] #{entry.id} ({entry.transaction_id}) attempt {entry.attempts} failed: {error}")
+
+        db = SessionLocal()
+        try:
+            db.execute(
+                update(WebhookInbox).where(WebhookInbox.id == entry.id).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _claim(batch_size: int) -> List[WebhookInbox]:
+        db = SessionLocal()
+        try:
+            return WebhookInboxService._claim_batch(db, batch_size)
+        finally:
+            db.close()
+
+    @staticmethod
+    async def dispatch_batch(batch_size: Optional[int] = None) -> int:
+        """Process one batch concurrently (one entry per transaction), returns entries claimed"""
+        batch_size = batch_size or settings.WEBHOOK_INBOX_BATCH_SIZE
+        entries = await run_in_threadpool(WebhookInboxService._claim, batch_size)
+        semaphore = asyncio.Semaphore(settings.WEBHOOK_INBOX_CONCURRENCY)
+
+        async def handle(entry: WebhookInbox):
+            async with semaphore:
+                error = await run_in_threadpool(WebhookInboxService._process, entry)
+                await run_in_threadpool(WebhookInboxService._finish, entry, error)
+
+        await asyncio.gather(*(handle(entry) for entry in entries))
+        return len(entries)
+
+    @staticmethod
+    def retry(db: Session, entry_id: int) -> bool:
+        """Move a dead-lettered notification back to the queue"""
+        result = db.execute(
+            update(WebhookInbox).where(
+                WebhookInbox.id == entry_id,
+                WebhookInbox.status == InboxStatus.DEAD
+            ).values(
+                status=InboxStatus.PENDING,
+                attempts=0,
+                available_at=datetime.utcnow()
+            ).execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            notify(db, INBOX_CHANNEL)
+        db.commit()
+        return result.rowcount > 0
+
+    @staticmethod
+    def purge_finished(db: Session, batch_size: int = 1000) -> int:
+        """Delete one batch of DONE / DEAD notifications older than WEBHOOK_INBOX_RETENTION_DAYS
+
+        A redelivery arriving after that is queued again; applying a status
+        the payment already has is a no-op. Returns number of rows removed.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=settings.WEBHOOK_INBOX_RETENTION_DAYS)
+        finished_ids = select(WebhookInbox.id).where(
+            WebhookInbox.status.in_([InboxStatus.DONE, InboxStatus.DEAD]),
+            WebhookInbox.received_at < cutoff
+        ).limit(batch_size).with_for_update(skip_locked=True).scalar_subquery()
+        result = db.execute(delete(WebhookInbox).where(WebhookInbox.id.in_(finished_ids)))
+        db.commit()
+        return result.rowcount
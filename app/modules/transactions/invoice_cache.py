@@ -0,0 +1,69 @@
+"""
+Invoice PDF Cache
+Dev 2: Transaction, Billing & Order Engine
+
+PDFs are stored under a hash of everything that goes into them (invoice
+number, order, items, template and brand/locale), so a file never needs
+invalidating: changed inputs get a new key. Where the files live is up to
+the storage backend (transactions/storage); the local one evicts the
+least recently used PDFs past INVOICE_CACHE_MAX_BYTES, and an evicted PDF
+is simply rendered again on its next download.
+"""
+import fcntl
+import hashlib
+import json
+from functools import lru_cache
+from typing import IO, Any, Iterable
+
+from app.core.config import settings
+from app.modules.transactions.invoice_template import TEMPLATE_DIR
+from app.modules.transactions.storage import get_storage
+
+
+@lru_cache(maxsize=1)
+def _template_fingerprint() -> str:
+    """Template + stylesheet + brand/locale settings (fixed per process)"""
+    digest = hashlib.sha256()
+    for name in ("invoice.html", "invoice.css"):
+        digest.update((TEMPLATE_DIR / name).read_bytes())
+    digest.update(json.dumps([
+        settings.INVOICE_BRAND_NAME, settings.INVOICE_BRAND_COLOR, settings.INVOICE_SUPPORT_EMAIL,
+        settings.INVOICE_LOCALE, settings.INVOICE_CURRENCY
+    ]).encode())
+    return digest.hexdigest()
+
+
+def cache_key(order: Any, items: Iterable[Any], invoice_number: str) -> str:
+    """Storage key: content hash of the invoice inputs"""
+    inputs = {
+        "template": _template_fingerprint(),
+        "invoice_number": invoice_number,
+        "order": [order.id, order.user_id, order.created_at.isoformat(), str(order.total_price)],
+        "items": [[item.item_name, str(item.price)] for item in items],
+    }
+    return f"{hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()}.pdf"
+
+
+def statement_key(html: str) -> str:
+    """Storage key for a monthly statement: hash of its HTML (data, template and brand are all in it)"""
+    return f"{hashlib.sha256(html.encode()).hexdigest()}.pdf"
+
+
+def acquire_render_lock(path: str) -> IO:
+    """Exclusive lock for rendering one staging file, across processes (blocks)"""
+    lock_file = open(f"{path}.lock", "w")
+    fcntl.flock(lock_file, fcntl.LOCK_EX)
+    return lock_file
+
+
+def release_render_lock(lock_file: IO):
+    fcntl.flock(lock_file, fcntl.LOCK_UN)
+    lock_file.close()
+
+
+def evict_invoice_cache() -> bool:
+    """Periodic job: keep local PDF files within INVOICE_CACHE_MAX_BYTES"""
+    removed, freed = get_storage().evict(settings.INVOICE_CACHE_MAX_BYTES)
+    if removed:
+        print(f"[INVOICE-CACHE] Evicted {removed} PDFs ({freed / 1024 / 1024:.1f} MiB)")
+    return False
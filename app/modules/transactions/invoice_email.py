@@ -0,0 +1,151 @@
+"""
+Invoice Email Delivery
+Dev 2: Transaction, Billing & Order Engine
+
+Invoice emails are queued in the invoice_emails table (automatically once
+the PDF is rendered, or by POST /invoices/{order_id}/resend) and sent here
+in batches: each batch is claimed with SKIP LOCKED, its PDFs are read from
+invoice storage (rendered first if needed) and the messages go out
+concurrently over a small pool of reused SMTP connections. Failures are
+retried with backoff up to INVOICE_EMAIL_MAX_ATTEMPTS.
+
+Locally, any SMTP sink works, e.g. `python -m aiosmtpd -n -l localhost:1025`.
+"""
+import asyncio
+import base64
+import time
+from collections import deque
+from email.message import EmailMessage, MIMEPart
+from email.utils import formataddr
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.mail import SmtpPool
+from app.modules.transactions.rendering import renderer
+from app.modules.transactions.services import InvoiceService
+from app.modules.transactions.storage import get_storage
+
+CHUNK_SIZE = 256 * 1024
+B64_LINE_BYTES = 57  # Raw bytes per 76-character base64 line
+
+
+def _message(job: Dict[str, Any], pdf_base64: str) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = f"{settings.INVOICE_BRAND_NAME} invoice {job['invoice_number']}"
+    message["From"] = formataddr((settings.MAIL_FROM_NAME, settings.MAIL_FROM))
+    message["To"] = formataddr((job["name"], job["recipient"]))
+    # Stable per queued email, so a retry after an ambiguous failure can be recognised as a duplicate
+    message["Message-ID"] = f"<invoice-email-{job['email_id']}@{settings.MAIL_FROM.split('@')[-1]}>"
+    message.set_content(
+        f"Hi {job['name']},\n\n"
+        f"Thank you for your payment. Invoice {job['invoice_number']} "
+        f"({settings.INVOICE_CURRENCY} {job['total_price']:,.2f}) is attached.\n\n"
+        f"Questions? Contact us at {settings.INVOICE_SUPPORT_EMAIL}.\n\n"
+        f"{settings.INVOICE_BRAND_NAME}\n"
+    )
+    # Already base64-encoded while streaming from storage, attached as is
+    attachment = MIMEPart()
+    attachment["Content-Type"] = "application/pdf"
+    attachment["Content-Transfer-Encoding"] = "base64"
+    attachment.add_header("Content-Disposition", "attachment",
+                          filename=f"{job['invoice_number'].replace('/', '-')}.pdf")
+    attachment.set_payload(pdf_base64)
+    message.make_mixed()
+    message.attach(attachment)
+    return message
+
+
+class InvoiceMailer:
+    """Sends claimed invoice emails over the SMTP pool"""
+
+    def __init__(self):
+        self.pool = SmtpPool(settings.MAIL_POOL_SIZE, settings.MAIL_MAX_MESSAGES_PER_CONNECTION)
+        self._send_ms: Deque[float] = deque(maxlen=1000)
+        self._sent = 0
+        self._failed = 0
+
+    @staticmethod
+    def _claim(limit: int) -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            return InvoiceService.claim_email_batch(db, limit)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _finish(results: List[Tuple[Dict[str, Any], Optional[str]]]):
+        db = SessionLocal()
+        try:
+            InvoiceService.finish_emails(db, results)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _read_pdf_base64(key: str) -> str:
+        # Encoded chunk by chunk as it streams from the backend (local file or S3 object), so
+        # only the base64 text is held. aiosmtplib sends the message from one flattened bytes
+        # object, so that text cannot be streamed further into the SMTP DATA.
+        reader = get_storage().open(key, CHUNK_SIZE)
+        lines: List[str] = []
+        pending = b""
+        try:
+            for chunk in reader:
+                pending += chunk
+                whole = len(pending) - len(pending) % B64_LINE_BYTES
+                lines.append(base64.encodebytes(pending[:whole]).decode("ascii"))
+                pending = pending[whole:]
+            lines.append(base64.encodebytes(pending).decode("ascii"))
+        finally:
+            reader.close()
+        return "".join(lines)
+
+    async def _send(self, job: Dict[str, Any]) -> Optional[str]:
+        """Send one email, returns the error message on failure"""
+        if job["recipient"] is None:
+            self._failed += 1
+            return "No recipient: the order's user no longer exists"
+        try:
+            pdf = await renderer.get_pdf(job["order_id"])
+            data = await run_in_threadpool(InvoiceMailer._read_pdf_base64, pdf["key"])
+            started = time.perf_counter()
+            await self.pool.send(_message(job, data))
+            self._send_ms.append((time.perf_counter() - started) * 1000)
+            self._sent += 1
+            return None
+        except Exception as e:
+            self._failed += 1
+            return f"{type(e).__name__}: {str(e)}"
+
+    async def send_batch(self) -> int:
+        """Claim and send one batch, returns number of emails claimed"""
+        jobs = await run_in_threadpool(InvoiceMailer._claim, settings.INVOICE_EMAIL_BATCH_SIZE)
+        if not jobs:
+            return 0
+        errors = await asyncio.gather(*(self._send(job) for job in jobs))
+        await run_in_threadpool(InvoiceMailer._finish, list(zip(jobs, errors)))
+        return len(jobs)
+
+    async def stop(self):
+        await self.pool.close()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        send_ms = sorted(self._send_ms)
+        return {
+            **self.pool.get_metrics(),
+            "sent": self._sent,
+            "failed": self._failed,
+            "send_ms_p50": round(send_ms[len(send_ms) // 2], 1) if send_ms else None,
+            "send_ms_p95": round(send_ms[int(len(send_ms) * 0.95)], 1) if send_ms else None,
+        }
+
+
+# Satu mailer (dan pool SMTP) per proses
+mailer = InvoiceMailer()
+
+
+async def send_invoice_emails() -> bool:
+    """Periodic job: send one batch of queued invoice emails (woken by NOTIFY)"""
+    return await mailer.send_batch() >= settings.INVOICE_EMAIL_BATCH_SIZE
@@ -0,0 +1,178 @@
+"""
+Bulk Invoice Export
+Dev 2: Transaction, Billing & Order Engine
+
+Streams every invoice in a date range as one ZIP archive, built while it
+is sent: the PDFs come from invoice storage (missing or evicted ones are
+rendered through the render pool), are copied into the archive in
+chunks and a manifest.csv closes the archive. The ZIP is written to a
+non-seekable buffer, so zipfile emits data descriptors instead of seeking
+back, and memory stays flat whatever the number of invoices.
+"""
+import asyncio
+import csv
+import io
+import tempfile
+import zipfile
+from datetime import datetime
+from typing import Any, AsyncIterator, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.modules.transactions.models import Invoice, Order
+from app.modules.transactions.rendering import renderer
+from app.modules.transactions.storage import get_storage, is_storage_key
+
+CHUNK_SIZE = 256 * 1024
+MANIFEST_COLUMNS = ["invoice_number", "order_id", "user_id", "total_price", "created_at", "filename", "error"]
+
+
+class _ZipSink(io.RawIOBase):
+    """Write-only, non-seekable target for ZipFile; the archive bytes are drained as they come"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _fetch_batch(start_date: datetime, end_date: datetime, after_id: int, limit: int) -> List[Any]:
+    db = SessionLocal()
+    try:
+        return db.query(
+            Invoice.id, Invoice.invoice_number, Invoice.order_id, Invoice.pdf_url, Invoice.created_at,
+            Order.user_id, Order.total_price
+        ).join(Order, Order.id == Invoice.order_id).filter(
+            Invoice.created_at >= start_date,
+            Invoice.created_at <= end_date,
+            Invoice.id > after_id
+        ).order_by(Invoice.id).limit(limit).all()
+    finally:
+        db.close()
+
+
+def _is_stored(key: Optional[str]) -> bool:
+    return is_storage_key(key) and get_storage().size(key) is not None
+
+
+async def _pdf_key(invoice: Any) -> str:
+    """Stored PDF if it is still there, otherwise render it (single-flight, see InvoiceRenderer)"""
+    if await run_in_threadpool(_is_stored, invoice.pdf_url):
+        return invoice.pdf_url
+    pdf = await renderer.get_pdf(invoice.order_id)
+    return pdf["key"]
+
+
+async def _prepare(start_date: datetime, end_date: datetime,
+                   after_id: int) -> List[Tuple[Any, Optional[str], Optional[str]]]:
+    """Next batch with a PDF storage key (or error) per invoice, missing PDFs rendered concurrently"""
+    invoices = await run_in_threadpool(
+        _fetch_batch, start_date, end_date, after_id, settings.INVOICE_EXPORT_BATCH_SIZE
+    )
+    keys = await asyncio.gather(*(_pdf_key(invoice) for invoice in invoices), return_exceptions=True)
+    return [
+        (invoice, None, f"{type(key).__name__}: {str(key)}") if isinstance(key, Exception)
+        else (invoice, key, None)
+        for invoice, key in zip(invoices, keys)
+    ]
+
+
+def _entry(filename: str, size: int, created_at: datetime) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(filename, date_time=created_at.timetuple()[:6])
+    info.compress_type = zipfile.ZIP_STORED  # PDFs are already compressed
+    info.file_size = size  # Lets zipfile decide on ZIP64 up front (it can't seek back)
+    return info
+
+
+async def _copy_file(archive: zipfile.ZipFile, sink: _ZipSink, key: str,
+                     filename: str, created_at: datetime) -> AsyncIterator[bytes]:
+    source = await run_in_threadpool(get_storage().open, key, CHUNK_SIZE)
+    try:
+        with archive.open(_entry(filename, source.size, created_at), "w") as entry:
+            while True:
+                chunk = await run_in_threadpool(source.read)
+                if chunk is None:
+                    break
+                entry.write(chunk)
+                yield sink.drain()
+    finally:
+        await run_in_threadpool(source.close)
+
+
+async def export_invoices(start_date: datetime, end_date: datetime) -> AsyncIterator[bytes]:
+    """ZIP of the invoice PDFs created between start_date and end_date, plus manifest.csv
+
+    An invoice whose PDF can't be rendered is left out of the archive and
+    listed in the manifest with its error (the response is already
+    streaming, so the export doesn't fail as a whole).
+    """
+    sink = _ZipSink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+    # Manifest rows are collected on disk past 1 MiB
+    manifest = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode="w+", newline="")
+    writer = csv.writer(manifest)
+    writer.writerow(MANIFEST_COLUMNS)
+
+    # Render the next batch while the current one is being sent
+    upcoming: asyncio.Task = asyncio.create_task(_prepare(start_date, end_date, 0))
+    exported = failed = 0
+    try:
+        while True:
+            batch = await upcoming
+            if not batch:
+                break
+            upcoming = asyncio.create_task(_prepare(start_date, end_date, batch[-1][0].id))
+
+            for invoice, key, error in batch:
+                filename = f"{invoice.invoice_number.replace('/', '-')}.pdf"  # INV/20260101/00001 isn't a folder
+                if key is not None:
+                    try:
+                        async for data in _copy_file(archive, sink, key, filename, invoice.created_at):
+                            yield data
+                    except FileNotFoundError:
+                        # Evicted since the batch was prepared
+                        try:
+                            key = (await renderer.get_pdf(invoice.order_id))["key"]
+                            async for data in _copy_file(archive, sink, key, filename, invoice.created_at):
+                                yield data
+                        except Exception as e:
+                            error = f"{type(e).__name__}: {str(e)}"
+                if error is not None:
+                    failed += 1
+                    print(f"[INVOICE-EXPORT ERROR] {invoice.invoice_number} left out: {error}")
+                else:
+                    exported += 1
+
+                writer.writerow([
+                    invoice.invoice_number, invoice.order_id, invoice.user_id, str(invoice.total_price),
+                    invoice.created_at.isoformat(), filename if error is None else "", error or ""
+                ])
+
+        manifest.seek(0)
+        with archive.open("manifest.csv", "w") as entry:
+            while True:
+                chunk = manifest.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                entry.write(chunk.encode())
+                yield sink.drain()
+        archive.close()
+        yield sink.drain()
+        print(f"[INVOICE-EXPORT] {exported} invoices exported, {failed} left out "
+              f"({start_date.isoformat()} - {end_date.isoformat()})")
+    finally:
+        upcoming.cancel()
+        manifest.close()
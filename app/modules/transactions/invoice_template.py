@@ -0,0 +1,135 @@
+"""
+Invoice HTML Template
+Dev 2: Transaction, Billing & Order Engine
+
+templates/invoice.html (and statement.html for monthly statements) is
+compiled once per process. Brand, locale labels and the stylesheet
+(templates/invoice.css) are bound as template globals at load time, so
+rendering an invoice only fills in the order.
+"""
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from pathlib import Path
+from string import Template as CssTemplate
+from typing import Any, Dict, Iterable, Union
+
+from jinja2 import Environment, FileSystemLoader, Template
+from markupsafe import Markup
+
+from app.core.config import settings
+
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+LABELS: Dict[str, Dict[str, Any]] = {
+    "en": {
+        "invoice": "Invoice",
+        "invoice_number": "Invoice Number",
+        "order_id": "Order ID",
+        "date": "Date",
+        "user_id": "User ID",
+        "description": "Description",
+        "price": "Price",
+        "total": "Total",
+        "thanks": "Thank you for your purchase!",
+        "contact": "For questions, contact",
+        "statement": "Monthly Statement",
+        "period": "Period",
+        "paid_on": "Paid On",
+        "statement_total": "Total paid",
+        "statement_note": "This statement lists the orders you paid in this period; each invoice was sent separately.",
+        "months": ["January", "February", "March", "April", "May", "June", "July",
+                   "August", "September", "October", "November", "December"],
+        "separators": (",", "."),  # (thousands, decimal)
+    },
+    "id": {
+        "invoice": "Invoice",
+        "invoice_number": "Nomor Invoice",
+        "order_id": "ID Pesanan",
+        "date": "Tanggal",
+        "user_id": "ID Pengguna",
+        "description": "Deskripsi",
+        "price": "Harga",
+        "total": "Total",
+        "thanks": "Terima kasih atas pembelian Anda!",
+        "contact": "Ada pertanyaan? Hubungi",
+        "statement": "Laporan Bulanan",
+        "period": "Periode",
+        "paid_on": "Tanggal Bayar",
+        "statement_total": "Total dibayar",
+        "statement_note": "Laporan ini memuat pesanan yang Anda bayar pada periode ini; setiap invoice dikirim terpisah.",
+        "months": ["Januari", "Februari", "Maret", "April", "Mei", "Juni", "Juli",
+                   "Agustus", "September", "Oktober", "November", "Desember"],
+        "separators": (".", ","),
+    },
+}
+
+
+def _format_money(value: Union[Decimal, float], labels: Dict[str, Any]) -> str:
+    amount = f"{float(value):,.2f}"
+    if labels["separators"] != (",", "."):
+        thousands, decimal = labels["separators"]
+        amount = amount.replace(",", "\0").replace(".", decimal).replace("\0", thousands)
+    return f"{settings.INVOICE_CURRENCY} {amount}"
+
+
+def _format_date(value: Union[date, datetime], labels: Dict[str, Any]) -> str:
+    return f"{value.day:02d} {labels['months'][value.month - 1]} {value.year}"
+
+
+def _format_month(value: date, labels: Dict[str, Any]) -> str:
+    return f"{labels['months'][value.month - 1]} {value.year}"
+
+
+@lru_cache(maxsize=1)
+def _get_environment() -> Environment:
+    """Template environment with brand/locale bound (built on first use)"""
+    if settings.INVOICE_LOCALE not in LABELS:
+        raise ValueError(f"Unsupported INVOICE_LOCALE '{settings.INVOICE_LOCALE}', use one of {sorted(LABELS)}")
+    labels = LABELS[settings.INVOICE_LOCALE]
+
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=True,
+        trim_blocks=True,
+        lstrip_blocks=True,
+        auto_reload=False
+    )
+    env.filters["money"] = lambda value: _format_money(value, labels)
+    env.filters["date"] = lambda value: _format_date(value, labels)
+    env.filters["month"] = lambda value: _format_month(value, labels)
+
+    stylesheet = CssTemplate((TEMPLATE_DIR / "invoice.css").read_text()).substitute(
+        brand_color=settings.INVOICE_BRAND_COLOR
+    )
+    env.globals.update(
+        labels=labels,
+        brand={"name": settings.INVOICE_BRAND_NAME, "support_email": settings.INVOICE_SUPPORT_EMAIL},
+        stylesheet=Markup(stylesheet)
+    )
+    return env
+
+
+@lru_cache(maxsize=1)
+def get_invoice_template() -> Template:
+    """Compiled invoice template (built on first use)"""
+    return _get_environment().get_template("invoice.html")
+
+
+@lru_cache(maxsize=1)
+def get_statement_template() -> Template:
+    """Compiled monthly statement template (built on first use)"""
+    return _get_environment().get_template("statement.html")
+
+
+def render_invoice_html(order: Any, items: Iterable[Any], invoice_number: str) -> str:
+    """Invoice HTML for xhtml2pdf (order / items only need the attributes used in the template)"""
+    return get_invoice_template().render(order=order, items=items, invoice_number=invoice_number)
+
+
+def render_statement_html(customer: Any, period_start: date, orders: Iterable[Any], total_amount: Decimal) -> str:
+    """Monthly statement HTML (customer: user_id/name/email, orders: order_id/paid_at/total_price/invoice_number)"""
+    return get_statement_template().render(
+        customer=customer, period_start=period_start, orders=orders, total_amount=total_amount
+    )
@@ -0,0 +1,182 @@
+"""
+Shared Midtrans HTTP Client
+Dev 2: Transaction, Billing & Order Engine
+
+One pooled httpx.AsyncClient per process, opened in the FastAPI lifespan,
+so checkouts reuse keep-alive connections instead of paying a TCP + TLS
+handshake to Midtrans on every payment.
+"""
+import base64
+import hashlib
+import hmac
+import time
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core import resilience
+from app.core.config import settings
+from app.core.resilience import OutboundPolicy
+
+
+def _policy(name: str, timeout: float) -> OutboundPolicy:
+    return resilience.register(OutboundPolicy(
+        name,
+        timeout=timeout,
+        max_retries=settings.OUTBOUND_MAX_RETRIES,
+        failure_threshold=settings.OUTBOUND_BREAKER_FAILURES,
+        recovery_seconds=settings.OUTBOUND_BREAKER_RECOVERY_SECONDS,
+        retry_budget_ratio=settings.OUTBOUND_RETRY_BUDGET_RATIO
+    ))
+
+
+snap_policy = _policy("midtrans.snap", settings.MIDTRANS_SNAP_TIMEOUT_SECONDS)
+status_policy = _policy("midtrans.status", settings.MIDTRANS_STATUS_TIMEOUT_SECONDS)
+
+
+class MidtransClient:
+    """Long-lived Midtrans client with connection-reuse metrics"""
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self.http2 = False
+        self.metrics: Dict[str, float] = {}
+        self.reset_metrics()
+
+    def reset_metrics(self):
+        self.metrics = {
+            "requests": 0,
+            "errors": 0,
+            "new_connections": 0,  # TCP connects (everything else reused a pooled connection)
+            "tls_handshakes": 0,
+            "total_ms": 0.0,
+        }
+
+    @staticmethod
+    def _auth_header() -> str:
+        """Encode server key for Basic Auth"""
+        return base64.b64encode(f"{settings.MIDTRANS_SERVER_KEY}:".encode()).decode()
+
+    @staticmethod
+    def verify_signature(notification: Dict[str, Any]) -> bool:
+        """Check signature_key = SHA512(order_id + status_code + gross_amount + server key)"""
+        signature = notification.get("signature_key")
+        if not signature:
+            return False
+        raw = (
+            f"{notification.get('order_id', '')}{notification.get('status_code', '')}"
+            f"{notification.get('gross_amount', '')}{settings.MIDTRANS_SERVER_KEY}"
+        )
+        expected = hashlib.sha512(raw.encode()).hexdigest()
+        return hmac.compare_digest(expected, str(signature))
+
+    @staticmethod
+    def _http2_enabled() -> bool:
+        if not settings.MIDTRANS_HTTP2:
+            return False
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("[MIDTRANS] MIDTRANS_HTTP2 needs httpx[http2] (h2 package), falling back to HTTP/1.1")
+            return False
+        return True
+
+    def _build_client(self) -> httpx.AsyncClient:
+        self.http2 = self._http2_enabled()
+        return httpx.AsyncClient(
+            http2=self.http2,
+            limits=httpx.Limits(
+                max_connections=settings.MIDTRANS_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.MIDTRANS_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.MIDTRANS_KEEPALIVE_EXPIRY_SECONDS
+            ),
+            timeout=httpx.Timeout(
+                connect=settings.MIDTRANS_CONNECT_TIMEOUT_SECONDS,
+                read=settings.MIDTRANS_READ_TIMEOUT_SECONDS,
+                write=settings.MIDTRANS_WRITE_TIMEOUT_SECONDS,
+                pool=settings.MIDTRANS_POOL_TIMEOUT_SECONDS
+            ),
+            headers={
+                "Accept": "application/json",
+                "Content-Type": "application/json",
+            }
+        )
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        # Scripts / jobs outside the app lifespan get a client on first use
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+
+    async def start(self):
+        self._client = self._build_client()
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]):
+        if event_name == "connection.connect_tcp.complete":
+            self.metrics["new_connections"] += 1
+        elif event_name == "connection.start_tls.complete":
+            self.metrics["tls_handshakes"] += 1
+
+    async def _send(self, method: str, url: str, payload: Optional[Dict[str, Any]]) -> httpx.Response:
+        started = time.perf_counter()
+        self.metrics["requests"] += 1
+        try:
+            response = await self.client.request(
+                method,
+                url,
+                json=payload,
+                headers={"Authorization": f"Basic {self._auth_header()}"},
+                extensions={"trace": self._trace}
+            )
+            # Transient statuses raise so the policy can retry / count them
+            if response.status_code == 429 or response.status_code >= 500:
+                response.raise_for_status()
+            return response
+        except Exception:
+            self.metrics["errors"] += 1
+            raise
+        finally:
+            self.metrics["total_ms"] += (time.perf_counter() - started) * 1000
+
+    async def post(self, url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """POST JSON with server-key auth, returns the decoded response body
+
+        Not idempotent (Snap rejects a reused order_id), so the policy only
+        retries when the request never reached Midtrans.
+        """
+        response = await snap_policy.call(lambda: self._send("POST", url, payload))
+        response.raise_for_status()
+        return response.json()
+
+    async def get_status(self, transaction_id: str) -> Optional[Dict[str, Any]]:
+        """GET /v2/{id}/status, returns None when Midtrans doesn't know the transaction"""
+        url = settings.MIDTRANS_STATUS_URL.format(transaction_id=transaction_id)
+        response = await status_policy.call(lambda: self._send("GET", url, None), idempotent=True)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        body = response.json()
+        # Status API reports "not found" with HTTP 200 and status_code 404 in the body
+        if str(body.get("status_code")) == "404":
+            return None
+        return body
+
+    def get_metrics(self) -> Dict[str, Any]:
+        requests = self.metrics["requests"]
+        return {
+            **self.metrics,
+            "reused_connections": max(requests - self.metrics["new_connections"], 0),
+            "reuse_ratio": round(1 - self.metrics["new_connections"] / requests, 4) if requests else 0.0,
+            "avg_ms": round(self.metrics["total_ms"] / requests, 2) if requests else 0.0,
+            "http2": self.http2,
+        }
+
+
+# Satu client per proses, dibuka/ditutup di lifespan app
+midtrans_client = MidtransClient()
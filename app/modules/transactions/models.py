@@ -3,9 +3,9 @@ Database Models for Transaction Module
 Dev 2: Transaction, Billing & Order Engine
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Numeric, Boolean, DateTime, Text, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Numeric, Boolean, Date, DateTime, Text, ForeignKey, UniqueConstraint, Index, Enum as SQLEnum, text, DDL, event
 from sqlalchemy.orm import relationship
-from sqlalchemy.dialects.postgresql import JSON
+from sqlalchemy.dialects.postgresql import JSON, JSONB
 import enum
 from app.core.database import Base
 
@@ -31,6 +31,7 @@ class PaymentStatus(str, enum.Enum):
 class PaymentGateway(str, enum.Enum):
     MIDTRANS = "midtrans"
     XENDIT = "xendit"
+    FAKE = "fake"  # Local fake gateway for load tests (gateways/fake_server.py)
 
 
 class OrderItemType(str, enum.Enum):
@@ -38,6 +39,40 @@ class OrderItemType(str, enum.Enum):
     TEMPLATE = "template"
 
 
+class IdempotencyStatus(str, enum.Enum):
+    IN_PROGRESS = "in_progress"
+    COMPLETED = "completed"
+
+
+class OutboxStatus(str, enum.Enum):
+    PENDING = "pending"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class InvoiceEmailStatus(str, enum.Enum):
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
+class InvoiceRenderStatus(str, enum.Enum):
+    PENDING = "pending"  # Numbered, PDF not rendered yet
+    DONE = "done"
+    FAILED = "failed"  # Gave up after INVOICE_RENDER_MAX_ATTEMPTS
+
+
+class InboxStatus(str, enum.Enum):
+    PENDING = "pending"
+    DONE = "done"
+    DEAD = "dead"  # Gave up after WEBHOOK_INBOX_MAX_ATTEMPTS, needs a manual retry
+
+
+class StatementRunStatus(str, enum.Enum):
+    RUNNING = "running"
+    DONE = "done"
+
+
 # ==================== PRODUCT MANAGEMENT ====================
 
 class PricingPlan(Base):
@@ -76,6 +111,14 @@ class Template(Base):
 
 class SubscriptionPlan(Base):
     __tablename__ = "subscription_plans"
+    __table_args__ = (
+        # One row per (plan, template) combination; NULL template counts as a value (PG 15+)
+        UniqueConstraint(
+            "pricing_plan_id", "template_id",
+            name="uq_subscription_plans_plan_template",
+            postgresql_nulls_not_distinct=True
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     pricing_plan_id = Column(Integer, ForeignKey("pricing_plans.id"), nullable=False)
@@ -94,6 +137,21 @@ class SubscriptionPlan(Base):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Used by the pending order expiry sweeper
+        Index(
+            "ix_orders_pending_created_at", "created_at",
+            postgresql_where=text("status = 'PENDING'")
+        ),
+        # Keyset pagination for admin order search (with and without status filter)
+        Index("ix_orders_created_at_id", "created_at", "id"),
+        Index("ix_orders_status_created_at_id", "status", "created_at", "id"),
+        # Monthly statements: paid orders walked in user_id order, filtered by paid_at
+        Index(
+            "ix_orders_paid_user_id_paid_at", "user_id", "paid_at",
+            postgresql_where=text("status = 'PAID'")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
@@ -134,12 +192,11 @@ class Payment(Base):
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     payment_gateway = Column(SQLEnum(PaymentGateway), nullable=False, default=PaymentGateway.MIDTRANS)
-    transaction_id = Column(String(100), nullable=True, unique=True)  # External transaction ID
+    transaction_id = Column(String(100), nullable=True, unique=True)  # Gateway lookup key (Midtrans: order_id sent to Snap)
     amount = Column(Numeric(12, 2), nullable=False)
     status = Column(SQLEnum(PaymentStatus), nullable=False, default=PaymentStatus.PENDING, index=True)
     payment_url = Column(String(500), nullable=True)  # Redirect URL for payment
     payment_method = Column(String(50), nullable=True)  # e.g., gopay, bank_transfer, qris
-    raw_response = Column(JSON, nullable=True)  # Store full gateway response
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
     updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
     paid_at = Column(DateTime(timezone=True), nullable=True)
@@ -148,18 +205,211 @@ class Payment(Base):
     order = relationship("Order", back_populates="payments")
 
 
+class PaymentEvent(Base):
+    """Append-only log of raw gateway payloads (charge response, every webhook / reconciler status)"""
+    __tablename__ = "payment_events"
+    __table_args__ = (
+        # Archiver scans old events in id order
+        Index("ix_payment_events_created_at_id", "created_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    payment_id = Column(Integer, nullable=False, index=True)  # No FK: survives payments partitioning / archiving
+    event_type = Column(String(50), nullable=False)  # charge.created, webhook, reconcile, payment.late_settlement; backfill (migrated raw_response)
+    transaction_status = Column(String(50), nullable=True)  # Gateway status carried by the payload
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)
+
+
+# Webhook payloads are ~1-2KB, below the default 2KB TOAST threshold; a lower
+# target makes Postgres compress them instead of storing them inline
+event.listen(
+    PaymentEvent.__table__, "after_create",
+    DDL("ALTER TABLE payment_events SET (toast_tuple_target = 256)").execute_if(dialect="postgresql")
+)
+
+
 # ==================== INVOICE ====================
 
 class Invoice(Base):
     __tablename__ = "invoices"
+    __table_args__ = (
+        # Renderer claims due invoices, oldest first
+        Index(
+            "ix_invoices_render_pending", "render_available_at", "id",
+            postgresql_where=text("render_status = 'PENDING'")
+        ),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, unique=True, index=True)
     invoice_number = Column(String(50), nullable=False, unique=True, index=True)
-    pdf_url = Column(String(500), nullable=True)  # Path to generated PDF
+    pdf_url = Column(String(500), nullable=True)  # Storage key of the generated PDF (see transactions/storage)
+    render_status = Column(SQLEnum(InvoiceRenderStatus), nullable=False, default=InvoiceRenderStatus.PENDING)
+    render_attempts = Column(Integer, nullable=False, default=0)
+    render_available_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)  # Retry backoff / claim lease
+    render_error = Column(Text, nullable=True)
+    rendered_at = Column(DateTime(timezone=True), nullable=True)
     sent_via_email = Column(Boolean, nullable=False, default=False)
     sent_at = Column(DateTime(timezone=True), nullable=True)
     created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
 
     # Relationships
     order = relationship("Order", back_populates="invoice")
+
+
+class InvoiceEmail(Base):
+    """Queued invoice email, sent in batches by transactions/invoice_email.py"""
+    __tablename__ = "invoice_emails"
+    __table_args__ = (
+        # Mailer claims due emails, oldest first
+        Index(
+            "ix_invoice_emails_pending", "available_at", "id",
+            postgresql_where=text("status = 'PENDING'")
+        ),
+        # One automatic email per invoice; resends are extra rows
+        Index(
+            "uq_invoice_emails_invoice", "invoice_id", unique=True,
+            postgresql_where=text("kind = 'invoice'")
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    invoice_id = Column(Integer, ForeignKey("invoices.id"), nullable=False)
+    kind = Column(String(20), nullable=False, default="invoice")  # invoice | resend
+    recipient = Column(String(100), nullable=True)  # Set when sent (the user's email at that time)
+    status = Column(SQLEnum(InvoiceEmailStatus), nullable=False, default=InvoiceEmailStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)  # Retry backoff / claim lease
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class StatementRun(Base):
+    """Monthly statement batch (transactions/statements.py); resumes after last_user_id"""
+    __tablename__ = "statement_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    period_start = Column(Date, nullable=False, unique=True)  # First day of the statement month
+    status = Column(SQLEnum(StatementRunStatus), nullable=False, default=StatementRunStatus.RUNNING)
+    last_user_id = Column(Integer, nullable=False, default=0)  # Statements up to this user are committed
+    statements = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # Lease of the worker processing the run
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+
+class CustomerStatement(Base):
+    """One user's statement for a month: paid orders and invoices in one PDF"""
+    __tablename__ = "customer_statements"
+    __table_args__ = (
+        UniqueConstraint("user_id", "period_start", name="uq_customer_statements_user_period"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    period_start = Column(Date, nullable=False)
+    run_id = Column(Integer, ForeignKey("statement_runs.id"), nullable=True)
+    order_count = Column(Integer, nullable=False)
+    invoice_count = Column(Integer, nullable=False)
+    total_amount = Column(Numeric(12, 2), nullable=False)
+    pdf_url = Column(String(500), nullable=True)  # Storage key, None if rendering failed
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+
+
+class InvoiceSequence(Base):
+    """Last invoice number handed out per day (INV/YYYYMMDD/XXXXX)"""
+    __tablename__ = "invoice_sequences"
+
+    day = Column(Date, primary_key=True)
+    last_value = Column(Integer, nullable=False, default=0)
+
+
+# ==================== IDEMPOTENCY ====================
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    __table_args__ = (
+        UniqueConstraint("scope", "key", name="uq_idempotency_keys_scope_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String(50), nullable=False)  # e.g., orders.create, payments.create
+    key = Column(String(255), nullable=False)  # Client supplied Idempotency-Key header
+    request_hash = Column(String(64), nullable=False)  # SHA-256 of the request payload
+    status = Column(SQLEnum(IdempotencyStatus), nullable=False, default=IdempotencyStatus.IN_PROGRESS)
+    response_code = Column(Integer, nullable=True)
+    response_body = Column(JSON, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)  # Lock expiry while in progress, TTL once completed
+
+
+# ==================== OUTBOX ====================
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+    __table_args__ = (
+        # Dispatcher polls pending events by availability
+        Index(
+            "ix_outbox_events_pending", "available_at", "id",
+            postgresql_where=text("status = 'PENDING'")
+        ),
+        # Retention purge finds finished events by age
+        Index(
+            "ix_outbox_events_finished", "created_at",
+            postgresql_where=text("status IN ('DONE', 'FAILED')")
+        ),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    event_type = Column(String(100), nullable=False)  # e.g., order.paid
+    aggregate_id = Column(Integer, nullable=False)  # ID of the order / payment the event is about
+    payload = Column(JSON, nullable=True)
+    status = Column(SQLEnum(OutboxStatus), nullable=False, default=OutboxStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)  # Retry backoff / claim lease
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
+
+
+# ==================== WEBHOOK INBOX ====================
+
+class WebhookInbox(Base):
+    __tablename__ = "webhook_inbox"
+    __table_args__ = (
+        # Worker claims due notifications, oldest first
+        Index(
+            "ix_webhook_inbox_pending", "available_at", "id",
+            postgresql_where=text("status = 'PENDING'")
+        ),
+        # Per-transaction ordering check (earlier unfinished notification)
+        Index("ix_webhook_inbox_transaction_id", "transaction_id", "id"),
+        # Retention purge finds finished notifications by age
+        Index(
+            "ix_webhook_inbox_finished", "received_at",
+            postgresql_where=text("status IN ('DONE', 'DEAD')")
+        ),
+        # Gateway redeliveries of the same notification are stored once (PG 15+)
+        UniqueConstraint(
+            "transaction_id", "transaction_status", "status_code",
+            name="uq_webhook_inbox_notification",
+            postgresql_nulls_not_distinct=True
+        ),
+    )
+
+    id = Column(Integer, primary_key=True)
+    gateway = Column(SQLEnum(PaymentGateway), nullable=False, default=PaymentGateway.MIDTRANS)
+    transaction_id = Column(String(100), nullable=False)
+    transaction_status = Column(String(50), nullable=True)
+    status_code = Column(String(10), nullable=True)  # Gateway status_code, part of the dedupe key
+    payload = Column(JSON, nullable=False)
+    status = Column(SQLEnum(InboxStatus), nullable=False, default=InboxStatus.PENDING)
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime(timezone=True), nullable=False, default=datetime.utcnow)  # Retry backoff / claim lease
+    last_error = Column(Text, nullable=True)
+    received_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    processed_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,125 @@
+"""
+Transactional Outbox for Transaction Module
+Dev 2: Transaction, Billing & Order Engine
+
+Lifecycle events are written in the same transaction as the status change
+and delivered afterwards to in-process handlers by a background dispatcher.
+"""
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from app.core.background import claim_due, retry_at
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.notify import notify
+from app.modules.transactions.models import OutboxEvent, OutboxStatus
+
+
+OUTBOX_CHANNEL = "outbox_events"
+
+# Event types
+ORDER_PAID = "order.paid"
+PAYMENT_LATE_SETTLEMENT = "payment.late_settlement"  # Paid, but the order will not be fulfilled: refund / manual fix
+
+EventHandler = Callable[[Session, OutboxEvent], None]
+
+
+class OutboxService:
+    """Publish lifecycle events and dispatch them to registered handlers"""
+
+    _handlers: Dict[str, List[EventHandler]] = {}
+
+    @staticmethod
+    def handler(event_type: str) -> Callable[[EventHandler], EventHandler]:
+        """Register a handler for an event type (handlers must be idempotent)"""
+        def decorator(func: EventHandler) -> EventHandler:
+            OutboxService._handlers.setdefault(event_type, []).append(func)
+            return func
+        return decorator
+
+    @staticmethod
+    def publish(db: Session, event_type: str, aggregate_id: int, payload: Optional[Dict[str, Any]] = None) -> OutboxEvent:
+        """Add an event to the caller's transaction (no commit)"""
+        event = OutboxEvent(
+            event_type=event_type,
+            aggregate_id=aggregate_id,
+            payload=payload or {},
+            status=OutboxStatus.PENDING,
+            available_at=datetime.utcnow()
+        )
+        db.add(event)
+        notify(db, OUTBOX_CHANNEL, event_type)
+        return event
+
+    @staticmethod
+    def _claim_batch(db: Session, batch_size: int) -> List[OutboxEvent]:
+        """Lease a batch of due events; SKIP LOCKED lets every worker dispatch"""
+        events = db.scalars(
+            claim_due(
+                OutboxEvent, OutboxEvent.id, OutboxEvent.status, OutboxStatus.PENDING,
+                OutboxEvent.available_at, OutboxEvent.attempts, batch_size, settings.OUTBOX_LEASE_SECONDS
+            ).returning(OutboxEvent)
+        ).all()
+        # Keep the RETURNING values after commit (handlers get detached events)
+        for event in events:
+            db.expunge(event)
+        db.commit()
+        return sorted(events, key=lambda event: event.id)
+
+    @staticmethod
+    def _deliver(event: OutboxEvent) -> Optional[str]:
+        """Run all handlers for one event; returns the error message on failure"""
+        db = SessionLocal()
+        try:
+            for event_handler in OutboxService._handlers.get(event.event_type, []):
+                event_handler(db, event)
+            return None
+        except Exception as e:
+            db.rollback()
+            return f"{type(e).__name__}: {str(e)}"
+        finally:
+            db.close()
+
+    @staticmethod
+    def dispatch_batch(batch_size: Optional[int] = None) -> int:
+        """Deliver one batch of due events, returns number of events claimed"""
+        batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        db = SessionLocal()
+        try:
+            events = OutboxService._claim_batch(db, batch_size)
+            for event in events:
+                error = OutboxService._deliver(event)
+                values: Dict[str, Any] = {"last_error": error}
+                next_attempt = retry_at(event.attempts, settings.OUTBOX_MAX_ATTEMPTS)
+                if error is None:
+                    values.update(status=OutboxStatus.DONE, processed_at=datetime.utcnow())
+                elif next_attempt is None:
+                    values.update(status=OutboxStatus.FAILED)
+                    print(f"[OUTBOX ERROR] Event #{event.id} ({event.event_type}) failed permanently: {error}")
+                else:
+                    values.update(available_at=next_attempt)
+                    print(f"[OUTBOX] Event #{event.id} ({event.event_type}) attempt {event.attempts} failed: {error}")
+
+                db.execute(
+                    update(OutboxEvent).where(OutboxEvent.id == event.id).values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+                db.commit()
+            return len(events)
+        finally:
+            db.close()
+
+    @staticmethod
+    def purge_finished(db: Session, batch_size: int = 1000) -> int:
+        """Delete one batch of DONE / FAILED events older than OUTBOX_RETENTION_DAYS, returns rows removed"""
+        cutoff = datetime.utcnow() - timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+        finished_ids = select(OutboxEvent.id).where(
+            OutboxEvent.status.in_([OutboxStatus.DONE, OutboxStatus.FAILED]),
+            OutboxEvent.created_at < cutoff
+        ).limit(batch_size).with_for_update(skip_locked=True).scalar_subquery()
+        result = db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(finished_ids)))
+        db.commit()
+        return result.rowcount
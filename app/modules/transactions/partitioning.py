@@ -0,0 +1,242 @@
+"""
+Monthly Range Partitioning for orders / payments
+Dev 2: Transaction, Billing & Order Engine
+
+Optional migration path: convert the heap tables to declarative RANGE
+partitions on created_at (one partition per month) and keep future
+partitions created ahead of time.
+
+    python -m app.modules.transactions.partitioning status
+    python -m app.modules.transactions.partitioning migrate --tables orders payments --drop-foreign-keys
+    python -m app.modules.transactions.partitioning ensure
+
+Notes after migrating:
+- The primary key becomes (id, created_at) and created_at is NOT NULL.
+- The table's own foreign keys (orders.user_id, payments.order_id, ...)
+  are recreated on the partitioned table.
+- Foreign keys that reference the table (order_items / payments /
+  invoices -> orders) can't be kept: Postgres needs the partition key in
+  any referenced unique key and the referencing tables have no created_at
+  of the row they point to. migrate refuses to run while there are any,
+  unless --drop-foreign-keys is given; integrity is then kept by the app.
+- Unique constraints without created_at (payments.transaction_id) become
+  plain indexes.
+"""
+import argparse
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import UniqueConstraint, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection
+from sqlalchemy.schema import CreateIndex
+
+from app.core.config import settings
+from app.core.database import Base, engine
+from app.modules.transactions import models  # noqa: F401 (registers tables on Base.metadata)
+
+
+PARTITIONED_TABLES = ["orders", "payments"]
+PARTITION_KEY = "created_at"
+
+# Serializes partition DDL when every worker runs maintenance
+MAINTENANCE_LOCK_ID = 726_001
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table_name: str, month: date) -> str:
+    return f"{table_name}_p{month:%Y%m}"
+
+
+def is_partitioned(conn: Connection, table_name: str) -> bool:
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:name))"
+    ), {"name": table_name}).scalar()
+
+
+def list_partitions(conn: Connection, table_name: str) -> List[str]:
+    return list(conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:name) ORDER BY c.relname"
+    ), {"name": table_name}).scalars())
+
+
+def ensure_partitions(conn: Connection, table_name: str, start: date, months_ahead: int) -> List[str]:
+    """Create monthly partitions from `start` through the current month + months_ahead"""
+    today = date.today()
+    last = _add_months(date(today.year, today.month, 1), months_ahead)
+    month = date(start.year, start.month, 1)
+    created = []
+    while month <= last:
+        name = partition_name(table_name, month)
+        exists = conn.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+        if not exists:
+            conn.execute(text(
+                f"CREATE TABLE {name} PARTITION OF {table_name} "
+                f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') "
+                f"TO ('{_add_months(month, 1).isoformat()} 00:00:00+00')"
+            ))
+            created.append(name)
+        month = _add_months(month, 1)
+    return created
+
+
+def _create_indexes(conn: Connection, table_name: str):
+    """Recreate the model's indexes on the partitioned parent (propagates to partitions)"""
+    table = Base.metadata.tables[table_name]
+    dialect = postgresql.dialect()
+
+    for index in table.indexes:
+        ddl = str(CreateIndex(index).compile(dialect=dialect))
+        if index.unique and PARTITION_KEY not in [column.name for column in index.columns]:
+            print(f"[PARTITION] {index.name} can't stay unique without {PARTITION_KEY}, creating it as a plain index")
+            ddl = ddl.replace("CREATE UNIQUE INDEX", "CREATE INDEX", 1)
+        conn.execute(text(ddl))
+
+    for constraint in table.constraints:
+        if not isinstance(constraint, UniqueConstraint):
+            continue
+        columns = [column.name for column in constraint.columns]
+        if PARTITION_KEY in columns:
+            conn.execute(text(f"ALTER TABLE {table_name} ADD UNIQUE ({', '.join(columns)})"))
+        else:
+            print(f"[PARTITION] UNIQUE ({', '.join(columns)}) on {table_name} becomes a plain index")
+            conn.execute(text(
+                f"CREATE INDEX ix_{table_name}_{'_'.join(columns)} ON {table_name} ({', '.join(columns)})"
+            ))
+
+
+def referencing_foreign_keys(conn: Connection, table_name: str) -> List[Tuple[str, str]]:
+    """(referencing table, constraint name) of every foreign key pointing at table_name"""
+    return [tuple(row) for row in conn.execute(text(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        "WHERE confrelid = to_regclass(:name) AND contype = 'f' AND conparentid = 0 "
+        "ORDER BY 1, 2"
+    ), {"name": table_name}).all()]
+
+
+def convert_to_partitioned(conn: Connection, table_name: str, months_ahead: int,
+                           drop_foreign_keys: bool = False) -> int:
+    """Rebuild a heap table as a monthly RANGE-partitioned table, returns rows copied
+
+    Raises RuntimeError (nothing changed) when other tables reference this
+    one and drop_foreign_keys is not set.
+    """
+    heap = f"{table_name}_heap"
+
+    conn.execute(text(f"LOCK TABLE {table_name} IN ACCESS EXCLUSIVE MODE"))
+    incoming = referencing_foreign_keys(conn, table_name)
+    if incoming and not drop_foreign_keys:
+        raise RuntimeError(
+            f"{table_name} is referenced by {', '.join(f'{table}.{name}' for table, name in incoming)}; "
+            f"these foreign keys can't point at a partitioned {table_name}. "
+            f"Re-run with --drop-foreign-keys to drop them (integrity is then kept by the app only)"
+        )
+    # The table's own foreign keys, recreated on the partitioned table after the copy
+    outgoing = conn.execute(text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(:name) AND contype = 'f' ORDER BY conname"
+    ), {"name": table_name}).all()
+
+    conn.execute(text(
+        f"UPDATE {table_name} SET {PARTITION_KEY} = COALESCE(updated_at, now()) WHERE {PARTITION_KEY} IS NULL"
+    ))
+    conn.execute(text(f"ALTER TABLE {table_name} RENAME TO {heap}"))
+    pkey = conn.execute(text(
+        "SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(:name) AND contype = 'p'"
+    ), {"name": heap}).scalar()
+    if pkey:
+        conn.execute(text(f"ALTER TABLE {heap} RENAME CONSTRAINT {pkey} TO {heap}_pkey"))
+
+    conn.execute(text(
+        f"CREATE TABLE {table_name} (LIKE {heap} INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        f"PARTITION BY RANGE ({PARTITION_KEY})"
+    ))
+    conn.execute(text(f"ALTER TABLE {table_name} ALTER COLUMN {PARTITION_KEY} SET NOT NULL"))
+    conn.execute(text(f"ALTER TABLE {table_name} ADD CONSTRAINT {table_name}_pkey PRIMARY KEY (id, {PARTITION_KEY})"))
+
+    first = conn.execute(text(f"SELECT min({PARTITION_KEY}) FROM {heap}")).scalar()
+    ensure_partitions(conn, table_name, (first.date() if first else date.today()), months_ahead)
+
+    conn.execute(text(f"INSERT INTO {table_name} SELECT * FROM {heap}"))
+    copied = conn.execute(text(f"SELECT count(*) FROM {table_name}")).scalar()
+    original = conn.execute(text(f"SELECT count(*) FROM {heap}")).scalar()
+    if copied != original:
+        raise RuntimeError(f"Row count mismatch for {table_name}: {copied} != {original}")
+
+    for constraint_name, definition in outgoing:
+        conn.execute(text(f"ALTER TABLE {table_name} ADD CONSTRAINT {constraint_name} {definition}"))
+
+    # Keep the id sequence alive when the heap table is dropped
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:name, 'id')"), {"name": heap}).scalar()
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {table_name}.id"))
+
+    for referencing_table, constraint_name in incoming:
+        print(f"[PARTITION] Dropping FK {constraint_name} on {referencing_table} (references {table_name})")
+        conn.execute(text(f"ALTER TABLE {referencing_table} DROP CONSTRAINT {constraint_name}"))
+
+    conn.execute(text(f"DROP TABLE {heap}"))
+    _create_indexes(conn, table_name)
+    conn.execute(text(f"ANALYZE {table_name}"))
+    return copied
+
+
+def maintain_partitions(months_ahead: Optional[int] = None) -> List[str]:
+    """Create upcoming monthly partitions for every partitioned table"""
+    months_ahead = settings.PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    created = []
+    with engine.begin() as conn:
+        conn.execute(text("SELECT pg_advisory_xact_lock(:lock_id)"), {"lock_id": MAINTENANCE_LOCK_ID})
+        for table_name in PARTITIONED_TABLES:
+            if is_partitioned(conn, table_name):
+                created.extend(ensure_partitions(conn, table_name, date.today(), months_ahead))
+    if created:
+        print(f"[PARTITION] Created partitions: {', '.join(created)}")
+    return created
+
+
+def _run(args: argparse.Namespace):
+    with engine.begin() as conn:
+        for table_name in args.tables:
+            partitioned = is_partitioned(conn, table_name)
+            if args.command == "status":
+                partitions = list_partitions(conn, table_name) if partitioned else []
+                print(f"{table_name}: {'partitioned' if partitioned else 'heap'}"
+                      + (f" ({len(partitions)} partitions: {partitions[0]} .. {partitions[-1]})" if partitions else ""))
+                if not partitioned:
+                    for referencing_table, constraint_name in referencing_foreign_keys(conn, table_name):
+                        print(f"  referenced by {referencing_table}.{constraint_name} (migrate needs --drop-foreign-keys)")
+            elif partitioned:
+                print(f"{table_name}: already partitioned, skipping")
+            else:
+                copied = convert_to_partitioned(conn, table_name, args.months_ahead, args.drop_foreign_keys)
+                print(f"{table_name}: converted, {copied} rows copied")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monthly partitioning for orders / payments")
+    parser.add_argument("command", choices=["status", "migrate", "ensure"])
+    parser.add_argument("--tables", nargs="+", choices=PARTITIONED_TABLES, default=PARTITIONED_TABLES)
+    parser.add_argument("--months-ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD)
+    parser.add_argument("--drop-foreign-keys", action="store_true",
+                        help="Drop foreign keys referencing the converted tables (they can't be kept)")
+    args = parser.parse_args()
+
+    if args.command == "ensure":
+        maintain_partitions(args.months_ahead)
+        return
+
+    try:
+        _run(args)
+    except RuntimeError as e:
+        # Everything ran in one transaction, so nothing was changed
+        raise SystemExit(f"[PARTITION] Aborted: {e}")
+
+
+if __name__ == "__main__":
+    main()
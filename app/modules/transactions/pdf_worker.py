@@ -0,0 +1,33 @@
+"""
+Invoice PDF Render Worker
+Dev 2: Transaction, Billing & Order Engine
+
+Runs inside the render pool processes (see rendering.py). Kept free of app
+imports so spawning a worker only loads xhtml2pdf.
+"""
+import os
+import time
+
+
+def warm_up():
+    """Pool initializer: import xhtml2pdf once per process, not per invoice"""
+    from xhtml2pdf import pisa  # noqa: F401
+
+
+def render_pdf(html: str, pdf_path: str) -> float:
+    """Render HTML to pdf_path, returns the render time in seconds"""
+    from xhtml2pdf import pisa
+
+    started = time.perf_counter()
+    tmp_path = f"{pdf_path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as pdf_file:
+            result = pisa.CreatePDF(html, dest=pdf_file)
+        if result.err:
+            raise RuntimeError(f"xhtml2pdf reported {result.err} error(s)")
+        # Readers never see a half-written file
+        os.replace(tmp_path, pdf_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return time.perf_counter() - started
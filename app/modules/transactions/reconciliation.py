@@ -0,0 +1,160 @@
+"""
+Payment Reconciliation
+Dev 2: Transaction, Billing & Order Engine
+
+Pending payments whose webhook never arrived are checked against their
+gateway's transaction-status API and updated through the same path as
+webhooks (PaymentService.apply_gateway_status). Every worker schedules
+the pass, but an advisory lock lets only one of them run it at a time, so
+the status API isn't queried once per worker.
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.core.resilience import CircuitOpenError
+from app.modules.transactions.gateways import GatewayStatus, enabled_gateways, get_gateway
+from app.modules.transactions.models import Payment, PaymentGateway, PaymentStatus
+from app.modules.transactions.services import PaymentService
+
+
+# One reconciliation pass at a time across all workers
+RECONCILE_LOCK_ID = 726_002
+
+
+class PaymentReconciler:
+    """Poll the gateway for stale pending payments"""
+
+    @staticmethod
+    def _acquire_lock() -> Optional[Connection]:
+        """Connection holding the pass lock, None when another worker is reconciling
+
+        Session-level lock on a dedicated connection, so no transaction stays
+        open for the whole pass.
+        """
+        conn = engine.connect()
+        try:
+            locked = conn.execute(
+                text("SELECT pg_try_advisory_lock(:lock_id)"), {"lock_id": RECONCILE_LOCK_ID}
+            ).scalar()
+            conn.commit()
+        except Exception:
+            conn.close()
+            raise
+        if not locked:
+            conn.close()
+            return None
+        return conn
+
+    @staticmethod
+    def _release_lock(conn: Connection):
+        try:
+            conn.execute(text("SELECT pg_advisory_unlock(:lock_id)"), {"lock_id": RECONCILE_LOCK_ID})
+            conn.commit()
+        except Exception:
+            # Never hand a connection that may still hold the lock back to the pool
+            conn.invalidate()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _stale_batch(after_id: int, cutoff: datetime,
+                     batch_size: int) -> List[Tuple[int, int, str, PaymentGateway]]:
+        db = SessionLocal()
+        try:
+            return [tuple(row) for row in db.query(
+                Payment.id, Payment.order_id, Payment.transaction_id, Payment.payment_gateway
+            ).filter(
+                Payment.status == PaymentStatus.PENDING,
+                Payment.created_at < cutoff,
+                Payment.transaction_id.isnot(None),
+                # Each payment is checked with (and only settled by) its own gateway
+                Payment.payment_gateway.in_(enabled_gateways()),
+                Payment.id > after_id
+            ).order_by(Payment.id).limit(batch_size).all()]
+        finally:
+            db.close()
+
+    @staticmethod
+    def _apply(payment_id: int, order_id: int, status: GatewayStatus) -> bool:
+        db = SessionLocal()
+        try:
+            return PaymentService.apply_gateway_status(db, payment_id, order_id, status, source="reconcile")
+        finally:
+            db.close()
+
+    @staticmethod
+    async def _check(semaphore: asyncio.Semaphore,
+                     payment: Tuple[int, int, str, PaymentGateway]) -> Optional[bool]:
+        """Returns True if the payment changed, False if not, None on error"""
+        payment_id, order_id, transaction_id, gateway = payment
+        async with semaphore:
+            try:
+                status_data = await get_gateway(gateway).get_status(transaction_id)
+            except ValueError as e:
+                print(f"[RECONCILE] Skipping Payment #{payment_id}: {str(e)}")
+                return None
+            except (httpx.HTTPError, asyncio.TimeoutError, CircuitOpenError) as e:
+                print(f"[RECONCILE] Status check failed for Payment #{payment_id}: {str(e) or type(e).__name__}")
+                return None
+        if status_data is None:
+            return False
+        try:
+            return await run_in_threadpool(PaymentReconciler._apply, payment_id, order_id, status_data)
+        except Exception as e:
+            print(f"[RECONCILE ERROR] Applying status to Payment #{payment_id} failed: {str(e)}")
+            return None
+
+    @staticmethod
+    async def reconcile(stale_minutes: Optional[int] = None, batch_size: Optional[int] = None,
+                        concurrency: Optional[int] = None) -> Dict[str, Any]:
+        """Check every stale pending payment once, returns checked / changed / errors / duration
+
+        Skipped (skipped: True) while another worker runs a pass.
+        """
+        stale_minutes = settings.RECONCILE_STALE_MINUTES if stale_minutes is None else stale_minutes
+        batch_size = batch_size or settings.RECONCILE_BATCH_SIZE
+        semaphore = asyncio.Semaphore(concurrency or settings.RECONCILE_CONCURRENCY)
+        cutoff = datetime.utcnow() - timedelta(minutes=stale_minutes)
+
+        started = time.perf_counter()
+        report: Dict[str, Any] = {"checked": 0, "changed": 0, "errors": 0, "skipped": False}
+        lock = await run_in_threadpool(PaymentReconciler._acquire_lock)
+        if lock is None:
+            report.update(skipped=True, duration_ms=0.0)
+            return report
+        try:
+            after_id = 0
+            while True:
+                batch = await run_in_threadpool(PaymentReconciler._stale_batch, after_id, cutoff, batch_size)
+                if not batch:
+                    break
+                results = await asyncio.gather(*(PaymentReconciler._check(semaphore, payment) for payment in batch))
+                report["checked"] += len(batch)
+                report["changed"] += sum(1 for result in results if result)
+                report["errors"] += sum(1 for result in results if result is None)
+                after_id = batch[-1][0]
+                if len(batch) < batch_size:
+                    break
+        finally:
+            await run_in_threadpool(PaymentReconciler._release_lock, lock)
+
+        report["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if report["checked"]:
+            print(f"[RECONCILE] Checked {report['checked']} pending payments, {report['changed']} changed, "
+                  f"{report['errors']} errors in {report['duration_ms']}ms")
+        return report
+
+
+async def reconcile_payments() -> bool:
+    """Periodic job: one full reconciliation pass"""
+    await PaymentReconciler.reconcile()
+    return False
@@ -0,0 +1,234 @@
+"""
+Invoice PDF Rendering
+Dev 2: Transaction, Billing & Order Engine
+
+generate_invoice only numbers the invoice and stores it with render_status
+PENDING. PDFs are rendered here, off the event loop and outside the GIL,
+by a ProcessPoolExecutor. The pool's queue is bounded: at most
+INVOICE_RENDER_QUEUE_SIZE invoices are claimed at a time per app worker,
+the rest wait in the invoices table (durable, shared by all workers).
+
+With INVOICE_RENDER_MODE=lazy nothing is rendered up front; downloads
+render on demand (get_pdf). Either way one PDF is rendered once: callers
+in a worker share one render task and workers take a per-file lock.
+Finished PDFs are handed to the storage backend (transactions/storage).
+"""
+import asyncio
+import multiprocessing
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Deque, Dict, Optional, Set
+
+from fastapi.concurrency import run_in_threadpool
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.modules.transactions import invoice_cache
+from app.modules.transactions.models import Invoice, InvoiceRenderStatus
+from app.modules.transactions.pdf_worker import render_pdf, warm_up
+from app.modules.transactions.services import InvoiceService
+from app.modules.transactions.storage import get_storage, is_storage_key
+
+
+class InvoiceRenderer:
+    """Feeds pending invoices to the render process pool"""
+
+    def __init__(self):
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._on_slot_free: Optional[Callable[[], None]] = None
+        self._render_ms: Deque[float] = deque(maxlen=1000)
+        self._rendered = 0
+        self._failed = 0
+        self._cache_hits = 0
+        self._deduplicated = 0
+
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn: forking a process that runs threads (listener, threadpool) isn't safe
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.INVOICE_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=warm_up
+            )
+        return self._pool
+
+    def on_slot_free(self, callback: Callable[[], None]):
+        """Called whenever a render finishes (wakes the renderer task)"""
+        self._on_slot_free = callback
+
+    @staticmethod
+    def _claim(limit: int):
+        db = SessionLocal()
+        try:
+            return InvoiceService.claim_render_batch(db, limit)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _finish(job: Dict[str, Any], error: Optional[str]):
+        db = SessionLocal()
+        try:
+            InvoiceService.finish_render(db, job["invoice_id"], job["attempts"], job["key"], error)
+        finally:
+            db.close()
+
+    async def _render_file(self, job: Dict[str, Any]):
+        """Render and store the job's PDF unless it is already stored (cross-process lock held meanwhile)"""
+        storage = get_storage()
+        staging_path = await run_in_threadpool(storage.staging_path, job["key"])
+        lock = await run_in_threadpool(invoice_cache.acquire_render_lock, staging_path)
+        try:
+            if await run_in_threadpool(storage.size, job["key"]) is not None:
+                self._cache_hits += 1
+                return
+            try:
+                seconds = await asyncio.get_running_loop().run_in_executor(
+                    self.pool, render_pdf, job["html"], staging_path
+                )
+            except BrokenProcessPool:
+                # A render process died (e.g. OOM); start a fresh pool for the next ones
+                self._pool = None
+                raise
+            await run_in_threadpool(storage.commit, job["key"], staging_path)
+            self._render_ms.append(seconds * 1000)
+            self._rendered += 1
+        finally:
+            invoice_cache.release_render_lock(lock)
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def _render_once(self, job: Dict[str, Any]):
+        """Single-flight: concurrent requests for the same PDF share one render
+
+        The render runs in its own task, so a caller that goes away (client
+        disconnect) doesn't cancel it for the others.
+        """
+        task = self._inflight.get(job["key"])
+        if task is None:
+            task = asyncio.create_task(self._render_file(job))
+            self._inflight[job["key"]] = task
+            task.add_done_callback(lambda done: self._forget(job["key"], done))
+        else:
+            self._deduplicated += 1
+        await asyncio.shield(task)
+
+    async def render(self, key: str, html: str):
+        """Render html into storage under key unless it is stored already (documents other than invoices)"""
+        await self._render_once({"key": key, "html": html})
+
+    async def _render(self, job: Dict[str, Any]):
+        error = None
+        try:
+            await self._render_once(job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {str(e)}"
+            self._failed += 1
+
+        try:
+            await run_in_threadpool(InvoiceRenderer._finish, job, error)
+        except Exception as e:
+            # Lease expires and the invoice is claimed again
+            print(f"[INVOICE-RENDER ERROR] Saving Invoice #{job['invoice_id']} failed: {str(e)}")
+
+    @staticmethod
+    def _lookup(order_id: int) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            invoice = db.query(
+                Invoice.id, Invoice.order_id, Invoice.invoice_number, Invoice.render_attempts, Invoice.pdf_url
+            ).filter(Invoice.order_id == order_id).first()
+            if invoice is None:
+                return None
+            if is_storage_key(invoice.pdf_url) and get_storage().size(invoice.pdf_url) is not None:
+                return {"invoice_number": invoice.invoice_number, "key": invoice.pdf_url}
+            job = InvoiceService.build_render_jobs(db, [invoice])[0]
+            job["invoice_number"] = invoice.invoice_number
+            return job
+        finally:
+            db.close()
+
+    async def get_pdf(self, order_id: int) -> Optional[Dict[str, str]]:
+        """invoice_number + storage key for an order, rendering the PDF first if needed
+
+        Used by downloads: renders lazily (INVOICE_RENDER_MODE=lazy) or again
+        after the cached file was evicted. None if the order has no invoice.
+        """
+        job = await run_in_threadpool(InvoiceRenderer._lookup, order_id)
+        if job is None:
+            return None
+        if "html" not in job:
+            self._cache_hits += 1
+            return job
+
+        await self._render_once(job)
+        # Also queues the invoice email if this was the first render (eager mode)
+        await run_in_threadpool(InvoiceRenderer._finish, job, None)
+        return {"invoice_number": job["invoice_number"], "key": job["key"]}
+
+    def _done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if self._on_slot_free:
+            self._on_slot_free()
+
+    async def fill(self) -> int:
+        """Claim as many due invoices as there are free queue slots, returns number claimed"""
+        free = settings.INVOICE_RENDER_QUEUE_SIZE - len(self._tasks)
+        if free <= 0:
+            return 0
+        jobs = await run_in_threadpool(InvoiceRenderer._claim, free)
+        for job in jobs:
+            task = asyncio.create_task(self._render(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._done)
+        return len(jobs)
+
+    async def stop(self):
+        """Wait for in-flight renders, then stop the pool"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+    @staticmethod
+    def _pending_count() -> int:
+        db = SessionLocal()
+        try:
+            return db.query(Invoice).filter(Invoice.render_status == InvoiceRenderStatus.PENDING).count()
+        finally:
+            db.close()
+
+    async def get_metrics(self) -> Dict[str, Any]:
+        render_ms = sorted(self._render_ms)
+        return {
+            "workers": settings.INVOICE_RENDER_WORKERS,
+            "queue_size": settings.INVOICE_RENDER_QUEUE_SIZE,
+            "in_flight": len(self._tasks),
+            "queue_depth": await run_in_threadpool(InvoiceRenderer._pending_count),  # All workers, incl. in flight
+            "rendered": self._rendered,
+            "failed": self._failed,
+            "cache_hits": self._cache_hits,
+            "deduplicated_renders": self._deduplicated,
+            "render_ms_avg": round(sum(render_ms) / len(render_ms), 1) if render_ms else None,
+            "render_ms_p50": round(render_ms[len(render_ms) // 2], 1) if render_ms else None,
+            "render_ms_p95": round(render_ms[int(len(render_ms) * 0.95)], 1) if render_ms else None,
+        }
+
+
+# Satu renderer per proses
+renderer = InvoiceRenderer()
+
+
+async def render_invoices() -> bool:
+    """Periodic job: top up the render pool (woken by NOTIFY and finished renders)"""
+    if settings.INVOICE_RENDER_MODE == "lazy":
+        return False
+    await renderer.fill()
+    return False
@@ -3,10 +3,11 @@ API Router for Transaction Module
 Dev 2: Transaction, Billing & Order Engine
 """
 from datetime import datetime
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks, Header
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from fastapi.responses import FileResponse
+from fastapi.responses import StreamingResponse
 
 from app.dependencies import get_db
 from app.modules.transactions.services import (
@@ -15,17 +16,31 @@ from app.modules.transactions.services import (
     PaymentService,
     InvoiceService,
     ReportingService,
+    ExportService,
     PricingPlanCreate,
     PricingPlanUpdate,
     TemplateCreate,
     TemplateUpdate,
     OrderCreate,
+    OrderBulkCreate,
+    OrderSearchFilters,
     OrderCancel
 )
-from app.modules.transactions.models import OrderStatus, PaymentStatus
-from app.modules.transactions import services, models, schemas 
-
+from app.modules.transactions.idempotency import IdempotencyService
+from app.modules.transactions.inbox import WebhookInboxService
+from app.modules.transactions.gateways import get_gateway
+from app.modules.transactions.midtrans import midtrans_client
+from app.modules.transactions.reconciliation import PaymentReconciler
+from app.modules.transactions.rendering import renderer as invoice_renderer
+from app.modules.transactions.invoice_email import mailer as invoice_mailer
+from app.modules.transactions.statements import StatementService, generator as statement_generator, parse_period
+from app.modules.transactions.storage import get_storage, is_storage_key, verify_download
+from app.modules.transactions.models import OrderStatus, PaymentStatus, PaymentGateway
+from app.modules.transactions import services, models, schemas, status_stream, invoice_export
+
+from app.core import resilience
 from app.core.config import settings
+from app.core.resilience import CircuitOpenError
 
 
 # Create router
@@ -269,23 +284,8 @@ def get_subscription_plans(
 
 # ==================== ORDER ENDPOINTS ====================
 
-@router.post("/orders", status_code=status.HTTP_201_CREATED, tags=["Orders"])
-def create_order(
-    order: OrderCreate,
-    db: Session = Depends(get_db)
-):
-    """Create a new order"""
-    db_order = OrderService.create_order(db, order)
-    if not db_order:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Invalid pricing plan or template"
-        )
-
-    from app.modules.transactions.models import OrderItem
-    order_items = db.query(OrderItem).filter(OrderItem.order_id == db_order.id).all()
-
-
+def _order_to_dict(db_order) -> dict:
+    """Response body for a newly created order (items already loaded)"""
     return {
         "id": db_order.id,
         "user_id": db_order.user_id,
@@ -300,11 +300,80 @@ def create_order(
                 "item_name": item.item_name,
                 "price": float(item.price)
             }
-            for item in order_items
+            for item in db_order.order_items
         ]
     }
 
 
+def _create_order_response(db: Session, order: OrderCreate) -> dict:
+    """Create the order and build its response body (sync, runs in threadpool)"""
+    db_order = OrderService.create_order(db, order)
+    if not db_order:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pricing plan or template"
+        )
+    return _order_to_dict(db_order)
+
+
+def _create_orders_bulk_response(db: Session, bulk: OrderBulkCreate) -> dict:
+    """Create orders in bulk and build per-entry results (sync, runs in threadpool)"""
+    results = OrderService.create_orders_bulk(db, bulk.orders)
+    created = sum(1 for result in results if result["success"])
+    return {
+        "total": len(results),
+        "created": created,
+        "failed": len(results) - created,
+        "results": [
+            {
+                "index": result["index"],
+                "success": result["success"],
+                "order": _order_to_dict(result["order"]) if result["success"] else None,
+                "error": result.get("error")
+            }
+            for result in results
+        ]
+    }
+
+
+@router.post("/orders", status_code=status.HTTP_201_CREATED, tags=["Orders"])
+async def create_order(
+    order: OrderCreate,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
+    """Create a new order (send an Idempotency-Key header to make retries safe)"""
+    async def handler():
+        return await run_in_threadpool(_create_order_response, db, order)
+
+    if not idempotency_key:
+        return await handler()
+
+    return await IdempotencyService.execute(
+        db, "orders.create", idempotency_key, order, handler,
+        status_code=status.HTTP_201_CREATED
+    )
+
+
+@router.post("/orders/bulk", tags=["Orders"])
+async def create_orders_bulk(
+    bulk: OrderBulkCreate,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
+    """Create many orders in one transaction (agency/reseller checkout)
+
+    Invalid entries are reported per index and do not block the valid ones.
+    """
+    async def handler():
+        return await run_in_threadpool(_create_orders_bulk_response, db, bulk)
+
+    if not idempotency_key:
+        return await handler()
+
+    return await IdempotencyService.execute(db, "orders.bulk_create", idempotency_key, bulk, handler)
+
+
 @router.get("/orders", tags=["Orders"])
 def get_user_orders(
     user_id: int = Query(...),
@@ -344,6 +413,64 @@ def get_user_orders(
     }
 
 
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson"
+}
+
+
+@router.get("/orders/export", tags=["Orders"])
+def export_orders(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    order_status: Optional[OrderStatus] = Query(None, alias="status")
+):
+    """Stream all matching orders as CSV or NDJSON (finance reconciliation)"""
+    return StreamingResponse(
+        ExportService.export_orders(format, start_date, end_date, order_status),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="orders.{format}"'}
+    )
+
+
+@router.get("/orders/search", tags=["Orders"])
+def search_orders(
+    order_status: Optional[List[OrderStatus]] = Query(None, alias="status"),
+    created_from: Optional[datetime] = Query(None),
+    created_to: Optional[datetime] = Query(None),
+    min_amount: Optional[float] = Query(None, ge=0),
+    max_amount: Optional[float] = Query(None, ge=0),
+    pricing_plan_id: Optional[int] = Query(None),
+    template_id: Optional[int] = Query(None),
+    payment_method: Optional[str] = Query(None),
+    user_id: Optional[int] = Query(None),
+    cursor: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    facets: bool = Query(False),
+    db: Session = Depends(get_db)
+):
+    """Admin order search (support & finance) with cursor paging and status facets"""
+    filters = OrderSearchFilters(
+        statuses=order_status,
+        created_from=created_from,
+        created_to=created_to,
+        min_amount=min_amount,
+        max_amount=max_amount,
+        pricing_plan_id=pricing_plan_id,
+        template_id=template_id,
+        payment_method=payment_method,
+        user_id=user_id
+    )
+    try:
+        return OrderService.search_orders(db, filters, cursor, limit, facets)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
 @router.get("/orders/{order_id}", tags=["Orders"])
 def get_order(
     order_id: int,
@@ -412,41 +539,115 @@ def cancel_order(
 @router.post("/payments/create", tags=["Payments"])
 async def create_payment(
     order_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
 ):
-    """Create a payment link for an order"""
+    """Create a payment link for an order (send an Idempotency-Key header to make retries safe)"""
     payment_url = f"{settings.API_V1_STR}/payments" if hasattr(settings, 'API_V1_STR') else "http://localhost:8000"
 
-    try:
-        result = await PaymentService.create_payment_link(db, order_id, payment_url)
-        return {
-            "order_id": order_id,
-            "payment_url": result["payment_url"],
-            "transaction_id": result["transaction_id"]
-        }
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Failed to create payment: {str(e)}"
-        )
+    async def handler():
+        try:
+            result = await PaymentService.create_payment_link(db, order_id, payment_url)
+            return {
+                "order_id": order_id,
+                "payment_url": result["payment_url"],
+                "transaction_id": result["transaction_id"]
+            }
+        except CircuitOpenError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Payment gateway unavailable: {str(e)}",
+                headers={"Retry-After": str(max(int(e.retry_in), 1))}
+            )
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to create payment: {str(e)}"
+            )
+
+    if not idempotency_key:
+        return await handler()
+
+    return await IdempotencyService.execute(
+        db, "payments.create", idempotency_key, {"order_id": order_id}, handler
+    )
 
 
-@router.post("/payments/webhooks/midtrans", tags=["Payments"])
-def midtrans_webhook(
+@router.get("/payments/export", tags=["Payments"])
+def export_payments(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    start_date: Optional[datetime] = Query(None),
+    end_date: Optional[datetime] = Query(None),
+    payment_status: Optional[PaymentStatus] = Query(None, alias="status")
+):
+    """Stream all matching payments as CSV or NDJSON (finance reconciliation)"""
+    return StreamingResponse(
+        ExportService.export_payments(format, start_date, end_date, payment_status),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="payments.{format}"'}
+    )
+
+
+@router.post("/payments/webhooks/{gateway}", tags=["Payments"])
+async def payment_webhook(
+    gateway: PaymentGateway,
     webhook_data: dict,
     db: Session = Depends(get_db)
 ):
-    """Handle Midtrans webhook notifications"""
-    # TODO: Verify signature key from Midtrans
-    success = PaymentService.handle_webhook(db, webhook_data)
-    if not success:
+    """Verify a gateway notification and queue it (applied by the webhook inbox worker)"""
+    try:
+        gateway_client = get_gateway(gateway)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+
+    notification = gateway_client.parse_notification(webhook_data)
+    if notification is None:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid webhook data"
         )
+    if not gateway_client.verify_notification(webhook_data):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Invalid signature"
+        )
+
+    await run_in_threadpool(WebhookInboxService.receive, db, gateway, notification)
     return {"status": "success"}
 
 
+@router.post("/payments/webhooks/inbox/{entry_id}/retry", tags=["Payments"])
+def retry_webhook(
+    entry_id: int,
+    db: Session = Depends(get_db)
+):
+    """Requeue a dead-lettered webhook notification"""
+    if not WebhookInboxService.retry(db, entry_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Dead-lettered webhook not found"
+        )
+    return {"status": "requeued"}
+
+
+@router.post("/payments/reconcile", tags=["Payments"])
+async def reconcile_payments(stale_minutes: Optional[int] = Query(None, ge=0)):
+    """Check stale pending payments against the gateway status API now"""
+    return await PaymentReconciler.reconcile(stale_minutes=stale_minutes)
+
+
+@router.get("/payments/gateway-metrics", tags=["Payments"])
+def get_gateway_metrics():
+    """Outbound gateway stats for this worker (connection reuse, latency, circuit breakers)"""
+    return {
+        "midtrans_client": midtrans_client.get_metrics(),
+        "policies": resilience.get_metrics()
+    }
+
+
 @router.get("/payments/by-order/{order_id}", tags=["Payments"])
 def get_payment_status(
     order_id: int,
@@ -462,52 +663,151 @@ def get_payment_status(
     return payment
 
 
+@router.get("/payments/by-order/{order_id}/events", tags=["Payments"])
+async def stream_payment_status(order_id: int):
+    """Server-sent events with the order/payment status (replaces polling by-order)
+
+    Sends the current status, then one `payment_status` event per change;
+    the stream ends once the order is no longer pending.
+    """
+    stream = await status_stream.open_stream(order_id)
+    if stream is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order not found"
+        )
+    return StreamingResponse(
+        stream,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ==================== INVOICE ENDPOINTS ====================
 
-@router.get("/invoices/{order_id}", tags=["Invoices"])
-def get_invoice(
-    order_id: int,
-    db: Session = Depends(get_db)
+@router.get("/invoices/render-metrics", tags=["Invoices"])
+async def get_invoice_render_metrics():
+    """PDF render pool stats for this worker (queue depth, render time)"""
+    return await invoice_renderer.get_metrics()
+
+
+@router.get("/invoices/email-metrics", tags=["Invoices"])
+def get_invoice_email_metrics():
+    """Invoice mailer stats for this worker (SMTP connection reuse, send time)"""
+    return invoice_mailer.get_metrics()
+
+
+@router.get("/invoices/export", tags=["Invoices"])
+def export_invoices(
+    start_date: datetime = Query(..., alias="from"),
+    end_date: datetime = Query(..., alias="to")
 ):
-    """Get/download invoice PDF for an order"""
-    invoice = InvoiceService.get_invoice(db, order_id)
+    """Stream all invoice PDFs in a created_at range as a ZIP with manifest.csv (accounting)"""
+    if end_date < start_date:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="'to' must not be before 'from'"
+        )
+    filename = f"invoices_{start_date:%Y%m%d}_{end_date:%Y%m%d}.zip"
+    return StreamingResponse(
+        invoice_export.export_invoices(start_date, end_date),
+        media_type="application/zip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/invoices/files/{key}", tags=["Invoices"])
+def download_invoice_file(
+    key: str,
+    filename: str = Query(...),
+    expires: int = Query(...),
+    signature: str = Query(...)
+):
+    """Download via a signed URL from /invoices/{order_id}/download-url (local storage backend)"""
+    if settings.INVOICE_STORAGE_BACKEND != "local" or not is_storage_key(key):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Invoice file not found")
+    if not verify_download(key, filename, expires, signature):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Download link is invalid or expired")
+    return get_storage().response(key, filename)
+
+
+async def _stored_pdf(db: Session, order_id: int) -> Tuple[models.Invoice, Optional[dict]]:
+    """An order's invoice and its PDF (invoice_number + storage key, rendered now if needed)
+
+    The PDF is None while it is still pending in eager mode.
+    """
+    invoice = await run_in_threadpool(InvoiceService.get_invoice, db, order_id)
     if not invoice:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Invoice not found"
         )
+    if not invoice.pdf_url and settings.INVOICE_RENDER_MODE != "lazy":
+        return invoice, None
+    try:
+        return invoice, await invoice_renderer.get_pdf(order_id)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to render invoice: {str(e)}"
+        )
 
-    if invoice.pdf_url:
-        return FileResponse(
-            path=invoice.pdf_url,
-            filename=f"{invoice.invoice_number}.pdf",
-            media_type="application/pdf"
+
+@router.get("/invoices/{order_id}/download-url", tags=["Invoices"])
+async def get_invoice_download_url(
+    order_id: int,
+    db: Session = Depends(get_db)
+):
+    """Short-lived signed URL for the invoice PDF (e.g. for email links or the frontend)"""
+    _, pdf = await _stored_pdf(db, order_id)
+    if pdf is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Invoice PDF is still being rendered"
         )
+    expires_in = settings.INVOICE_DOWNLOAD_URL_TTL_SECONDS
+    return {
+        "url": get_storage().signed_url(pdf["key"], f"{pdf['invoice_number']}.pdf", expires_in),
+        "expires_in": expires_in
+    }
+
+
+@router.get("/invoices/{order_id}", tags=["Invoices"])
+async def get_invoice(
+    order_id: int,
+    db: Session = Depends(get_db)
+):
+    """Get/download invoice PDF for an order (rendered on first download in lazy mode)"""
+    invoice, pdf = await _stored_pdf(db, order_id)
+    if pdf is not None:
+        # Local: served with Range support (sendfile via the proxy if configured), s3: redirect to a signed URL
+        return get_storage().response(pdf["key"], f"{pdf['invoice_number']}.pdf")
 
+    # Eager mode, PDF still rendering
     return {
         "id": invoice.id,
         "order_id": invoice.order_id,
         "invoice_number": invoice.invoice_number,
+        "render_status": invoice.render_status.value,
         "sent_via_email": invoice.sent_via_email,
         "sent_at": invoice.sent_at,
         "created_at": invoice.created_at
     }
 
 
-@router.post("/invoices/{order_id}/resend", tags=["Invoices"])
+@router.post("/invoices/{order_id}/resend", status_code=status.HTTP_202_ACCEPTED, tags=["Invoices"])
 def resend_invoice(
     order_id: int,
-    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
-    """Resend invoice to customer email"""
+    """Resend invoice to customer email (queued, sent by the invoice mailer)"""
     success = InvoiceService.resend_invoice_email(db, order_id)
     if not success:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Invoice not found"
         )
-    return {"message": "Invoice resent successfully"}
+    return {"message": "Invoice email queued"}
 
 
 @router.post("/invoices/generate/{order_id}", tags=["Invoices"])
@@ -515,7 +815,7 @@ def generate_invoice(
     order_id: int,
     db: Session = Depends(get_db)
 ):
-    """Manually trigger invoice generation for a paid order"""
+    """Manually trigger invoice generation for a paid order (the PDF renders in the background)"""
     try:
         invoice = InvoiceService.generate_invoice(db, order_id)
         if not invoice:
@@ -527,6 +827,7 @@ def generate_invoice(
             "id": invoice.id,
             "order_id": invoice.order_id,
             "invoice_number": invoice.invoice_number,
+            "render_status": invoice.render_status.value,
             "pdf_url": invoice.pdf_url
         }
     except ValueError as e:
@@ -541,6 +842,62 @@ def generate_invoice(
         )
 
 
+# ==================== STATEMENT ENDPOINTS ====================
+
+def _statement_period(period: str):
+    try:
+        return parse_period(period)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+@router.post("/statements/runs", status_code=status.HTTP_202_ACCEPTED, tags=["Statements"])
+def start_statement_run(
+    period: str = Query(..., description="Finished month, YYYY-MM"),
+    restart: bool = Query(False, description="Start a finished run over (e.g. after a template change)"),
+    db: Session = Depends(get_db)
+):
+    """Start the monthly statement run for a month (runs in the background, resumes if interrupted)"""
+    return StatementService.start_run(db, _statement_period(period), restart=restart)
+
+
+@router.get("/statements/runs/{period}", tags=["Statements"])
+def get_statement_run(
+    period: str,
+    db: Session = Depends(get_db)
+):
+    """Progress of a month's statement run"""
+    run = StatementService.get_run(db, _statement_period(period))
+    if run is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Statement run not found"
+        )
+    return run
+
+
+@router.get("/statements/{user_id}/{period}", tags=["Statements"])
+async def get_statement(user_id: int, period: str):
+    """Download a user's monthly statement PDF (rendered now if the run hasn't produced it)"""
+    period_start = _statement_period(period)
+    try:
+        key = await statement_generator.get_pdf(user_id, period_start)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to render statement: {str(e)}"
+        )
+    if key is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No paid orders in this period"
+        )
+    return get_storage().response(key, f"statement-{period_start:%Y-%m}-{user_id}.pdf")
+
+
 # ==================== REPORTING ENDPOINTS ====================
 
 @router.get("/reports/mrr", tags=["Reports"])
@@ -2,24 +2,42 @@
 Business Logic Services for Transaction Module
 Dev 2: Transaction, Billing & Order Engine
 """
-from datetime import datetime, timedelta
-from typing import Optional, List, Dict, Any
+from datetime import date, datetime, timedelta
+from typing import Optional, List, Dict, Any, Tuple, Iterator
 from sqlalchemy.orm import Session
-from sqlalchemy import func, extract, case, and_, or_
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy import func, extract, case, and_, or_, select, insert, update, tuple_, true
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from decimal import Decimal
 import httpx
+import asyncio
 import os
 import base64
+import csv
+import enum
+import io
+import json
 from pathlib import Path
 
 from app.modules.transactions.models import (
     PricingPlan, Template, SubscriptionPlan, Order, OrderItem,
-    Payment, Invoice, OrderStatus, PaymentStatus, PaymentGateway, OrderItemType
+    Payment, PaymentEvent, Invoice, InvoiceEmail, InvoiceEmailStatus, InvoiceRenderStatus, InvoiceSequence,
+    OrderStatus, PaymentStatus, PaymentGateway, OrderItemType
 )
 
-# [REVISION] Import Dev 3 Modules for Project Automation
-from app.modules.service_delivery import services as delivery_services
-from app.modules.service_delivery import schemas as delivery_schemas
+from app.core.background import claim_due, retry_at
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.notify import notify
+from app.modules.auth_user.models import User
+
+from app.modules.transactions.outbox import OutboxService, ORDER_PAID, PAYMENT_LATE_SETTLEMENT
+from app.modules.transactions.gateways import ChargeResult, GatewayStatus, get_gateway
+from app.modules.transactions.status_stream import publish_status, publish_statuses
+from app.modules.transactions import invoice_cache
+from app.modules.transactions.invoice_template import render_invoice_html
 
 # ==================== PYDANTIC SCHEMAS ====================
 
@@ -71,6 +89,22 @@ class OrderCreate(BaseModel):
     custom_price: Optional[float] = None
 
 
+class OrderBulkCreate(BaseModel):
+    orders: List[OrderCreate] = Field(..., min_length=1, max_length=500)
+
+
+class OrderSearchFilters(BaseModel):
+    statuses: Optional[List[OrderStatus]] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    min_amount: Optional[float] = None
+    max_amount: Optional[float] = None
+    pricing_plan_id: Optional[int] = None
+    template_id: Optional[int] = None
+    payment_method: Optional[str] = None
+    user_id: Optional[int] = None
+
+
 class OrderCancel(BaseModel):
     reason: Optional[str] = None
 
@@ -223,93 +257,287 @@ class ProductService:
         return results
 
 
+# ==================== STATUS TRANSITIONS ====================
+
+class StatusTransitions:
+    """Allowed order / payment status changes; anything else is a no-op
+
+    Callers lock the row (SELECT ... FOR UPDATE) before applying, so
+    concurrent duplicates see the already-applied status and do nothing.
+    """
+
+    ORDER = {
+        OrderStatus.PENDING: {OrderStatus.PAID, OrderStatus.CANCELLED, OrderStatus.EXPIRED},
+        OrderStatus.PAID: {OrderStatus.REFUNDED},
+        OrderStatus.CANCELLED: set(),
+        OrderStatus.EXPIRED: set(),
+        OrderStatus.REFUNDED: set(),
+    }
+
+    PAYMENT = {
+        PaymentStatus.PENDING: {PaymentStatus.SUCCESS, PaymentStatus.FAILED, PaymentStatus.CANCELLED},
+        PaymentStatus.SUCCESS: set(),
+        PaymentStatus.FAILED: set(),
+        PaymentStatus.CANCELLED: set(),
+    }
+
+    @staticmethod
+    def apply_order(db_order: Order, target: OrderStatus) -> bool:
+        """Move the order to target if allowed, returns True when the status changed"""
+        if target not in StatusTransitions.ORDER[db_order.status]:
+            if db_order.status != target:
+                print(f"[ORDER] Ignored transition {db_order.status.value} -> {target.value} for Order #{db_order.id}")
+            return False
+        db_order.status = target
+        if target == OrderStatus.PAID:
+            db_order.paid_at = datetime.utcnow()
+        return True
+
+    @staticmethod
+    def apply_payment(db_payment: Payment, target: PaymentStatus) -> bool:
+        """Move the payment to target if allowed, returns True when the status changed"""
+        if target not in StatusTransitions.PAYMENT[db_payment.status]:
+            if db_payment.status != target:
+                print(f"[PAYMENT] Ignored transition {db_payment.status.value} -> {target.value} for Payment #{db_payment.id}")
+            return False
+        db_payment.status = target
+        if target == PaymentStatus.SUCCESS:
+            db_payment.paid_at = datetime.utcnow()
+        return True
+
+
 # ==================== ORDER SERVICE ====================
 
 class OrderService:
     """Service for managing orders"""
 
     @staticmethod
-    def create_order(db: Session, order_data: OrderCreate) -> Optional[Order]:
-        """Create a new order with validation and price calculation"""
-        # Validate pricing plan exists and is active
-        pricing_plan = db.query(PricingPlan).filter(
-            PricingPlan.id == order_data.pricing_plan_id,
-            PricingPlan.is_active == True
+    def _load_catalog(db: Session, pricing_plan_id: int, template_id: Optional[int]):
+        """Fetch the active pricing plan and (optional) active template in one query"""
+        return db.execute(
+            select(PricingPlan, Template).outerjoin(
+                Template, and_(Template.id == template_id, Template.is_active == True)
+            ).where(
+                PricingPlan.id == pricing_plan_id,
+                PricingPlan.is_active == True
+            )
         ).first()
-        if not pricing_plan:
-            return None
 
-        # Validate template if provided
-        template = None
-        if order_data.template_id:
-            template = db.query(Template).filter(
-                Template.id == order_data.template_id,
-                Template.is_active == True
-            ).first()
-            if not template:
-                return None
-
-        # Calculate total price
+    @staticmethod
+    def _calculate_total(pricing_plan: PricingPlan, template: Optional[Template], custom_price: Optional[float]) -> Decimal:
+        """Calculate order total: plan price + template adjustment, or the custom price override"""
         total_price = Decimal(str(pricing_plan.price))
         if template:
             total_price += Decimal(str(template.price_adjustment))
-        if order_data.custom_price:
-            total_price = Decimal(str(order_data.custom_price))
-
-        # Create or find subscription plan
-        subscription_plan = db.query(SubscriptionPlan).filter(
-            SubscriptionPlan.pricing_plan_id == order_data.pricing_plan_id,
-            SubscriptionPlan.template_id == order_data.template_id
-        ).first()
+        if custom_price:
+            total_price = Decimal(str(custom_price))
+        return total_price
 
-        if not subscription_plan:
-            subscription_plan = SubscriptionPlan(
-                pricing_plan_id=order_data.pricing_plan_id,
-                template_id=order_data.template_id,
-                custom_price=order_data.custom_price
-            )
-            db.add(subscription_plan)
-            db.flush()
+    @staticmethod
+    def _build_item_rows(order_id: int, pricing_plan: PricingPlan, template: Optional[Template]) -> List[Dict[str, Any]]:
+        """Order item rows for a plan and optional template"""
+        item_rows = [{
+            "order_id": order_id,
+            "item_type": OrderItemType.PRICING_PLAN,
+            "item_id": pricing_plan.id,
+            "item_name": pricing_plan.name,
+            "price": pricing_plan.price
+        }]
+        if template:
+            item_rows.append({
+                "order_id": order_id,
+                "item_type": OrderItemType.TEMPLATE,
+                "item_id": template.id,
+                "item_name": f"Template: {template.name}",
+                "price": template.price_adjustment
+            })
+        return item_rows
 
-        # Create order
-        db_order = Order(
-            user_id=order_data.user_id,
-            subscription_plan_id=subscription_plan.id,
-            status=OrderStatus.PENDING,
-            total_price=total_price
+    @staticmethod
+    def _upsert_subscription_plan(
+        db: Session,
+        pricing_plan_id: int,
+        template_id: Optional[int],
+        custom_price: Optional[float] = None
+    ) -> int:
+        """Find or create a subscription plan with INSERT ... ON CONFLICT DO NOTHING"""
+        inserted = pg_insert(SubscriptionPlan).values(
+            pricing_plan_id=pricing_plan_id,
+            template_id=template_id,
+            custom_price=custom_price
+        ).on_conflict_do_nothing(
+            constraint="uq_subscription_plans_plan_template"
+        ).returning(SubscriptionPlan.id).cte("inserted")
+
+        existing = select(SubscriptionPlan.id).where(
+            SubscriptionPlan.pricing_plan_id == pricing_plan_id,
+            SubscriptionPlan.template_id == template_id
         )
-        db.add(db_order)
-        db.flush()
 
-        # Create order items
-        OrderItem(
-            order_id=db_order.id,
-            item_type=OrderItemType.PRICING_PLAN,
-            item_id=pricing_plan.id,
-            item_name=pricing_plan.name,
-            price=pricing_plan.price
-        )
-        db.add(OrderItem(
-            order_id=db_order.id,
-            item_type=OrderItemType.PRICING_PLAN,
-            item_id=pricing_plan.id,
-            item_name=pricing_plan.name,
-            price=pricing_plan.price
-        ))
+        subscription_plan_id = db.execute(
+            select(inserted.c.id).union_all(existing).limit(1)
+        ).scalar()
+        if subscription_plan_id is None:
+            # Conflicting row was committed by a concurrent checkout after our snapshot
+            subscription_plan_id = db.execute(existing).scalar()
+        return subscription_plan_id
 
-        if template:
-            db.add(OrderItem(
-                order_id=db_order.id,
-                item_type=OrderItemType.TEMPLATE,
-                item_id=template.id,
-                item_name=f"Template: {template.name}",
-                price=template.price_adjustment
-            ))
+    @staticmethod
+    def create_order(db: Session, order_data: OrderCreate) -> Optional[Order]:
+        """Create a new order with validation and price calculation
 
+        Runs a constant number of statements: catalog lookup, subscription plan
+        upsert, order INSERT ... RETURNING, one multi-row item INSERT ... RETURNING.
+        """
+        # Validate pricing plan and template (if provided) are active
+        catalog = OrderService._load_catalog(db, order_data.pricing_plan_id, order_data.template_id)
+        if not catalog:
+            return None
+        pricing_plan, template = catalog
+        if order_data.template_id and not template:
+            return None
+
+        total_price = OrderService._calculate_total(pricing_plan, template, order_data.custom_price)
+        subscription_plan_id = OrderService._upsert_subscription_plan(
+            db, order_data.pricing_plan_id, order_data.template_id, order_data.custom_price
+        )
+
+        # Create order
+        db_order = db.scalars(
+            insert(Order).returning(Order),
+            [{
+                "user_id": order_data.user_id,
+                "subscription_plan_id": subscription_plan_id,
+                "status": OrderStatus.PENDING,
+                "total_price": total_price
+            }]
+        ).one()
+
+        # Create order items (single multi-row INSERT)
+        item_rows = OrderService._build_item_rows(db_order.id, pricing_plan, template)
+        order_items = db.scalars(
+            insert(OrderItem).returning(OrderItem, sort_by_parameter_order=True),
+            item_rows
+        ).all()
+        set_committed_value(db_order, "order_items", order_items)
+
+        # Detach before commit so the RETURNING values are kept (no refresh round-trip)
+        db.expunge(db_order)
         db.commit()
-        db.refresh(db_order)
         return db_order
 
+    @staticmethod
+    def _upsert_subscription_plans(
+        db: Session,
+        combos: Dict[Tuple[int, Optional[int]], Optional[float]]
+    ) -> Dict[Tuple[int, Optional[int]], int]:
+        """Find or create many subscription plans: one multi-row upsert plus one lookup"""
+        db.execute(
+            pg_insert(SubscriptionPlan).values([
+                {"pricing_plan_id": plan_id, "template_id": template_id, "custom_price": custom_price}
+                for (plan_id, template_id), custom_price in combos.items()
+            ]).on_conflict_do_nothing(constraint="uq_subscription_plans_plan_template")
+        )
+        rows = db.execute(
+            select(SubscriptionPlan.id, SubscriptionPlan.pricing_plan_id, SubscriptionPlan.template_id).where(
+                SubscriptionPlan.pricing_plan_id.in_({plan_id for plan_id, _ in combos})
+            )
+        ).all()
+        return {
+            (row.pricing_plan_id, row.template_id): row.id
+            for row in rows
+            if (row.pricing_plan_id, row.template_id) in combos
+        }
+
+    @staticmethod
+    def create_orders_bulk(db: Session, entries: List[OrderCreate]) -> List[Dict[str, Any]]:
+        """Create many orders in one transaction with per-entry results
+
+        All entries are validated against the catalog in one pass; invalid
+        entries are reported and skipped, valid ones are inserted with
+        multi-row INSERT ... RETURNING statements and committed together.
+        """
+        plan_ids = {entry.pricing_plan_id for entry in entries}
+        template_ids = {entry.template_id for entry in entries if entry.template_id}
+        user_ids = {entry.user_id for entry in entries}
+
+        plans = {
+            plan.id: plan for plan in db.scalars(
+                select(PricingPlan).where(PricingPlan.id.in_(plan_ids), PricingPlan.is_active == True)
+            )
+        }
+        templates = {
+            template.id: template for template in db.scalars(
+                select(Template).where(Template.id.in_(template_ids), Template.is_active == True)
+            )
+        } if template_ids else {}
+        existing_users = set(db.scalars(select(User.id).where(User.id.in_(user_ids))))
+
+        results: List[Dict[str, Any]] = []
+        valid = []  # (result, entry, pricing_plan, template)
+        for index, entry in enumerate(entries):
+            result: Dict[str, Any] = {"index": index, "success": False}
+            results.append(result)
+
+            pricing_plan = plans.get(entry.pricing_plan_id)
+            template = templates.get(entry.template_id) if entry.template_id else None
+            if entry.user_id not in existing_users:
+                result["error"] = "User not found"
+            elif not pricing_plan:
+                result["error"] = "Invalid pricing plan"
+            elif entry.template_id and not template:
+                result["error"] = "Invalid template"
+            else:
+                valid.append((result, entry, pricing_plan, template))
+
+        if not valid:
+            db.rollback()
+            return results
+
+        combos: Dict[Tuple[int, Optional[int]], Optional[float]] = {}
+        for _, entry, _, _ in valid:
+            combos.setdefault((entry.pricing_plan_id, entry.template_id), entry.custom_price)
+        subscription_plan_ids = OrderService._upsert_subscription_plans(db, combos)
+
+        try:
+            db_orders = db.scalars(
+                insert(Order).returning(Order, sort_by_parameter_order=True),
+                [
+                    {
+                        "user_id": entry.user_id,
+                        "subscription_plan_id": subscription_plan_ids[(entry.pricing_plan_id, entry.template_id)],
+                        "status": OrderStatus.PENDING,
+                        "total_price": OrderService._calculate_total(pricing_plan, template, entry.custom_price)
+                    }
+                    for _, entry, pricing_plan, template in valid
+                ]
+            ).all()
+
+            item_rows = []
+            for db_order, (_, _, pricing_plan, template) in zip(db_orders, valid):
+                item_rows.extend(OrderService._build_item_rows(db_order.id, pricing_plan, template))
+            order_items = db.scalars(
+                insert(OrderItem).returning(OrderItem, sort_by_parameter_order=True),
+                item_rows
+            ).all()
+
+            items_by_order: Dict[int, List[OrderItem]] = {}
+            for item in order_items:
+                items_by_order.setdefault(item.order_id, []).append(item)
+            for db_order in db_orders:
+                set_committed_value(db_order, "order_items", items_by_order.get(db_order.id, []))
+                db.expunge(db_order)
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        for db_order, (result, _, _, _) in zip(db_orders, valid):
+            result["success"] = True
+            result["order"] = db_order
+        return results
+
     @staticmethod
     def get_user_orders(db: Session, user_id: int, skip: int = 0, limit: int = 50) -> List[Order]:
         """Get all orders for a specific user"""
@@ -317,6 +545,119 @@ class OrderService:
             Order.user_id == user_id
         ).order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
 
+    @staticmethod
+    def _encode_cursor(created_at: datetime, order_id: int) -> str:
+        raw = json.dumps({"c": created_at.isoformat(), "i": order_id})
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            return datetime.fromisoformat(raw["c"]), int(raw["i"])
+        except (ValueError, KeyError, TypeError):
+            raise ValueError("Invalid cursor")
+
+    @staticmethod
+    def search_orders(
+        db: Session,
+        filters: OrderSearchFilters,
+        cursor: Optional[str] = None,
+        limit: int = 50,
+        include_facets: bool = False
+    ) -> Dict[str, Any]:
+        """Admin order search: composable filters, keyset pagination, optional status facets
+
+        Everything runs as one statement. Facet counts use COUNT(*) FILTER over the
+        filtered set without the status filter, so they show what each status would return.
+        """
+        conditions = []
+        if filters.created_from:
+            conditions.append(Order.created_at >= filters.created_from)
+        if filters.created_to:
+            conditions.append(Order.created_at <= filters.created_to)
+        if filters.min_amount is not None:
+            conditions.append(Order.total_price >= filters.min_amount)
+        if filters.max_amount is not None:
+            conditions.append(Order.total_price <= filters.max_amount)
+        if filters.user_id:
+            conditions.append(Order.user_id == filters.user_id)
+        if filters.pricing_plan_id or filters.template_id:
+            plan_conditions = []
+            if filters.pricing_plan_id:
+                plan_conditions.append(SubscriptionPlan.pricing_plan_id == filters.pricing_plan_id)
+            if filters.template_id:
+                plan_conditions.append(SubscriptionPlan.template_id == filters.template_id)
+            conditions.append(Order.subscription_plan_id.in_(
+                select(SubscriptionPlan.id).where(*plan_conditions)
+            ))
+        if filters.payment_method:
+            conditions.append(
+                select(Payment.id).where(
+                    Payment.order_id == Order.id,
+                    Payment.payment_method == filters.payment_method
+                ).exists()
+            )
+
+        filtered = select(
+            Order.id, Order.user_id, Order.subscription_plan_id, Order.status,
+            Order.total_price, Order.created_at, Order.paid_at
+        ).where(*conditions).cte("filtered")
+
+        page_conditions = []
+        if filters.statuses:
+            page_conditions.append(filtered.c.status.in_(filters.statuses))
+        if cursor:
+            cursor_created_at, cursor_id = OrderService._decode_cursor(cursor)
+            page_conditions.append(
+                tuple_(filtered.c.created_at, filtered.c.id) < tuple_(cursor_created_at, cursor_id)
+            )
+
+        # Fetch one extra row to know whether there is a next page
+        page = select(filtered).where(*page_conditions).order_by(
+            filtered.c.created_at.desc(), filtered.c.id.desc()
+        ).limit(limit + 1).subquery("page")
+
+        if include_facets:
+            facets = select(*[
+                func.count().filter(filtered.c.status == order_status).label(f"facet_{order_status.value}")
+                for order_status in OrderStatus
+            ]).subquery("facets")
+            stmt = select(page, facets).select_from(facets).outerjoin(page, true())
+        else:
+            stmt = select(page)
+        rows = db.execute(stmt.order_by(page.c.created_at.desc(), page.c.id.desc())).all()
+
+        facet_counts = None
+        if include_facets and rows:
+            facet_counts = {
+                order_status.value: getattr(rows[0], f"facet_{order_status.value}")
+                for order_status in OrderStatus
+            }
+        rows = [row for row in rows if row.id is not None]  # Facets row with an empty page
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = OrderService._encode_cursor(rows[-1].created_at, rows[-1].id)
+
+        return {
+            "items": [
+                {
+                    "id": row.id,
+                    "user_id": row.user_id,
+                    "subscription_plan_id": row.subscription_plan_id,
+                    "status": row.status.value,
+                    "total_price": float(row.total_price),
+                    "created_at": row.created_at,
+                    "paid_at": row.paid_at
+                }
+                for row in rows
+            ],
+            "next_cursor": next_cursor,
+            "facets": facet_counts
+        }
+
     @staticmethod
     def get_order(db: Session, order_id: int) -> Optional[Order]:
         """Get a specific order by ID"""
@@ -325,27 +666,82 @@ class OrderService:
     @staticmethod
     def cancel_order(db: Session, order_id: int, reason: Optional[str] = None) -> Optional[Order]:
         """Cancel a pending order"""
-        db_order = db.query(Order).filter(Order.id == order_id).first()
+        db_order = db.query(Order).filter(Order.id == order_id).with_for_update().first()
         if not db_order:
             return None
 
-        if db_order.status != OrderStatus.PENDING:
+        if not StatusTransitions.apply_order(db_order, OrderStatus.CANCELLED):
+            db.rollback()
             raise ValueError("Only pending orders can be cancelled")
 
-        db_order.status = OrderStatus.CANCELLED
+        publish_status(db, db_order.id, OrderStatus.CANCELLED, None)
         db.commit()
         db.refresh(db_order)
         return db_order
 
+    @staticmethod
+    def expire_stale_orders(db: Session, older_than: datetime, batch_size: int = 500) -> int:
+        """Expire one batch of stale pending orders and cancel their pending payments
+
+        An order is stale once it and its latest payment attempt are older
+        than older_than: a payment created later on an old order still has
+        a live Snap session, and its settlement must not find the order
+        expired. Uses UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP
+        LOCKED) so several workers can sweep at the same time without
+        blocking each other.
+        """
+        recent_payment = select(Payment.id).where(
+            Payment.order_id == Order.id,
+            Payment.status == PaymentStatus.PENDING,
+            Payment.created_at >= older_than
+        ).exists()
+        stale_ids = select(Order.id).where(
+            Order.status == OrderStatus.PENDING,
+            Order.created_at < older_than,
+            ~recent_payment
+        ).order_by(Order.id).limit(batch_size).with_for_update(skip_locked=True)
+
+        expired_ids = db.scalars(
+            update(Order).where(
+                Order.id.in_(stale_ids),
+                Order.status == OrderStatus.PENDING
+            ).values(
+                status=OrderStatus.EXPIRED,
+                updated_at=datetime.utcnow()
+            ).returning(Order.id).execution_options(synchronize_session=False)
+        ).all()
+
+        if expired_ids:
+            cancelled_order_ids = set(db.scalars(
+                update(Payment).where(
+                    Payment.order_id.in_(expired_ids),
+                    Payment.status == PaymentStatus.PENDING
+                ).values(
+                    status=PaymentStatus.CANCELLED,
+                    updated_at=datetime.utcnow()
+                ).returning(Payment.order_id).execution_options(synchronize_session=False)
+            ).all())
+            # One statement for the whole batch, not a round trip per order while the row locks are held
+            publish_statuses(db, [
+                (order_id, OrderStatus.EXPIRED, PaymentStatus.CANCELLED if order_id in cancelled_order_ids else None)
+                for order_id in expired_ids
+            ])
+        db.commit()
+        return len(expired_ids)
+
     @staticmethod
     def mark_order_paid(db: Session, order_id: int) -> Optional[Order]:
-        """Mark an order as paid"""
-        db_order = db.query(Order).filter(Order.id == order_id).first()
+        """Mark an order as paid (no-op if it already is)"""
+        db_order = db.query(Order).filter(Order.id == order_id).with_for_update().first()
         if not db_order:
             return None
 
-        db_order.status = OrderStatus.PAID
-        db_order.paid_at = datetime.utcnow()
+        if StatusTransitions.apply_order(db_order, OrderStatus.PAID):
+            OutboxService.publish(db, ORDER_PAID, db_order.id, {
+                "order_id": db_order.id,
+                "user_id": db_order.user_id
+            })
+            publish_status(db, db_order.id, OrderStatus.PAID, None)
         db.commit()
         db.refresh(db_order)
         return db_order
@@ -357,16 +753,49 @@ class PaymentService:
     """Service for managing payments with Midtrans integration"""
 
     @staticmethod
-    def _encode_auth(server_key: str) -> str:
-        """Encode server key for Basic Auth"""
-        auth_string = f"{server_key}:"
-        return base64.b64encode(auth_string.encode()).decode()
+    def _record_event(db: Session, payment_id: int, event_type: str, payload: Dict[str, Any]):
+        """Append the raw gateway payload to payment_events (no commit)"""
+        db.add(PaymentEvent(
+            payment_id=payment_id,
+            event_type=event_type,
+            transaction_status=payload.get("transaction_status"),
+            payload=payload
+        ))
 
     @staticmethod
-    async def create_payment_link(db: Session, order_id: int, payment_url: str) -> Optional[Dict[str, Any]]:
-        """Create a payment link via Midtrans Snap API"""
-        from app.core.config import settings
+    def _flag_late_settlement(db: Session, db_order: Optional[Order], db_payment: Payment,
+                              previous: PaymentStatus, status: GatewayStatus):
+        """Record a settlement that did not pay its order (no commit)
+
+        The customer was charged, but the payment was already cancelled /
+        failed (e.g. by the expiry sweeper) or the order is no longer
+        pending, so no order.paid follows. A payment event and a
+        payment.late_settlement outbox event keep it visible for a refund
+        or a manual fix; only the first settlement per payment is flagged.
+        """
+        if db.query(PaymentEvent.id).filter(
+            PaymentEvent.payment_id == db_payment.id,
+            PaymentEvent.event_type == PAYMENT_LATE_SETTLEMENT
+        ).first():
+            return
+        details = {
+            "order_id": db_payment.order_id,
+            "user_id": db_order.user_id if db_order else None,
+            "payment_id": db_payment.id,
+            "payment_status": previous.value,
+            "order_status": db_order.status.value if db_order else None,
+            "transaction_id": status.transaction_id,
+            "transaction_status": status.transaction_status,
+            "amount": str(db_payment.amount),
+        }
+        PaymentService._record_event(db, db_payment.id, PAYMENT_LATE_SETTLEMENT, details)
+        OutboxService.publish(db, PAYMENT_LATE_SETTLEMENT, db_payment.id, details)
+        print(f"[PAYMENT WARNING] Late settlement for Payment #{db_payment.id} "
+              f"(payment {details['payment_status']}, order {details['order_status']}): refund or fix manually")
 
+    @staticmethod
+    def _prepare_payment(db: Session, order_id: int, payment_url: str) -> Optional[Dict[str, Any]]:
+        """DB half before the gateway call: returns the existing link or what the charge needs"""
         db_order = db.query(Order).filter(Order.id == order_id).first()
         if not db_order:
             return None
@@ -382,141 +811,124 @@ class PaymentService:
 
         if existing_payment:
             return {
-                "payment_url": existing_payment.payment_url,
-                "transaction_id": existing_payment.transaction_id
+                "existing": {
+                    "payment_url": existing_payment.payment_url,
+                    "transaction_id": existing_payment.transaction_id
+                }
             }
 
-        # Prepare Midtrans payload
-        transaction_details = {
-            "order_id": f"ORDER-{order_id}-{int(datetime.utcnow().timestamp())}",
-            "gross_amount": int(db_order.total_price)
-        }
+        prepared = {"amount": db_order.total_price, "user_id": db_order.user_id}
+        # End the read transaction so no connection is held during the gateway call
+        db.commit()
+        return prepared
 
-        customer_details = {
-            "user_id": db_order.user_id,
-            # Add more details when user system is integrated
-        }
+    @staticmethod
+    def _save_payment(db: Session, order_id: int, amount: Decimal, gateway: PaymentGateway,
+                      charge: ChargeResult) -> Dict[str, Any]:
+        """DB half after the gateway call: store the payment and the gateway response"""
+        db_payment = Payment(
+            order_id=order_id,
+            payment_gateway=gateway,
+            transaction_id=charge.transaction_id,
+            amount=amount,
+            status=PaymentStatus.PENDING,
+            payment_url=charge.payment_url
+        )
+        db.add(db_payment)
+        db.flush()
+        PaymentService._record_event(db, db_payment.id, "charge.created", charge.raw)
+        db.commit()
 
-        payload = {
-            "transaction_details": transaction_details,
-            "customer_details": customer_details,
-            "enabled_payments": ["gopay", "bank_transfer", "qris", "credit_card"],
-            "callbacks": {
-                "finish": f"{payment_url}/payment/finish"
-            }
+        return {
+            "payment_url": db_payment.payment_url,
+            "transaction_id": db_payment.transaction_id
         }
 
-        headers = {
-            "Accept": "application/json",
-            "Content-Type": "application/json",
-            "Authorization": f"Basic {PaymentService._encode_auth(settings.MIDTRANS_SERVER_KEY)}"
-        }
+    @staticmethod
+    async def create_payment_link(db: Session, order_id: int, payment_url: str) -> Optional[Dict[str, Any]]:
+        """Create a payment link via the configured gateway (DB work runs in the threadpool)"""
+        prepared = await run_in_threadpool(PaymentService._prepare_payment, db, order_id, payment_url)
+        if prepared is None:
+            return None
+        if "existing" in prepared:
+            return prepared["existing"]
 
+        gateway = get_gateway()
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    settings.MIDTRANS_PAYMENT_URL,
-                    json=payload,
-                    headers=headers,
-                    timeout=30.0
-                )
-                response.raise_for_status()
-                result = response.json()
-
-            # Save payment record
-            db_payment = Payment(
-                order_id=order_id,
-                payment_gateway=PaymentGateway.MIDTRANS,
-                transaction_id=result.get("token", ""),
-                amount=db_order.total_price,
-                status=PaymentStatus.PENDING,
-                payment_url=result.get("redirect_url", ""),
-                raw_response=result
+            charge = await gateway.create_charge(
+                order_id, prepared["amount"], prepared["user_id"], f"{payment_url}/payment/finish"
             )
-            db.add(db_payment)
-            db.commit()
-            db.refresh(db_payment)
+        except (httpx.HTTPError, asyncio.TimeoutError) as e:
+            raise Exception(f"Payment gateway error: {str(e) or type(e).__name__}")
 
-            return {
-                "payment_url": db_payment.payment_url,
-                "transaction_id": db_payment.transaction_id
-            }
-
-        except httpx.HTTPError as e:
-            raise Exception(f"Payment gateway error: {str(e)}")
+        return await run_in_threadpool(
+            PaymentService._save_payment, db, order_id, prepared["amount"], gateway.gateway, charge
+        )
 
     @staticmethod
-    def handle_webhook(db: Session, webhook_data: Dict[str, Any]) -> bool:
-        """Process Midtrans webhook notification"""
-        transaction_id = webhook_data.get("transaction_id")
-        transaction_status = webhook_data.get("transaction_status")
-        fraud_status = webhook_data.get("fraud_status")
-        gross_amount = webhook_data.get("gross_amount")
+    def apply_gateway_status(db: Session, payment_id: int, order_id: int, status: GatewayStatus,
+                             source: str = "webhook") -> bool:
+        """Apply a gateway status (webhook or status API) to a payment and its order
+
+        Locks the order, then the payment (same order as the expiry sweeper),
+        and applies the transition through StatusTransitions, so duplicate or
+        concurrent notifications are no-ops. A success that does not pay the
+        order is flagged as a late settlement. Commits and returns True when
+        the payment status changed.
+        """
+        db_order = db.query(Order).filter(Order.id == order_id).with_for_update().first()
+        db_payment = db.query(Payment).filter(Payment.id == payment_id).with_for_update().first()
+
+        payment_target, order_target = status.payment_status, status.order_status
+        PaymentService._record_event(db, db_payment.id, source, status.raw)
+
+        previous_status = db_payment.status
+        payment_changed = payment_target is not None and StatusTransitions.apply_payment(db_payment, payment_target)
+        if payment_changed and status.payment_method:
+            db_payment.payment_method = status.payment_method
+
+        # [REVISION] Payment success -> mark order paid and publish order.paid in the
+        # same transaction; invoice, project (Dev 3) and notification run from the outbox
+        order_paid = False
+        if payment_changed and db_order and order_target is not None:
+            if StatusTransitions.apply_order(db_order, order_target) and order_target == OrderStatus.PAID:
+                order_paid = True
+                OutboxService.publish(db, ORDER_PAID, db_order.id, {
+                    "order_id": db_order.id,
+                    "user_id": db_order.user_id,
+                    "payment_id": db_payment.id
+                })
+        # Money arrived after the sweeper expired the order / cancelled the payment (or
+        # for an order already paid by another payment): never drop it silently
+        if (payment_target == PaymentStatus.SUCCESS and previous_status != PaymentStatus.SUCCESS
+                and not order_paid):
+            PaymentService._flag_late_settlement(db, db_order, db_payment, previous_status, status)
+        if payment_changed:
+            # Push to open status streams (payment_status SSE) on commit
+            publish_status(db, order_id, db_order.status if db_order else None, db_payment.status)
 
-        if not transaction_id:
+        db.commit()
+        return payment_changed
+
+    @staticmethod
+    def handle_webhook(db: Session, webhook_data: Dict[str, Any],
+                       gateway: PaymentGateway = PaymentGateway.MIDTRANS) -> bool:
+        """Process a gateway webhook notification, returns False for unknown transactions"""
+        status = get_gateway(gateway).parse_notification(webhook_data)
+        if status is None:
             return False
 
-        # Find payment by transaction_id
-        db_payment = db.query(Payment).filter(
-            Payment.transaction_id == transaction_id
+        # Find payment by transaction_id (for Midtrans the order_id we sent to Snap). Only
+        # payments made through the notifying gateway: a notification verified with one
+        # gateway's secret must not settle another gateway's payment
+        payment_ref = db.query(Payment.id, Payment.order_id).filter(
+            Payment.transaction_id == status.transaction_id,
+            Payment.payment_gateway == gateway
         ).first()
-
-        if not db_payment:
+        if not payment_ref:
             return False
 
-        should_activate_project = False
-
-        # Update payment status based on transaction status
-        if transaction_status == "capture":
-            if fraud_status == "accept":
-                db_payment.status = PaymentStatus.SUCCESS
-                db_payment.paid_at = datetime.utcnow()
-                should_activate_project = True
-
-        elif transaction_status == "settlement":
-            db_payment.status = PaymentStatus.SUCCESS
-            db_payment.paid_at = datetime.utcnow()
-            should_activate_project = True
-
-        elif transaction_status == "cancel" or transaction_status == "deny":
-            db_payment.status = PaymentStatus.CANCELLED
-
-        elif transaction_status == "expire":
-            db_payment.status = PaymentStatus.CANCELLED
-            # Mark order as expired
-            db_order = db.query(Order).filter(Order.id == db_payment.order_id).first()
-            if db_order:
-                db_order.status = OrderStatus.EXPIRED
-
-        db_payment.raw_response = webhook_data
-        db.commit()
-
-        # [REVISION] If Payment Success -> Mark Order Paid & Create Project (Dev 3 Integration)
-        if should_activate_project:
-            # 1. Update Order Status
-            OrderService.mark_order_paid(db, db_payment.order_id)
-            
-            # 2. Generate Invoice
-            InvoiceService.generate_invoice(db, db_payment.order_id)
-            
-            # 3. [NEW] Automatically Create Website Project (Bridge to Dev 3)
-            db_order = db.query(Order).filter(Order.id == db_payment.order_id).first()
-            if db_order:
-                # Generate unique subdomain suggestion
-                default_subdomain = f"project-{db_order.id}-{int(datetime.utcnow().timestamp())}"
-                
-                project_data = delivery_schemas.WebsiteInstanceCreate(
-                    order_id=db_order.id,
-                    user_id=db_order.user_id,
-                    subdomain=default_subdomain
-                )
-                try:
-                    delivery_services.create_website_instance(db, project_data)
-                    print(f"[AUTO-PROJECT] Project created for Order #{db_order.id}")
-                except Exception as e:
-                    # Log error but don't fail the webhook response
-                    print(f"[AUTO-PROJECT ERROR] Failed to create project: {str(e)}")
-
+        PaymentService.apply_gateway_status(db, payment_ref.id, payment_ref.order_id, status)
         return True
 
     @staticmethod
@@ -543,112 +955,63 @@ class PaymentService:
 
 # ==================== INVOICE SERVICE ====================
 
+INVOICE_RENDER_CHANNEL = "invoice_render"
+INVOICE_EMAIL_CHANNEL = "invoice_email"
+
+
 class InvoiceService:
     """Service for generating and managing invoices"""
 
     @staticmethod
-    def _ensure_invoice_directory():
-        """Ensure invoice directory exists"""
-        invoice_dir = Path("/invoices")
-        invoice_dir.mkdir(exist_ok=True)
-        return invoice_dir
+    def _allocate_sequence(db: Session, day: date, count: int = 1) -> int:
+        """Reserve `count` consecutive numbers for a day, returns the first one
+
+        One UPSERT ... RETURNING on invoice_sequences instead of counting the
+        day's invoices. The day's row stays locked until the caller commits,
+        so concurrent allocations can't collide and a rollback gives the
+        numbers back (gap-free as long as they are used in that transaction).
+        """
+        last_value = db.scalar(
+            pg_insert(InvoiceSequence).values(day=day, last_value=count).on_conflict_do_update(
+                index_elements=[InvoiceSequence.day],
+                set_={"last_value": InvoiceSequence.last_value + count}
+            ).returning(InvoiceSequence.last_value)
+        )
+        return last_value - count + 1
+
+    @staticmethod
+    def _format_invoice_number(day: date, sequence: int) -> str:
+        return f"INV/{day.strftime('%Y%m%d')}/{str(sequence).zfill(5)}"
 
     @staticmethod
     def _generate_invoice_number(db: Session, date: datetime) -> str:
         """Generate invoice number with format: INV/YYYYMMDD/XXXXX"""
-        date_str = date.strftime("%Y%m%d")
+        day = date.date()
+        return InvoiceService._format_invoice_number(day, InvoiceService._allocate_sequence(db, day))
 
-        # Get sequence number for today
-        count = db.query(Invoice).filter(
-            Invoice.invoice_number.like(f"INV/{date_str}/%")
-        ).count()
+    @staticmethod
+    def allocate_invoice_numbers(db: Session, date: datetime, count: int) -> List[str]:
+        """Preallocate a block of invoice numbers for batch generation (one round trip)
 
-        sequence = str(count + 1).zfill(5)
-        return f"INV/{date_str}/{sequence}"
+        Use them all before committing, otherwise the unused ones become gaps.
+        """
+        day = date.date()
+        first = InvoiceService._allocate_sequence(db, day, count)
+        return [InvoiceService._format_invoice_number(day, first + offset) for offset in range(count)]
 
     @staticmethod
     def _generate_pdf_html(order: Order, items: list, invoice_number: str) -> str:
-        """Generate HTML for PDF invoice"""
-
-        items_html = ""
-        for item in items:
-            items_html += f"""
-            <tr>
-                <td style="padding: 12px; border-bottom: 1px solid #ddd;">{item.item_name}</td>
-                <td style="padding: 12px; border-bottom: 1px solid #ddd; text-align: right;">Rp {float(item.price):,.2f}</td>
-            </tr>
-            """
-
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body {{ font-family: Arial, sans-serif; margin: 40px; color: #333; }}
-                .header {{ text-align: center; margin-bottom: 40px; }}
-                .invoice-title {{ font-size: 32px; color: #2563eb; font-weight: bold; }}
-                .invoice-info {{ background: #f8fafc; padding: 20px; border-radius: 8px; margin-bottom: 30px; }}
-                .info-row {{ display: flex; justify-content: space-between; margin: 8px 0; }}
-                table {{ width: 100%; border-collapse: collapse; margin-bottom: 30px; }}
-                th {{ background: #2563eb; color: white; padding: 12px; text-align: left; }}
-                .total {{ font-size: 20px; font-weight: bold; text-align: right; padding: 20px; }}
-                .footer {{ text-align: center; margin-top: 50px; color: #64748b; font-size: 14px; }}
-            </style>
-        </head>
-        <body>
-            <div class="header">
-                <div class="invoice-title">DIGADOIN</div>
-                <p>Invoice</p>
-            </div>
-
-            <div class="invoice-info">
-                <div class="info-row">
-                    <span><strong>Invoice Number:</strong></span>
-                    <span>{invoice_number}</span>
-                </div>
-                <div class="info-row">
-                    <span><strong>Order ID:</strong></span>
-                    <span>#{order.id}</span>
-                </div>
-                <div class="info-row">
-                    <span><strong>Date:</strong></span>
-                    <span>{order.created_at.strftime('%d %B %Y')}</span>
-                </div>
-                <div class="info-row">
-                    <span><strong>User ID:</strong></span>
-                    <span>{order.user_id}</span>
-                </div>
-            </div>
-
-            <table>
-                <thead>
-                    <tr>
-                        <th>Description</th>
-                        <th style="text-align: right;">Price</th>
-                    </tr>
-                </thead>
-                <tbody>
-                    {items_html}
-                </tbody>
-            </table>
-
-            <div class="total">
-                Total: Rp {float(order.total_price):,.2f}
-            </div>
-
-            <div class="footer">
-                <p>Thank you for your purchase!</p>
-                <p>For questions, contact support@digadoin.com</p>
-            </div>
-        </body>
-        </html>
-        """
-        return html
+        """Generate HTML for PDF invoice (precompiled template, see invoice_template.py)"""
+        return render_invoice_html(order, items, invoice_number)
 
     @staticmethod
     def generate_invoice(db: Session, order_id: int) -> Optional[Invoice]:
-        """Generate invoice PDF for a paid order"""
+        """Number the invoice for a paid order and queue its PDF (no-op if it exists)
+
+        The record is created right away with render_status PENDING; the PDF
+        is rendered by the invoice renderer (rendering.py) in a process pool,
+        or on first download when INVOICE_RENDER_MODE is lazy.
+        """
         db_order = db.query(Order).filter(Order.id == order_id).first()
         if not db_order:
             return None
@@ -661,39 +1024,92 @@ class InvoiceService:
         if existing_invoice:
             return existing_invoice
 
-        invoice_dir = InvoiceService._ensure_invoice_directory()
-        invoice_number = InvoiceService._generate_invoice_number(db, db_order.created_at)
-
+        # Number + row in one short transaction, so the day's sequence row
+        # stays locked only until this commit
+        db_invoice = Invoice(
+            order_id=order_id,
+            invoice_number=InvoiceService._generate_invoice_number(db, db_order.created_at),
+            render_status=InvoiceRenderStatus.PENDING,
+            render_available_at=datetime.utcnow()
+        )
+        db.add(db_invoice)
         try:
-            from xhtml2pdf import pisa
-
-            # Get order items for the invoice
-            order_items = db.query(OrderItem).filter(OrderItem.order_id == order_id).all()
-
-            html_content = InvoiceService._generate_pdf_html(db_order, order_items, invoice_number)
-            pdf_path = invoice_dir / f"{invoice_number.replace('/', '_')}.pdf"
-
-            # Generate PDF
-            with open(pdf_path, "wb") as pdf_file:
-                pisa.CreatePDF(html_content, dest=pdf_file)
-
-            # Create invoice record
-            db_invoice = Invoice(
-                order_id=order_id,
-                invoice_number=invoice_number,
-                pdf_url=str(pdf_path)
-            )
-            db.add(db_invoice)
+            db.flush()
+            if settings.INVOICE_RENDER_MODE == "lazy":
+                # PDF is rendered on the first download (GET /invoices/{order_id}) or by the mailer
+                InvoiceService._queue_email(db, db_invoice.id)
+            else:
+                notify(db, INVOICE_RENDER_CHANNEL)
             db.commit()
-            db.refresh(db_invoice)
+        except IntegrityError:
+            # Concurrent generation for the same order won, its number stands
+            db.rollback()
+            return db.query(Invoice).filter(Invoice.order_id == order_id).first()
+        db.refresh(db_invoice)
+        return db_invoice
 
-            # Send invoice email
-            InvoiceService.send_invoice_email(db, db_invoice.id)
+    @staticmethod
+    def claim_render_batch(db: Session, limit: int) -> List[Dict[str, Any]]:
+        """Lease up to `limit` due invoices and build their HTML (for the render pool)"""
+        invoices = db.execute(
+            claim_due(
+                Invoice, Invoice.id, Invoice.render_status, InvoiceRenderStatus.PENDING,
+                Invoice.render_available_at, Invoice.render_attempts, limit, settings.INVOICE_RENDER_LEASE_SECONDS,
+                order_by=[Invoice.render_available_at, Invoice.id]
+            ).returning(Invoice.id, Invoice.order_id, Invoice.invoice_number, Invoice.render_attempts)
+        ).all()
+        db.commit()
+        return InvoiceService.build_render_jobs(db, invoices)
 
-            return db_invoice
+    @staticmethod
+    def build_render_jobs(db: Session, invoices: List[Any]) -> List[Dict[str, Any]]:
+        """HTML + content-addressed storage key for each invoice (id, order_id, invoice_number, render_attempts)"""
+        if not invoices:
+            return []
+
+        order_ids = [invoice.order_id for invoice in invoices]
+        orders = {order.id: order for order in db.query(Order).filter(Order.id.in_(order_ids)).all()}
+        items: Dict[int, list] = {}
+        for item in db.query(OrderItem).filter(OrderItem.order_id.in_(order_ids)).order_by(OrderItem.id):
+            items.setdefault(item.order_id, []).append(item)
+
+        jobs = []
+        for invoice in invoices:
+            order, order_items = orders[invoice.order_id], items.get(invoice.order_id, [])
+            jobs.append({
+                "invoice_id": invoice.id,
+                "attempts": invoice.render_attempts,
+                "key": invoice_cache.cache_key(order, order_items, invoice.invoice_number),
+                "html": InvoiceService._generate_pdf_html(order, order_items, invoice.invoice_number)
+            })
+        return jobs
 
-        except Exception as e:
-            raise Exception(f"PDF generation failed: {str(e)}")
+    @staticmethod
+    def finish_render(db: Session, invoice_id: int, attempts: int, pdf_key: str, error: Optional[str] = None):
+        """Store the render result: PDF storage key, retry with backoff or FAILED
+
+        A successful render queues the automatic invoice email whoever
+        rendered it (renderer, download, export or mailer); it is queued
+        once per invoice, later renders are no-ops.
+        """
+        values: Dict[str, Any] = {"render_error": error}
+        next_attempt = retry_at(attempts, settings.INVOICE_RENDER_MAX_ATTEMPTS)
+        if error is None:
+            values.update(render_status=InvoiceRenderStatus.DONE, pdf_url=pdf_key, rendered_at=datetime.utcnow())
+        elif next_attempt is None:
+            values.update(render_status=InvoiceRenderStatus.FAILED)
+            print(f"[INVOICE-RENDER ERROR] Invoice #{invoice_id} failed permanently: {error}")
+        else:
+            values.update(render_available_at=next_attempt)
+            print(f"[INVOICE-RENDER] Invoice #{invoice_id} attempt {attempts} failed: {error}")
+
+        db.execute(
+            update(Invoice).where(Invoice.id == invoice_id).values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        if error is None:
+            InvoiceService._queue_email(db, invoice_id)
+        db.commit()
 
     @staticmethod
     def get_invoice(db: Session, order_id: int) -> Optional[Invoice]:
@@ -701,30 +1117,102 @@ class InvoiceService:
         return db.query(Invoice).filter(Invoice.order_id == order_id).first()
 
     @staticmethod
-    def send_invoice_email(db: Session, invoice_id: int) -> bool:
-        """Send invoice via email (placeholder for email service integration)"""
-        from app.core.config import settings
+    def _queue_email(db: Session, invoice_id: int, kind: str = "invoice"):
+        """Add an invoice email to the caller's transaction (one "invoice" email per invoice)"""
+        email_id = db.scalar(
+            pg_insert(InvoiceEmail).values(
+                invoice_id=invoice_id,
+                kind=kind,
+                status=InvoiceEmailStatus.PENDING,
+                attempts=0,
+                available_at=datetime.utcnow(),
+                created_at=datetime.utcnow()
+            ).on_conflict_do_nothing(index_elements=["invoice_id"], index_where=InvoiceEmail.kind == "invoice")
+            .returning(InvoiceEmail.id)
+        )
+        if email_id is not None:
+            notify(db, INVOICE_EMAIL_CHANNEL)
 
-        db_invoice = db.query(Invoice).filter(Invoice.id == invoice_id).first()
-        if not db_invoice:
+    @staticmethod
+    def send_invoice_email(db: Session, invoice_id: int, kind: str = "invoice") -> bool:
+        """Queue the invoice email; sent with the PDF attached by the mailer (invoice_email.py)"""
+        if not db.query(Invoice.id).filter(Invoice.id == invoice_id).first():
             return False
-
-        # TODO: Integrate with fastapi-mail for actual email sending
-        # For now, just mark as sent
-        db_invoice.sent_via_email = True
-        db_invoice.sent_at = datetime.utcnow()
+        InvoiceService._queue_email(db, invoice_id, kind)
         db.commit()
-
         return True
 
     @staticmethod
     def resend_invoice_email(db: Session, order_id: int) -> bool:
-        """Resend invoice to customer"""
+        """Queue another copy of the invoice email"""
         db_invoice = db.query(Invoice).filter(Invoice.order_id == order_id).first()
         if not db_invoice:
             return False
 
-        return InvoiceService.send_invoice_email(db, db_invoice.id)
+        return InvoiceService.send_invoice_email(db, db_invoice.id, kind="resend")
+
+    @staticmethod
+    def claim_email_batch(db: Session, limit: int) -> List[Dict[str, Any]]:
+        """Lease up to `limit` due invoice emails with what the message needs"""
+        emails = db.execute(
+            claim_due(
+                InvoiceEmail, InvoiceEmail.id, InvoiceEmail.status, InvoiceEmailStatus.PENDING,
+                InvoiceEmail.available_at, InvoiceEmail.attempts, limit, settings.INVOICE_EMAIL_LEASE_SECONDS,
+                order_by=[InvoiceEmail.available_at, InvoiceEmail.id]
+            ).returning(InvoiceEmail.id, InvoiceEmail.invoice_id, InvoiceEmail.attempts)
+        ).all()
+        db.commit()
+        if not emails:
+            return []
+
+        details = {
+            row.id: row for row in db.query(
+                Invoice.id, Invoice.order_id, Invoice.invoice_number, Order.total_price, User.name, User.email
+            ).join(Order, Order.id == Invoice.order_id).join(User, User.id == Order.user_id).filter(
+                Invoice.id.in_([email.invoice_id for email in emails])
+            )
+        }
+        jobs = []
+        for email in sorted(emails, key=lambda email: email.id):
+            invoice = details.get(email.invoice_id)  # None if the order's user is gone
+            jobs.append({
+                "email_id": email.id,
+                "attempts": email.attempts,
+                "invoice_id": email.invoice_id,
+                "order_id": invoice.order_id if invoice else None,
+                "invoice_number": invoice.invoice_number if invoice else None,
+                "total_price": invoice.total_price if invoice else None,
+                "name": invoice.name if invoice else None,
+                "recipient": invoice.email if invoice else None,
+            })
+        return jobs
+
+    @staticmethod
+    def finish_emails(db: Session, results: List[Tuple[Dict[str, Any], Optional[str]]]):
+        """Store a sent batch: mark invoices as emailed, retry failures with backoff or FAILED"""
+        now = datetime.utcnow()
+        for job, error in results:
+            values: Dict[str, Any] = {"last_error": error}
+            # Longer base delay: SMTP failures are mostly the server throttling us
+            next_attempt = retry_at(job["attempts"], settings.INVOICE_EMAIL_MAX_ATTEMPTS, base_seconds=30)
+            if error is None:
+                values.update(status=InvoiceEmailStatus.SENT, sent_at=now, recipient=job["recipient"])
+                db.execute(
+                    update(Invoice).where(Invoice.id == job["invoice_id"]).values(sent_via_email=True, sent_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+            elif next_attempt is None:
+                values.update(status=InvoiceEmailStatus.FAILED)
+                print(f"[INVOICE-EMAIL ERROR] Email #{job['email_id']} for {job['invoice_number']} failed permanently: {error}")
+            else:
+                values.update(available_at=next_attempt)
+                print(f"[INVOICE-EMAIL] Email #{job['email_id']} attempt {job['attempts']} failed: {error}")
+
+            db.execute(
+                update(InvoiceEmail).where(InvoiceEmail.id == job["email_id"]).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        db.commit()
 
 
 # ==================== REPORTING SERVICE ====================
@@ -898,4 +1386,102 @@ class ReportingService:
             "pending_orders": pending_orders,
             "conversion_rate": conversion_data["conversion_rate"],
             "top_plans": top_plans
-        }
\ No newline at end of file
+        }
+
+
+# ==================== EXPORT SERVICE ====================
+
+class ExportService:
+    """Stream orders and payments as CSV / NDJSON from a server-side cursor"""
+
+    YIELD_PER = 1000  # Rows fetched per cursor round-trip (and per output chunk)
+
+    ORDER_COLUMNS = [
+        Order.id, Order.user_id, Order.subscription_plan_id, Order.status,
+        Order.total_price, Order.created_at, Order.paid_at
+    ]
+    PAYMENT_COLUMNS = [
+        Payment.id, Payment.order_id, Payment.payment_gateway, Payment.transaction_id, Payment.amount,
+        Payment.status, Payment.payment_method, Payment.created_at, Payment.paid_at
+    ]
+
+    @staticmethod
+    def _format_value(value: Any) -> Any:
+        if isinstance(value, enum.Enum):
+            return value.value
+        if isinstance(value, Decimal):
+            return str(value)
+        if isinstance(value, datetime):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def _stream(columns: list, filters: list, export_format: str) -> Iterator[str]:
+        """Yield the export in chunks; memory stays constant regardless of row count"""
+        names = [column.key for column in columns]
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(names)
+            # Header goes out before the query runs
+            yield buffer.getvalue()
+
+        # Own session: the request-scoped one is closed before the body is streamed
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                select(*columns).where(*filters).order_by(columns[0]).execution_options(
+                    yield_per=ExportService.YIELD_PER
+                )
+            )
+            for rows in result.partitions():
+                if export_format == "csv":
+                    buffer.seek(0)
+                    buffer.truncate()
+                    writer.writerows(
+                        [ExportService._format_value(value) for value in row] for row in rows
+                    )
+                    yield buffer.getvalue()
+                else:
+                    yield "".join(
+                        json.dumps({
+                            name: ExportService._format_value(value) for name, value in zip(names, row)
+                        }) + "\n"
+                        for row in rows
+                    )
+        finally:
+            db.close()
+
+    @staticmethod
+    def export_orders(
+        export_format: str = "csv",
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        status: Optional[OrderStatus] = None
+    ) -> Iterator[str]:
+        """Stream orders filtered by created_at range and status"""
+        filters = []
+        if start_date:
+            filters.append(Order.created_at >= start_date)
+        if end_date:
+            filters.append(Order.created_at <= end_date)
+        if status:
+            filters.append(Order.status == status)
+        return ExportService._stream(ExportService.ORDER_COLUMNS, filters, export_format)
+
+    @staticmethod
+    def export_payments(
+        export_format: str = "csv",
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        status: Optional[PaymentStatus] = None
+    ) -> Iterator[str]:
+        """Stream payments filtered by created_at range and status"""
+        filters = []
+        if start_date:
+            filters.append(Payment.created_at >= start_date)
+        if end_date:
+            filters.append(Payment.created_at <= end_date)
+        if status:
+            filters.append(Payment.status == status)
+        return ExportService._stream(ExportService.PAYMENT_COLUMNS, filters, export_format)
@@ -0,0 +1,368 @@
+"""
+Monthly Customer Statements
+Dev 2: Transaction, Billing & Order Engine
+
+One PDF per user and month listing the orders they paid in it with their
+invoice numbers, for customers who would rather file one statement than
+a dozen invoices. A run (statement_runs row) walks the users with paid
+orders in the month in user_id order: each batch of STATEMENT_BATCH_SIZE
+users is aggregated by a single grouped query, rendered through the
+invoice render process pool and stored like invoice PDFs. The batch's
+customer_statements rows and the run's cursor are committed together, so
+an interrupted run (deploy, crash) resumes after the last committed user.
+Statements are content-addressed, a redone batch renders nothing twice.
+
+The previous month's run starts automatically (STATEMENT_AUTO_RUN) or via
+POST /statements/runs. Runs are leased: one worker processes a run at a
+time, batch by batch.
+"""
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import JSON, String, cast, func, or_, select, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by, insert as pg_insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.notify import notify
+from app.modules.auth_user.models import User
+from app.modules.transactions import invoice_cache
+from app.modules.transactions.invoice_template import render_statement_html
+from app.modules.transactions.models import (
+    CustomerStatement, Invoice, Order, OrderStatus, StatementRun, StatementRunStatus
+)
+from app.modules.transactions.rendering import renderer
+from app.modules.transactions.storage import get_storage, is_storage_key
+
+STATEMENT_CHANNEL = "statement_run"
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def parse_period(value: str) -> date:
+    """'YYYY-MM' of a finished month -> its first day (ValueError otherwise)"""
+    try:
+        period_start = datetime.strptime(value, "%Y-%m").date()
+    except ValueError:
+        raise ValueError(f"Invalid period '{value}', use YYYY-MM")
+    if period_start >= _month_start(date.today()):
+        raise ValueError("Statements are available once the month is over")
+    return period_start
+
+
+class StatementService:
+    """Statement runs and the per-user aggregation"""
+
+    @staticmethod
+    def get_run(db: Session, period_start: date) -> Optional[Dict[str, Any]]:
+        """Progress of a month's run"""
+        run = db.query(StatementRun).filter(StatementRun.period_start == period_start).first()
+        if run is None:
+            return None
+        return {
+            "period": f"{run.period_start:%Y-%m}",
+            "status": run.status.value,
+            "last_user_id": run.last_user_id,
+            "statements": run.statements,
+            "failed": run.failed,
+            "created_at": run.created_at,
+            "finished_at": run.finished_at
+        }
+
+    @staticmethod
+    def start_run(db: Session, period_start: date, restart: bool = False) -> Dict[str, Any]:
+        """Create a month's run (kept if it exists, or started over with restart), returns its progress"""
+        insert = pg_insert(StatementRun).values(period_start=period_start)
+        if restart:
+            insert = insert.on_conflict_do_update(
+                index_elements=["period_start"],
+                set_={
+                    "status": StatementRunStatus.RUNNING, "last_user_id": 0, "statements": 0, "failed": 0,
+                    "locked_until": None, "finished_at": None
+                }
+            )
+        else:
+            insert = insert.on_conflict_do_nothing(index_elements=["period_start"])
+        db.execute(insert)
+        notify(db, STATEMENT_CHANNEL)
+        db.commit()
+        return StatementService.get_run(db, period_start)
+
+    @staticmethod
+    def claim_run(db: Session) -> Optional[Tuple[int, date, int]]:
+        """Lease the oldest unfinished run, returns (run_id, period_start, last_user_id)"""
+        now = datetime.utcnow()
+        due_ids = select(StatementRun.id).where(
+            StatementRun.status == StatementRunStatus.RUNNING,
+            or_(StatementRun.locked_until.is_(None), StatementRun.locked_until <= now)
+        ).order_by(StatementRun.period_start).limit(1).with_for_update(skip_locked=True)
+
+        run = db.execute(
+            update(StatementRun).where(StatementRun.id.in_(due_ids)).values(
+                locked_until=now + timedelta(seconds=settings.STATEMENT_LEASE_SECONDS)
+            ).returning(StatementRun.id, StatementRun.period_start, StatementRun.last_user_id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        db.commit()
+        return tuple(run) if run else None
+
+    @staticmethod
+    def aggregate(db: Session, period_start: date, after_user_id: int, limit: int,
+                  user_id: Optional[int] = None) -> List[Any]:
+        """Paid orders of the month grouped per user, next `limit` users after after_user_id
+
+        One grouped query; each row has user_id, name, email, the counts and
+        total, and the user's orders (id, paid_at, total, invoice number) as
+        a JSON array in payment order.
+        """
+        order_row = func.json_build_object(
+            "order_id", Order.id,
+            "paid_at", Order.paid_at,
+            "total_price", cast(Order.total_price, String),  # Text keeps the exact amount through JSON
+            "invoice_number", Invoice.invoice_number
+        )
+        query = select(
+            Order.user_id,
+            User.name,
+            User.email,
+            func.count(Order.id).label("order_count"),
+            func.count(Invoice.id).label("invoice_count"),
+            func.sum(Order.total_price).label("total_amount"),
+            func.json_agg(aggregate_order_by(order_row, Order.paid_at, Order.id), type_=JSON).label("orders")
+        ).join(User, User.id == Order.user_id).outerjoin(Invoice, Invoice.order_id == Order.id).where(
+            Order.status == OrderStatus.PAID,
+            Order.paid_at >= datetime.combine(period_start, datetime.min.time()),
+            Order.paid_at < datetime.combine(_next_month(period_start), datetime.min.time()),
+            Order.user_id > after_user_id
+        )
+        if user_id is not None:
+            query = query.where(Order.user_id == user_id)
+        return db.execute(query.group_by(Order.user_id, User.id).order_by(Order.user_id).limit(limit)).all()
+
+    @staticmethod
+    def build_statement(row: Any, period_start: date) -> Dict[str, Any]:
+        """Statement HTML and storage key for one aggregated row"""
+        orders = [{
+            "order_id": order["order_id"],
+            "paid_at": datetime.fromisoformat(order["paid_at"]),
+            "total_price": Decimal(order["total_price"]),
+            "invoice_number": order["invoice_number"]
+        } for order in row.orders]
+        html = render_statement_html(row, period_start, orders, row.total_amount)
+        return {
+            "user_id": row.user_id,
+            "order_count": row.order_count,
+            "invoice_count": row.invoice_count,
+            "total_amount": row.total_amount,
+            "key": invoice_cache.statement_key(html),
+            "html": html
+        }
+
+    @staticmethod
+    def _upsert_statements(db: Session, period_start: date, run_id: Optional[int],
+                           results: List[Tuple[Dict[str, Any], Optional[str]]]):
+        insert = pg_insert(CustomerStatement).values([{
+            "user_id": statement["user_id"],
+            "period_start": period_start,
+            "run_id": run_id,
+            "order_count": statement["order_count"],
+            "invoice_count": statement["invoice_count"],
+            "total_amount": statement["total_amount"],
+            "pdf_url": statement["key"] if error is None else None,
+            "last_error": error,
+            "created_at": datetime.utcnow()
+        } for statement, error in results])
+        db.execute(insert.on_conflict_do_update(
+            index_elements=["user_id", "period_start"],
+            set_={
+                column: insert.excluded[column]
+                for column in ("run_id", "order_count", "invoice_count", "total_amount", "pdf_url", "last_error")
+            }
+        ))
+
+    @staticmethod
+    def save_batch(db: Session, run_id: int, period_start: date, after_user_id: int,
+                   results: List[Tuple[Dict[str, Any], Optional[str]]], done: bool) -> bool:
+        """Store a batch's statements and move the run's cursor past them, in one transaction
+
+        False (nothing stored) if the run was moved on meanwhile, e.g. by a
+        worker that took over after this one's lease expired.
+        """
+        failed = sum(1 for _, error in results if error is not None)
+        values: Dict[str, Any] = {
+            "last_user_id": results[-1][0]["user_id"] if results else after_user_id,
+            "statements": StatementRun.statements + len(results) - failed,
+            "failed": StatementRun.failed + failed,
+            "locked_until": None
+        }
+        if done:
+            values.update(status=StatementRunStatus.DONE, finished_at=datetime.utcnow())
+
+        moved = db.execute(
+            update(StatementRun).where(
+                StatementRun.id == run_id,
+                StatementRun.status == StatementRunStatus.RUNNING,
+                StatementRun.last_user_id == after_user_id
+            ).values(**values).execution_options(synchronize_session=False)
+        ).rowcount
+        if not moved:
+            db.rollback()
+            return False
+        if results:
+            StatementService._upsert_statements(db, period_start, run_id, results)
+        db.commit()
+        return True
+
+    @staticmethod
+    def save_statement(db: Session, period_start: date, statement: Dict[str, Any]):
+        """Store a statement rendered on demand (outside a run)"""
+        StatementService._upsert_statements(db, period_start, None, [(statement, None)])
+        db.commit()
+
+
+class StatementGenerator:
+    """Renders statement runs batch by batch through the invoice render pool"""
+
+    def __init__(self):
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created on first use, inside the running event loop
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(settings.STATEMENT_RENDER_CONCURRENCY)
+        return self._semaphore
+
+    @staticmethod
+    def _claim() -> Optional[Tuple[int, date, int]]:
+        db = SessionLocal()
+        try:
+            return StatementService.claim_run(db)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _fetch(period_start: date, after_user_id: int, limit: int) -> List[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            rows = StatementService.aggregate(db, period_start, after_user_id, limit)
+        finally:
+            db.close()
+        return [StatementService.build_statement(row, period_start) for row in rows]
+
+    @staticmethod
+    def _save(run_id: int, period_start: date, after_user_id: int,
+              results: List[Tuple[Dict[str, Any], Optional[str]]], done: bool) -> bool:
+        db = SessionLocal()
+        try:
+            return StatementService.save_batch(db, run_id, period_start, after_user_id, results, done)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _start_due_run() -> bool:
+        """Start last month's run from STATEMENT_RUN_DAY on (STATEMENT_AUTO_RUN), True if started"""
+        today = date.today()
+        if not settings.STATEMENT_AUTO_RUN or today.day < settings.STATEMENT_RUN_DAY:
+            return False
+        period_start = _month_start(_month_start(today) - timedelta(days=1))
+        db = SessionLocal()
+        try:
+            if db.query(StatementRun.id).filter(StatementRun.period_start == period_start).first():
+                return False
+            StatementService.start_run(db, period_start)
+        finally:
+            db.close()
+        print(f"[STATEMENT] Started the {period_start:%Y-%m} statement run")
+        return True
+
+    async def _render(self, statement: Dict[str, Any]) -> Optional[str]:
+        """Render one statement, returns the error message on failure"""
+        async with self.semaphore:
+            try:
+                await renderer.render(statement["key"], statement["html"])
+                return None
+            except Exception as e:
+                return f"{type(e).__name__}: {str(e)}"
+
+    async def run_batch(self) -> bool:
+        """Process one batch of the oldest unfinished run, returns True if there may be more to do"""
+        run = await run_in_threadpool(StatementGenerator._claim)
+        if run is None:
+            return await run_in_threadpool(StatementGenerator._start_due_run)
+        run_id, period_start, after_user_id = run
+
+        started = time.perf_counter()
+        batch_size = settings.STATEMENT_BATCH_SIZE
+        statements = await run_in_threadpool(StatementGenerator._fetch, period_start, after_user_id, batch_size)
+        errors = await asyncio.gather(*(self._render(statement) for statement in statements))
+        results = list(zip(statements, errors))
+        done = len(statements) < batch_size
+        if not await run_in_threadpool(StatementGenerator._save, run_id, period_start, after_user_id, results, done):
+            print(f"[STATEMENT] Run {period_start:%Y-%m} moved on meanwhile, dropped batch after User #{after_user_id}")
+            return True
+
+        failed = sum(1 for error in errors if error is not None)
+        for statement, error in results:
+            if error is not None:
+                print(f"[STATEMENT ERROR] User #{statement['user_id']} ({period_start:%Y-%m}): {error}")
+        print(f"[STATEMENT] Run {period_start:%Y-%m}: {len(statements)} statements ({failed} failed) "
+              f"after User #{after_user_id} in {time.perf_counter() - started:.1f}s" + (", done" if done else ""))
+        return True
+
+    @staticmethod
+    def _lookup(user_id: int, period_start: date) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            pdf_url = db.query(CustomerStatement.pdf_url).filter(
+                CustomerStatement.user_id == user_id,
+                CustomerStatement.period_start == period_start
+            ).scalar()
+            if is_storage_key(pdf_url) and get_storage().size(pdf_url) is not None:
+                return {"key": pdf_url}
+            rows = StatementService.aggregate(db, period_start, 0, 1, user_id=user_id)
+            return StatementService.build_statement(rows[0], period_start) if rows else None
+        finally:
+            db.close()
+
+    @staticmethod
+    def _save_statement(period_start: date, statement: Dict[str, Any]):
+        db = SessionLocal()
+        try:
+            StatementService.save_statement(db, period_start, statement)
+        finally:
+            db.close()
+
+    async def get_pdf(self, user_id: int, period_start: date) -> Optional[str]:
+        """Storage key of a user's statement, rendered now if missing
+
+        (Evicted, failed in its run, or the month's run hasn't reached the
+        user yet.) None if the user paid no orders that month.
+        """
+        statement = await run_in_threadpool(StatementGenerator._lookup, user_id, period_start)
+        if statement is None:
+            return None
+        if "html" in statement:
+            await renderer.render(statement["key"], statement["html"])
+            await run_in_threadpool(StatementGenerator._save_statement, period_start, statement)
+        return statement["key"]
+
+
+# Satu generator per proses
+generator = StatementGenerator()
+
+
+async def run_statements() -> bool:
+    """Periodic job: one batch of the current statement run (woken by NOTIFY for manual runs)"""
+    return await generator.run_batch()
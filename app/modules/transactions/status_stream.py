@@ -0,0 +1,202 @@
+"""
+Payment Status Stream for Transaction Module
+Dev 2: Transaction, Billing & Order Engine
+
+Status changes NOTIFY on the payment_status channel in the same
+transaction; every worker's PgListener hands them to an in-process broker
+that pushes them to the SSE streams open for that order. Clients get one
+event per transition instead of polling GET /payments/by-order/{order_id}.
+When the listener reconnects, the broker re-reads the status of every
+streamed order, since NOTIFYs sent while it was down are gone.
+"""
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.notify import notify, notify_many
+from app.modules.transactions.models import Order, OrderStatus, Payment, PaymentStatus
+
+
+PAYMENT_STATUS_CHANNEL = "payment_status"
+
+
+def _status_payload(order_id: int, order_status: Optional[OrderStatus],
+                    payment_status: Optional[PaymentStatus]) -> str:
+    return json.dumps({
+        "order_id": order_id,
+        "order_status": order_status.value if order_status else None,
+        "payment_status": payment_status.value if payment_status else None
+    })
+
+
+def publish_status(db: Session, order_id: int, order_status: Optional[OrderStatus],
+                   payment_status: Optional[PaymentStatus]) -> None:
+    """Queue a status notification on the caller's transaction (delivered on commit)
+
+    Pass None for a status that didn't change.
+    """
+    notify(db, PAYMENT_STATUS_CHANNEL, _status_payload(order_id, order_status, payment_status))
+
+
+def publish_statuses(db: Session,
+                     changes: Iterable[Tuple[int, Optional[OrderStatus], Optional[PaymentStatus]]]) -> None:
+    """publish_status for a batch of (order_id, order_status, payment_status), in one round trip"""
+    notify_many(db, PAYMENT_STATUS_CHANNEL, [_status_payload(*change) for change in changes])
+
+
+class PaymentStatusBroker:
+    """In-process fan-out from the payment_status channel to open streams"""
+
+    QUEUE_SIZE = 16
+
+    def __init__(self):
+        self._subscribers: Dict[int, Set[asyncio.Queue]] = {}
+        self._resync_task: Optional[asyncio.Task] = None
+
+    def subscribe(self, order_id: int) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.QUEUE_SIZE)
+        self._subscribers.setdefault(order_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, order_id: int, queue: asyncio.Queue):
+        queues = self._subscribers.get(order_id)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self._subscribers[order_id]
+
+    def _push(self, event: Dict[str, Any]):
+        for queue in self._subscribers.get(event["order_id"], ()):
+            if queue.full():
+                queue.get_nowait()  # Slow stream: drop the oldest, the newest status matters
+            queue.put_nowait(event)
+
+    def dispatch(self, payload: str):
+        """PgListener callback (runs on the event loop)"""
+        self._push(json.loads(payload))
+
+    def resync(self):
+        """PgListener reconnect callback: push a fresh snapshot to every open stream"""
+        if self._resync_task is None or self._resync_task.done():
+            self._resync_task = asyncio.get_running_loop().create_task(self._resync())
+
+    async def _resync(self):
+        order_ids = list(self._subscribers)
+        if not order_ids:
+            return
+        try:
+            events = await run_in_threadpool(_snapshots, order_ids)
+        except Exception as e:
+            print(f"[PAYMENT-STREAM ERROR] Resync of {len(order_ids)} orders failed: {str(e)}")
+            return
+        for event in events:
+            self._push(event)
+
+    def get_metrics(self) -> Dict[str, int]:
+        return {
+            "orders": len(self._subscribers),
+            "streams": sum(len(queues) for queues in self._subscribers.values())
+        }
+
+
+# Satu broker per proses
+broker = PaymentStatusBroker()
+
+
+def _snapshot(order_id: int) -> Optional[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        order_status = db.query(Order.status).filter(Order.id == order_id).scalar()
+        if order_status is None:
+            return None
+        payment_status = db.query(Payment.status).filter(
+            Payment.order_id == order_id
+        ).order_by(Payment.created_at.desc()).limit(1).scalar()
+        return {
+            "order_id": order_id,
+            "order_status": order_status.value,
+            "payment_status": payment_status.value if payment_status else None
+        }
+    finally:
+        db.close()
+
+
+def _snapshots(order_ids: List[int]) -> List[Dict[str, Any]]:
+    """_snapshot for many orders in two queries"""
+    db = SessionLocal()
+    try:
+        orders = db.query(Order.id, Order.status).filter(Order.id.in_(order_ids)).all()
+        payment_statuses: Dict[int, PaymentStatus] = {}
+        for order_id, payment_status in db.query(Payment.order_id, Payment.status).filter(
+            Payment.order_id.in_(order_ids)
+        ).order_by(Payment.order_id, Payment.created_at.desc()):
+            payment_statuses.setdefault(order_id, payment_status)
+        return [
+            {
+                "order_id": order_id,
+                "order_status": order_status.value,
+                "payment_status": payment_statuses[order_id].value if order_id in payment_statuses else None
+            }
+            for order_id, order_status in orders
+        ]
+    finally:
+        db.close()
+
+
+def _is_final(event: Dict[str, Any]) -> bool:
+    return event["order_status"] != OrderStatus.PENDING.value
+
+
+def _format(event: Dict[str, Any]) -> str:
+    return f"event: payment_status\ndata: {json.dumps(event)}\n\n"
+
+
+async def open_stream(order_id: int) -> Optional[AsyncIterator[str]]:
+    """SSE stream for an order, None if the order doesn't exist
+
+    Subscribes before reading the current status so a transition between
+    the two can't be missed. Sends the current status, then one event per
+    change, and ends once the order leaves PENDING.
+    """
+    queue = broker.subscribe(order_id)
+    try:
+        current = await run_in_threadpool(_snapshot, order_id)
+    except BaseException:
+        broker.unsubscribe(order_id, queue)
+        raise
+    if current is None:
+        broker.unsubscribe(order_id, queue)
+        return None
+
+    async def stream() -> AsyncIterator[str]:
+        last = current
+        deadline = time.monotonic() + settings.PAYMENT_STREAM_MAX_SECONDS
+        try:
+            yield f"retry: 3000\n{_format(last)}"
+            while not _is_final(last) and time.monotonic() < deadline:
+                try:
+                    event = await asyncio.wait_for(queue.get(), settings.PAYMENT_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if settings.PG_LISTEN_ENABLED:
+                        yield ": ping\n\n"
+                        continue
+                    # No NOTIFY fan-out: fall back to one read per heartbeat
+                    event = await run_in_threadpool(_snapshot, order_id) or last
+                # None = unchanged (e.g. an order cancel doesn't touch the payment)
+                event = {**last, **{key: value for key, value in event.items() if value is not None}}
+                if event != last:
+                    last = event
+                    yield _format(last)
+                else:
+                    yield ": ping\n\n"
+        finally:
+            broker.unsubscribe(order_id, queue)
+
+    return stream()
@@ -0,0 +1,49 @@
+"""
+Invoice Storage
+Dev 2: Transaction, Billing & Order Engine
+
+Rendered invoice PDFs are stored by content hash (Invoice.pdf_url holds
+the storage key, not a path) in the backend chosen by
+settings.INVOICE_STORAGE_BACKEND: local (sharded directory) or s3 (any
+S3-compatible object store, MinIO locally).
+"""
+from typing import Optional
+
+from app.core.config import settings
+from app.modules.transactions.storage.base import ChunkReader, InvoiceStorage, is_storage_key
+from app.modules.transactions.storage.local import LocalStorage, verify_download
+from app.modules.transactions.storage.s3 import S3Storage
+
+
+# Satu backend per proses (dibuat saat pertama dipakai)
+_storage: Optional[InvoiceStorage] = None
+
+
+def get_storage() -> InvoiceStorage:
+    """The backend selected by INVOICE_STORAGE_BACKEND"""
+    global _storage
+    if _storage is None:
+        if settings.INVOICE_STORAGE_BACKEND == "local":
+            _storage = LocalStorage(settings.INVOICE_CACHE_DIR)
+        elif settings.INVOICE_STORAGE_BACKEND == "s3":
+            _storage = S3Storage(
+                endpoint_url=settings.INVOICE_S3_ENDPOINT_URL,
+                public_url=settings.INVOICE_S3_PUBLIC_URL,
+                bucket=settings.INVOICE_S3_BUCKET,
+                prefix=settings.INVOICE_S3_PREFIX,
+                region=settings.INVOICE_S3_REGION,
+                access_key=settings.INVOICE_S3_ACCESS_KEY,
+                secret_key=settings.INVOICE_S3_SECRET_KEY,
+                staging_dir=settings.INVOICE_CACHE_DIR,
+            )
+        else:
+            raise ValueError(f"Invoice storage backend '{settings.INVOICE_STORAGE_BACKEND}' is not supported")
+    return _storage
+
+
+def close_storage():
+    if _storage is not None:
+        _storage.close()
+
+
+__all__ = ["ChunkReader", "InvoiceStorage", "get_storage", "close_storage", "is_storage_key", "verify_download"]
@@ -0,0 +1,107 @@
+"""
+Invoice Storage Interface
+Dev 2: Transaction, Billing & Order Engine
+"""
+import re
+from abc import ABC, abstractmethod
+from typing import Callable, Iterator, Optional, Tuple
+
+from starlette.responses import Response
+
+
+# Storage keys are content hashes (invoice_cache.cache_key), e.g. "3fa2...e1.pdf"
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}\.pdf$")
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def is_storage_key(value: Optional[str]) -> bool:
+    """False for anything else in Invoice.pdf_url, e.g. absolute paths stored before the storage backends"""
+    return bool(value and KEY_PATTERN.match(value))
+
+
+def check_key(key: str) -> str:
+    if not is_storage_key(key):
+        raise ValueError(f"Invalid invoice storage key: {key!r}")
+    return key
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single "bytes=" Range, None to send the whole file
+
+    Multiple or malformed ranges are ignored (the full file is a valid
+    answer to those). Raises ValueError when the range can't be satisfied.
+    """
+    match = RANGE_PATTERN.match(header.strip()) if header else None
+    if not match or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    else:
+        # Suffix range: the last N bytes
+        start, end = max(size - int(last), 0), size - 1
+        if int(last) == 0:
+            start = size
+    if start >= size or end < start:
+        raise ValueError(f"Range {header} not satisfiable for {size} bytes")
+    return start, end
+
+
+class ChunkReader:
+    """An opened stored PDF: its size and its bytes in chunks, close() releases it"""
+
+    def __init__(self, size: int, chunks: Iterator[bytes], close: Callable[[], None]):
+        self.size = size
+        self._chunks = chunks
+        self._close = close
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self._chunks
+
+    def read(self) -> Optional[bytes]:
+        """Next chunk, None at the end (convenient with run_in_threadpool)"""
+        return next(self._chunks, None)
+
+    def close(self):
+        self._close()
+
+
+class InvoiceStorage(ABC):
+    """Where rendered invoice PDFs are kept, addressed by storage key
+
+    Methods doing I/O are blocking; async callers use run_in_threadpool.
+    """
+
+    name: str
+
+    @abstractmethod
+    def staging_path(self, key: str) -> str:
+        """Local file the render pool writes the PDF for key to"""
+
+    @abstractmethod
+    def commit(self, key: str, staging_path: str):
+        """Make a rendered staging file available under key"""
+
+    @abstractmethod
+    def size(self, key: str) -> Optional[int]:
+        """Size in bytes, None if nothing is stored under key (marks the file as used)"""
+
+    @abstractmethod
+    def open(self, key: str, chunk_size: int) -> ChunkReader:
+        """Open a stored PDF for reading, FileNotFoundError if it is gone"""
+
+    @abstractmethod
+    def response(self, key: str, filename: str) -> Response:
+        """Download response for a stored PDF (Range requests supported)"""
+
+    @abstractmethod
+    def signed_url(self, key: str, filename: str, expires_in: int) -> str:
+        """Short-lived download URL that needs no other authentication"""
+
+    def evict(self, max_bytes: int) -> Tuple[int, int]:
+        """Trim local files to max_bytes, returns (files removed, bytes freed)"""
+        return 0, 0
+
+    def close(self):
+        """Release connections (app shutdown)"""
@@ -0,0 +1,192 @@
+"""
+Local Disk Invoice Storage
+Dev 2: Transaction, Billing & Order Engine
+
+PDFs live under INVOICE_CACHE_DIR, sharded by the first two bytes of
+their hash (ab/cd/abcd....pdf) so no directory grows past a few thousand
+files. The disk is used as a cache: files are touched when used and the
+least recently used ones evicted past INVOICE_CACHE_MAX_BYTES (evicted
+PDFs are rendered again on their next download).
+"""
+import hashlib
+import hmac
+import os
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+from urllib.parse import quote, urlencode
+
+import anyio
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import settings
+from app.modules.transactions.storage.base import ChunkReader, InvoiceStorage, check_key, parse_range
+
+
+def sign_download(key: str, filename: str, expires: int) -> str:
+    """HMAC for a local signed download URL (GET /invoices/files/{key})"""
+    message = f"{key}:{filename}:{expires}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def verify_download(key: str, filename: str, expires: int, signature: str) -> bool:
+    return expires >= time.time() and hmac.compare_digest(sign_download(key, filename, expires), signature)
+
+
+class LocalFileResponse(Response):
+    """Stored PDF download with single-range support
+
+    With INVOICE_SENDFILE_HEADER set the file is handed to the reverse
+    proxy (nginx X-Accel-Redirect / X-Sendfile), which serves it, ranges
+    included, with sendfile. Otherwise the ASGI zero-copy extension is used
+    when the server offers it, else the file is sent in chunks.
+    """
+
+    chunk_size = 256 * 1024
+
+    def __init__(self, path: Path, relative_path: str, filename: str, media_type: str = "application/pdf"):
+        self.path = path
+        self.relative_path = relative_path
+        self.status_code = 200
+        self.media_type = media_type
+        self.background = None
+        self.init_headers({
+            "content-disposition": f"attachment; filename=\"{filename}\"; filename*=utf-8''{quote(filename)}",
+            "accept-ranges": "bytes",
+        })
+
+    async def _start(self, send: Send, status_code: int, extra_headers: dict):
+        headers = self.raw_headers + [(name.encode(), value.encode()) for name, value in extra_headers.items()]
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if settings.INVOICE_SENDFILE_HEADER:
+            location = (
+                str(self.path) if settings.INVOICE_SENDFILE_HEADER.lower() == "x-sendfile"
+                else settings.INVOICE_SENDFILE_PREFIX + self.relative_path
+            )
+            await self._start(send, 200, {settings.INVOICE_SENDFILE_HEADER: location})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        try:
+            file = await anyio.open_file(self.path, "rb")
+        except FileNotFoundError:
+            await Response("Invoice file not found", status_code=404)(scope, receive, send)
+            return
+
+        async with file:
+            size = os.fstat(file.wrapped.fileno()).st_size
+            try:
+                byte_range = parse_range(Headers(scope=scope).get("range"), size)
+            except ValueError:
+                await self._start(send, 416, {"content-range": f"bytes */{size}", "content-length": "0"})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+            start, end = byte_range or (0, size - 1)
+            length = end - start + 1
+            extra = {"content-length": str(length)}
+            if byte_range:
+                extra["content-range"] = f"bytes {start}-{end}/{size}"
+            await self._start(send, 206 if byte_range else 200, extra)
+
+            if scope["method"] == "HEAD" or length <= 0:
+                await send({"type": "http.response.body", "body": b""})
+            elif "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file.wrapped,
+                    "offset": start,
+                    "count": length,
+                })
+            else:
+                await file.seek(start)
+                remaining = length
+                while remaining:
+                    chunk = await file.read(min(self.chunk_size, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+                if remaining:
+                    # Truncated while sending (evicted and re-rendered): end the body anyway
+                    await send({"type": "http.response.body", "body": b""})
+
+
+class LocalStorage(InvoiceStorage):
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def _relative_path(self, key: str) -> str:
+        check_key(key)
+        return f"{key[:2]}/{key[2:4]}/{key}"
+
+    def path(self, key: str) -> Path:
+        return self.root / self._relative_path(key)
+
+    def staging_path(self, key: str) -> str:
+        # Rendered in place: pdf_worker writes a temp file and renames it
+        path = self.path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return str(path)
+
+    def commit(self, key: str, staging_path: str):
+        pass
+
+    def size(self, key: str) -> Optional[int]:
+        path = self.path(key)
+        try:
+            os.utime(path)
+            return path.stat().st_size
+        except FileNotFoundError:
+            return None
+
+    def open(self, key: str, chunk_size: int) -> ChunkReader:
+        path = self.path(key)
+        file = open(path, "rb")
+        os.utime(path)
+        return ChunkReader(os.fstat(file.fileno()).st_size, iter(lambda: file.read(chunk_size), b""), file.close)
+
+    def response(self, key: str, filename: str) -> Response:
+        return LocalFileResponse(self.path(key), self._relative_path(key), filename)
+
+    def signed_url(self, key: str, filename: str, expires_in: int) -> str:
+        check_key(key)
+        expires = int(time.time()) + expires_in
+        query = urlencode({
+            "filename": filename,
+            "expires": expires,
+            "signature": sign_download(key, filename, expires),
+        })
+        return f"{settings.INVOICE_PUBLIC_BASE_URL}{settings.API_V1_STR}/invoices/files/{key}?{query}"
+
+    def evict(self, max_bytes: int) -> Tuple[int, int]:
+        """Delete least recently used PDFs until the directory fits max_bytes"""
+        entries = []
+        total = 0
+        for path in self.root.glob("*/*/*.pdf"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        removed = freed = 0
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            try:
+                path.unlink()
+                Path(f"{path}.lock").unlink(missing_ok=True)
+            except FileNotFoundError:
+                pass  # Another worker evicted it
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
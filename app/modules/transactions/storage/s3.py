@@ -0,0 +1,203 @@
+"""
+S3-Compatible Invoice Storage
+Dev 2: Transaction, Billing & Order Engine
+
+PDFs are uploaded to a bucket (AWS S3, MinIO, R2, ...) that every app
+node shares. Requests are signed with AWS Signature V4 over the shared
+httpx stack, path-style so MinIO works without bucket DNS. Downloads are
+redirected to a presigned URL: the object store serves the bytes (and
+Range requests) itself. Renders are written to a local staging file and
+uploaded once complete.
+"""
+import hashlib
+import hmac
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+import httpx
+from starlette.responses import RedirectResponse, Response
+
+from app.core.config import settings
+from app.modules.transactions.storage.base import ChunkReader, InvoiceStorage, check_key
+
+ALGORITHM = "AWS4-HMAC-SHA256"
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+
+def _hmac(key: bytes, message: str) -> bytes:
+    return hmac.new(key, message.encode(), hashlib.sha256).digest()
+
+
+def _quote(value: str, safe: str = "") -> str:
+    return quote(value, safe=safe + "-_.~")
+
+
+def _canonical_query(params: Dict[str, str]) -> str:
+    return "&".join(f"{_quote(name)}={_quote(value)}" for name, value in sorted(params.items()))
+
+
+class SigV4Signer:
+    """AWS Signature Version 4 for the s3 service"""
+
+    def __init__(self, access_key: str, secret_key: str, region: str):
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+
+    def _scope(self, amz_date: str) -> str:
+        return f"{amz_date[:8]}/{self.region}/s3/aws4_request"
+
+    def signature(self, method: str, path: str, query: Dict[str, str], headers: Dict[str, str],
+                  payload_hash: str, amz_date: str) -> Tuple[str, str]:
+        """(signed header names, signature); headers are lower-cased and include host"""
+        names = sorted(headers)
+        canonical_request = "\n".join([
+            method,
+            _quote(path, safe="/"),
+            _canonical_query(query),
+            "".join(f"{name}:{headers[name].strip()}\n" for name in names),
+            ";".join(names),
+            payload_hash,
+        ])
+        string_to_sign = "\n".join([
+            ALGORITHM, amz_date, self._scope(amz_date), hashlib.sha256(canonical_request.encode()).hexdigest()
+        ])
+        key = _hmac(f"AWS4{self.secret_key}".encode(), amz_date[:8])
+        for part in (self.region, "s3", "aws4_request"):
+            key = _hmac(key, part)
+        return ";".join(names), hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+
+    def headers(self, method: str, host: str, path: str, payload_hash: str = UNSIGNED_PAYLOAD,
+                now: Optional[datetime] = None) -> Dict[str, str]:
+        """Authorization headers for a request"""
+        amz_date = (now or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+        headers = {"host": host, "x-amz-content-sha256": payload_hash, "x-amz-date": amz_date}
+        signed_headers, signature = self.signature(method, path, {}, headers, payload_hash, amz_date)
+        headers["authorization"] = (
+            f"{ALGORITHM} Credential={self.access_key}/{self._scope(amz_date)}, "
+            f"SignedHeaders={signed_headers}, Signature={signature}"
+        )
+        del headers["host"]  # Sent by httpx
+        return headers
+
+    def presign(self, method: str, host: str, path: str, expires_in: int,
+                params: Optional[Dict[str, str]] = None, now: Optional[datetime] = None) -> str:
+        """Query string of a presigned URL"""
+        amz_date = (now or datetime.now(timezone.utc)).strftime("%Y%m%dT%H%M%SZ")
+        query = {
+            **(params or {}),
+            "X-Amz-Algorithm": ALGORITHM,
+            "X-Amz-Credential": f"{self.access_key}/{self._scope(amz_date)}",
+            "X-Amz-Date": amz_date,
+            "X-Amz-Expires": str(expires_in),
+            "X-Amz-SignedHeaders": "host",
+        }
+        _, signature = self.signature(method, path, query, {"host": host}, UNSIGNED_PAYLOAD, amz_date)
+        return f"{_canonical_query(query)}&X-Amz-Signature={signature}"
+
+
+class S3Storage(InvoiceStorage):
+    name = "s3"
+
+    def __init__(self, endpoint_url: str, public_url: str, bucket: str, prefix: str, region: str,
+                 access_key: str, secret_key: str, staging_dir: str):
+        self.endpoint_url = endpoint_url.rstrip("/")
+        self.public_url = (public_url or endpoint_url).rstrip("/")
+        self.bucket = bucket
+        self.prefix = prefix
+        self.signer = SigV4Signer(access_key, secret_key, region)
+        self.staging_dir = Path(staging_dir) / "staging"
+        self._client: Optional[httpx.Client] = None
+
+    @property
+    def client(self) -> httpx.Client:
+        # Sync client: storage calls run in the threadpool / render callbacks
+        if self._client is None:
+            self._client = httpx.Client(timeout=settings.INVOICE_S3_TIMEOUT_SECONDS)
+        return self._client
+
+    def _object_path(self, key: str) -> str:
+        return f"/{self.bucket}/{self.prefix}{check_key(key)}"
+
+    def _request(self, method: str, key: str, payload_hash: str = UNSIGNED_PAYLOAD, stream: bool = False,
+                 **kwargs) -> httpx.Response:
+        path = self._object_path(key)
+        headers = {
+            **kwargs.pop("headers", {}),
+            **self.signer.headers(method, urlsplit(self.endpoint_url).netloc, path, payload_hash),
+        }
+        request = self.client.build_request(method, f"{self.endpoint_url}{path}", headers=headers, **kwargs)
+        return self.client.send(request, stream=stream)
+
+    def staging_path(self, key: str) -> str:
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        return str(self.staging_dir / check_key(key))
+
+    def commit(self, key: str, staging_path: str):
+        digest = hashlib.sha256()
+        with open(staging_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(chunk)
+            file.seek(0)
+            response = self._request(
+                "PUT", key, digest.hexdigest(), content=file,
+                headers={"content-type": "application/pdf", "content-length": str(os.fstat(file.fileno()).st_size)}
+            )
+        response.raise_for_status()
+        os.remove(staging_path)
+
+    def size(self, key: str) -> Optional[int]:
+        response = self._request("HEAD", key)
+        if response.status_code == 404:
+            return None
+        response.raise_for_status()
+        return int(response.headers["content-length"])
+
+    def open(self, key: str, chunk_size: int) -> ChunkReader:
+        response = self._request("GET", key, stream=True)
+        if response.status_code == 404:
+            response.close()
+            raise FileNotFoundError(key)
+        try:
+            response.raise_for_status()
+        except httpx.HTTPStatusError:
+            response.close()
+            raise
+        return ChunkReader(int(response.headers["content-length"]), response.iter_bytes(chunk_size), response.close)
+
+    def response(self, key: str, filename: str) -> Response:
+        return RedirectResponse(
+            self.signed_url(key, filename, settings.INVOICE_DOWNLOAD_URL_TTL_SECONDS), status_code=307
+        )
+
+    def signed_url(self, key: str, filename: str, expires_in: int) -> str:
+        path = self._object_path(key)
+        query = self.signer.presign("GET", urlsplit(self.public_url).netloc, path, expires_in, {
+            "response-content-disposition": f'attachment; filename="{filename}"',
+            "response-content-type": "application/pdf",
+        })
+        return f"{self.public_url}{_quote(path, safe='/')}?{query}"
+
+    def evict(self, max_bytes: int) -> Tuple[int, int]:
+        """Only staging leftovers are local: drop those of crashed renders and stale lock files"""
+        removed = freed = 0
+        cutoff = time.time() - settings.INVOICE_RENDER_LEASE_SECONDS
+        for path in self.staging_dir.glob("*"):
+            try:
+                stat = path.stat()
+                if stat.st_mtime < cutoff:
+                    path.unlink()
+                    removed += 1
+                    freed += stat.st_size
+            except FileNotFoundError:
+                pass
+        return removed, freed
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
@@ -0,0 +1,139 @@
+"""
+Background Jobs for Transaction Module
+Dev 2: Transaction, Billing & Order Engine
+"""
+from datetime import datetime, timedelta
+
+from app.core import background
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.notify import listener
+from app.modules.transactions import event_handlers  # noqa: F401 (registers outbox handlers)
+from app.modules.transactions.archive import archive_payment_events
+from app.modules.transactions.idempotency import IdempotencyService
+from app.modules.transactions.invoice_cache import evict_invoice_cache
+from app.modules.transactions.invoice_email import send_invoice_emails
+from app.modules.transactions.inbox import WebhookInboxService, INBOX_CHANNEL
+from app.modules.transactions.outbox import OutboxService, OUTBOX_CHANNEL
+from app.modules.transactions.partitioning import maintain_partitions
+from app.modules.transactions.reconciliation import reconcile_payments
+from app.modules.transactions.rendering import render_invoices, renderer as invoice_renderer
+from app.modules.transactions.services import OrderService, INVOICE_EMAIL_CHANNEL, INVOICE_RENDER_CHANNEL
+from app.modules.transactions.statements import STATEMENT_CHANNEL, run_statements
+from app.modules.transactions.status_stream import PAYMENT_STATUS_CHANNEL, broker as payment_status_broker
+
+
+def sweep_expired_orders() -> bool:
+    """Expire one batch of pending orders older than ORDER_PENDING_TTL_MINUTES"""
+    cutoff = datetime.utcnow() - timedelta(minutes=settings.ORDER_PENDING_TTL_MINUTES)
+    db = SessionLocal()
+    try:
+        expired = OrderService.expire_stale_orders(db, cutoff, settings.ORDER_EXPIRY_BATCH_SIZE)
+    finally:
+        db.close()
+
+    if expired:
+        print(f"[ORDER-SWEEPER] Expired {expired} pending orders created before {cutoff.isoformat()}")
+    return expired >= settings.ORDER_EXPIRY_BATCH_SIZE
+
+
+def purge_idempotency_keys() -> bool:
+    """Delete one batch of expired Idempotency-Key records"""
+    db = SessionLocal()
+    try:
+        return IdempotencyService.purge_expired(db) > 0
+    finally:
+        db.close()
+
+
+def purge_outbox_events() -> bool:
+    """Delete one batch of delivered / failed outbox events past OUTBOX_RETENTION_DAYS"""
+    db = SessionLocal()
+    try:
+        return OutboxService.purge_finished(db) > 0
+    finally:
+        db.close()
+
+
+def dispatch_outbox() -> bool:
+    """Deliver one batch of outbox events to their handlers"""
+    return OutboxService.dispatch_batch() >= settings.OUTBOX_BATCH_SIZE
+
+
+def purge_webhook_inbox() -> bool:
+    """Delete one batch of processed / dead-lettered notifications past WEBHOOK_INBOX_RETENTION_DAYS"""
+    db = SessionLocal()
+    try:
+        return WebhookInboxService.purge_finished(db) > 0
+    finally:
+        db.close()
+
+
+async def process_webhook_inbox() -> bool:
+    """Apply one batch of queued gateway notifications"""
+    return await WebhookInboxService.dispatch_batch() >= settings.WEBHOOK_INBOX_BATCH_SIZE
+
+
+def create_future_partitions() -> bool:
+    """Keep PARTITION_MONTHS_AHEAD monthly partitions ready (no-op for heap tables)"""
+    maintain_partitions()
+    return False
+
+
+def register_background_tasks():
+    """Register transaction jobs with the app lifespan"""
+    if settings.ORDER_EXPIRY_SWEEPER_ENABLED:
+        background.register(background.PeriodicTask(
+            "order-sweeper", settings.ORDER_EXPIRY_SWEEP_INTERVAL_SECONDS, sweep_expired_orders
+        ))
+    background.register(background.PeriodicTask(
+        "idempotency-purge", settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS, purge_idempotency_keys
+    ))
+    background.register(background.PeriodicTask(
+        "outbox-purge", settings.OUTBOX_PURGE_INTERVAL_SECONDS, purge_outbox_events
+    ))
+    background.register(background.PeriodicTask(
+        "webhook-inbox-purge", settings.WEBHOOK_INBOX_PURGE_INTERVAL_SECONDS, purge_webhook_inbox
+    ))
+
+    dispatcher = background.register(background.PeriodicTask(
+        "outbox-dispatcher", settings.OUTBOX_POLL_INTERVAL_SECONDS, dispatch_outbox
+    ))
+    inbox = background.register(background.PeriodicTask(
+        "webhook-inbox", settings.WEBHOOK_INBOX_POLL_INTERVAL_SECONDS, process_webhook_inbox
+    ))
+    render = background.register(background.PeriodicTask(
+        "invoice-renderer", settings.INVOICE_RENDER_POLL_INTERVAL_SECONDS, render_invoices
+    ))
+    invoice_renderer.on_slot_free(render.wake)
+    mail = background.register(background.PeriodicTask(
+        "invoice-mailer", settings.INVOICE_EMAIL_POLL_INTERVAL_SECONDS, send_invoice_emails
+    ))
+    statements = background.register(background.PeriodicTask(
+        "statement-runner", settings.STATEMENT_POLL_INTERVAL_SECONDS, run_statements
+    ))
+    if settings.PG_LISTEN_ENABLED:
+        listener.subscribe(OUTBOX_CHANNEL, lambda payload: dispatcher.wake())
+        listener.subscribe(INBOX_CHANNEL, lambda payload: inbox.wake())
+        listener.subscribe(INVOICE_RENDER_CHANNEL, lambda payload: render.wake())
+        listener.subscribe(INVOICE_EMAIL_CHANNEL, lambda payload: mail.wake())
+        listener.subscribe(STATEMENT_CHANNEL, lambda payload: statements.wake())
+        listener.subscribe(PAYMENT_STATUS_CHANNEL, payment_status_broker.dispatch)
+        # Wake-ups missed while the listener was down
+        for task in (dispatcher, inbox, render, mail, statements):
+            listener.on_reconnect(task.wake)
+        listener.on_reconnect(payment_status_broker.resync)
+
+    if settings.PARTITION_MONTHS_AHEAD > 0:
+        background.register(background.PeriodicTask(
+            "partition-maintenance", settings.PARTITION_MAINTENANCE_INTERVAL_SECONDS, create_future_partitions
+        ))
+    background.register(background.PeriodicTask(
+        "invoice-cache-eviction", settings.INVOICE_CACHE_EVICT_INTERVAL_SECONDS, evict_invoice_cache
+    ))
+    background.register(background.PeriodicTask(
+        "payment-event-archiver", settings.PAYMENT_EVENTS_ARCHIVE_INTERVAL_SECONDS, archive_payment_events
+    ))
+    background.register(background.PeriodicTask(
+        "payment-reconciler", settings.RECONCILE_INTERVAL_SECONDS, reconcile_payments
+    ))
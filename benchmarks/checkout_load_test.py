@@ -0,0 +1,120 @@
+"""
+Checkout load test against the local fake payment gateway
+
+Drives the full checkout flow on a running API: create order -> create
+payment link -> (fake gateway settles and posts a signed webhook) -> poll
+until the payment is SUCCESS. Reports per-step latency percentiles,
+end-to-end time to paid and throughput.
+
+Start the fake gateway and the app (pointed at it) first:
+
+    export FAKE_GATEWAY_SECRET=$(openssl rand -hex 16)
+    uvicorn app.modules.transactions.gateways.fake_server:app --port 9000
+    PAYMENT_GATEWAY=fake uvicorn app.main:app --port 8000 --workers 4
+
+    python benchmarks/checkout_load_test.py --checkouts 500 --concurrency 50 \\
+        --user-id 1 --pricing-plan-id 1
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from collections import Counter
+from typing import Dict, List
+
+import httpx
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def checkout(client: httpx.AsyncClient, args, timings: Dict[str, List[float]], errors: Counter):
+    started = time.perf_counter()
+    try:
+        t = time.perf_counter()
+        response = await client.post("/orders", json={
+            "user_id": args.user_id,
+            "pricing_plan_id": args.pricing_plan_id
+        })
+        response.raise_for_status()
+        order_id = response.json()["id"]
+        timings["create_order"].append((time.perf_counter() - t) * 1000)
+
+        t = time.perf_counter()
+        response = await client.post("/payments/create", params={"order_id": order_id})
+        response.raise_for_status()
+        timings["create_payment"].append((time.perf_counter() - t) * 1000)
+
+        deadline = time.perf_counter() + args.paid_timeout
+        while time.perf_counter() < deadline:
+            response = await client.get(f"/payments/by-order/{order_id}")
+            response.raise_for_status()
+            payment_status = response.json()["status"]
+            if payment_status != "pending":
+                break
+            await asyncio.sleep(args.poll_interval)
+        else:
+            errors["paid_timeout"] += 1
+            return
+
+        if payment_status != "success":
+            errors[f"ended_{payment_status}"] += 1
+            return
+        timings["time_to_paid"].append((time.perf_counter() - started) * 1000)
+    except httpx.HTTPStatusError as e:
+        errors[f"http_{e.response.status_code}"] += 1
+    except httpx.HTTPError as e:
+        errors[type(e).__name__] += 1
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Checkout load test with PAYMENT_GATEWAY=fake")
+    parser.add_argument("--api", default="http://localhost:8000/api/v1")
+    parser.add_argument("--gateway", default="http://localhost:9000", help="Fake gateway (for /stats)")
+    parser.add_argument("--checkouts", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--user-id", type=int, default=1)
+    parser.add_argument("--pricing-plan-id", type=int, default=1)
+    parser.add_argument("--poll-interval", type=float, default=0.25)
+    parser.add_argument("--paid-timeout", type=float, default=30.0)
+    args = parser.parse_args()
+
+    timings: Dict[str, List[float]] = {"create_order": [], "create_payment": [], "time_to_paid": []}
+    errors: Counter = Counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with httpx.AsyncClient(
+        base_url=args.api,
+        timeout=30.0,
+        limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    ) as client:
+        async def bounded():
+            async with semaphore:
+                await checkout(client, args, timings, errors)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(bounded() for _ in range(args.checkouts)))
+        elapsed = time.perf_counter() - started
+
+    print(f"{args.checkouts} checkouts, concurrency {args.concurrency}, {elapsed:.1f}s")
+    for step, values in timings.items():
+        if values:
+            print(f"  {step:15s} n={len(values):5d}  p50={percentile(values, 50):8.1f}ms  "
+                  f"p95={percentile(values, 95):8.1f}ms  p99={percentile(values, 99):8.1f}ms  "
+                  f"mean={statistics.mean(values):8.1f}ms")
+    print(f"  paid throughput: {len(timings['time_to_paid']) / elapsed:.1f} checkouts/s")
+    print(f"  errors: {dict(errors) or 'none'}")
+
+    try:
+        async with httpx.AsyncClient(base_url=args.gateway, timeout=5.0) as gateway:
+            print(f"  fake gateway: {(await gateway.get('/stats')).json()}")
+    except httpx.HTTPError:
+        pass
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""
+Invoice email throughput: connection per message vs the reused SMTP pool
+
+Starts an aiosmtpd sink in this process (or uses --host/--port of a
+running one) and sends --messages emails with a PDF-sized attachment,
+once opening a new SMTP connection per message (what a naive
+fastapi-mail send does) and once through app.core.mail.SmtpPool with
+growing pool sizes. Prints messages/sec and connections opened. No
+database needed.
+
+    python benchmarks/invoice_email_bench.py --messages 500 --attachment-kb 60
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from email.message import EmailMessage
+
+import aiosmtplib
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.core.config import settings  # noqa: E402
+from app.core.mail import SmtpPool  # noqa: E402
+
+
+class CountingSink:
+    def __init__(self):
+        self.received = 0
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received += 1
+        return "250 OK"
+
+
+def build_message(index: int, attachment: bytes) -> EmailMessage:
+    message = EmailMessage()
+    message["Subject"] = f"Invoice INV/20261019/{index:05d}"
+    message["From"] = settings.MAIL_FROM
+    message["To"] = f"customer{index}@example.com"
+    message.set_content("Your invoice is attached.")
+    message.add_attachment(attachment, maintype="application", subtype="pdf", filename=f"invoice-{index}.pdf")
+    return message
+
+
+async def per_message(messages, concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def send(message):
+        async with semaphore:
+            await aiosmtplib.send(message, hostname=settings.MAIL_SERVER, port=settings.MAIL_PORT)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(send(message) for message in messages))
+    return time.perf_counter() - started
+
+
+async def pooled(messages, size: int):
+    pool = SmtpPool(size, settings.MAIL_MAX_MESSAGES_PER_CONNECTION)
+    started = time.perf_counter()
+    await asyncio.gather(*(pool.send(message) for message in messages))
+    elapsed = time.perf_counter() - started
+    metrics = pool.get_metrics()
+    await pool.close()
+    return elapsed, metrics["connections_opened"]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="SMTP connection reuse benchmark")
+    parser.add_argument("--messages", type=int, default=300)
+    parser.add_argument("--attachment-kb", type=int, default=60)
+    parser.add_argument("--host", help="Use a running SMTP sink instead of starting one")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+
+    controller = None
+    if args.host:
+        settings.MAIL_SERVER, settings.MAIL_PORT = args.host, args.port
+    else:
+        from aiosmtpd.controller import Controller
+        controller = Controller(CountingSink(), hostname="127.0.0.1", port=args.port)
+        controller.start()
+        settings.MAIL_SERVER, settings.MAIL_PORT = "127.0.0.1", args.port
+    settings.MAIL_USERNAME = ""
+
+    attachment = os.urandom(args.attachment_kb * 1024)
+    messages = [build_message(index, attachment) for index in range(args.messages)]
+    try:
+        elapsed = await per_message(messages, 4)
+        print(f"connection per message (4 concurrent): {args.messages / elapsed:8.1f} msg/s, "
+              f"{args.messages} connections")
+        for size in (1, 2, 4, 8):
+            elapsed, opened = await pooled(messages, size)
+            print(f"pool size {size}:                        {args.messages / elapsed:8.1f} msg/s, "
+                  f"{opened} connections")
+    finally:
+        if controller:
+            controller.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,54 @@
+"""
+Bulk invoice export: time to first byte, throughput and archive check
+
+Streams GET /invoices/export from a running API to a temporary file,
+reporting time to first byte, total time and MB/s, then opens the ZIP and
+checks every entry's CRC and the manifest row count. Watch the server's
+RSS while this runs: it should stay flat however large the range is.
+
+    python benchmarks/invoice_export_bench.py --from 2026-10-01 --to 2026-10-31T23:59:59
+"""
+import argparse
+import csv
+import io
+import tempfile
+import time
+import zipfile
+
+import httpx
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream and verify an invoice ZIP export")
+    parser.add_argument("--api", default="http://localhost:8000/api/v1")
+    parser.add_argument("--from", dest="start", required=True)
+    parser.add_argument("--to", dest="end", required=True)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryFile() as target, httpx.Client(base_url=args.api, timeout=None) as client:
+        started = time.perf_counter()
+        first_byte = None
+        size = 0
+        with client.stream("GET", "/invoices/export", params={"from": args.start, "to": args.end}) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes():
+                if first_byte is None:
+                    first_byte = time.perf_counter() - started
+                target.write(chunk)
+                size += len(chunk)
+        elapsed = time.perf_counter() - started
+
+        target.seek(0)
+        with zipfile.ZipFile(target) as archive:
+            bad = archive.testzip()
+            rows = list(csv.DictReader(io.TextIOWrapper(archive.open("manifest.csv"), encoding="utf-8")))
+            pdfs = len(archive.namelist()) - 1
+
+    left_out = sum(1 for row in rows if row["error"])
+    print(f"{size / 1024 / 1024:.1f} MiB in {elapsed:.2f}s ({size / 1024 / 1024 / elapsed:.1f} MiB/s), "
+          f"first byte after {(first_byte or 0) * 1000:.0f}ms")
+    print(f"  {pdfs} PDFs, {len(rows)} manifest rows, {left_out} left out, corrupt entry: {bad or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
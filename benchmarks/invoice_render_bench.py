@@ -0,0 +1,68 @@
+"""
+Invoice PDF rendering throughput: inline vs process pool
+
+Renders the same invoice HTML (InvoiceService._generate_pdf_html with a
+fake order) inline in this process and through ProcessPoolExecutors of
+growing size, using the renderer's worker function. Prints invoices/sec
+overall and per worker process (~ per core). No database needed.
+
+    python benchmarks/invoice_render_bench.py --invoices 200 --items 5
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.modules.transactions.pdf_worker import render_pdf, warm_up  # noqa: E402
+from app.modules.transactions.services import InvoiceService  # noqa: E402
+
+
+def build_html(items: int) -> str:
+    order = SimpleNamespace(id=12345, user_id=42, created_at=datetime(2026, 10, 19),
+                            total_price=Decimal("150000") * items)
+    order_items = [SimpleNamespace(item_name=f"Website package #{i}", price=Decimal("150000"))
+                   for i in range(items)]
+    return InvoiceService._generate_pdf_html(order, order_items, "INV/20261019/00001")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Invoice PDF render throughput")
+    parser.add_argument("--invoices", type=int, default=100)
+    parser.add_argument("--items", type=int, default=5)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    html = build_html(args.items)
+    out_dir = tempfile.mkdtemp()
+    paths = [os.path.join(out_dir, f"{i}.pdf") for i in range(args.invoices)]
+
+    warm_up()
+    started = time.perf_counter()
+    for path in paths:
+        render_pdf(html, path)
+    inline = args.invoices / (time.perf_counter() - started)
+    print(f"inline      : {inline:7.1f} invoices/s")
+
+    workers = 1
+    while workers <= args.max_workers:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=warm_up) as pool:
+            # Start and warm every process before timing
+            list(pool.map(render_pdf, [html] * workers, paths[:workers]))
+            started = time.perf_counter()
+            list(pool.map(render_pdf, [html] * args.invoices, paths))
+            rate = args.invoices / (time.perf_counter() - started)
+        print(f"pool x{workers:<4d}: {rate:7.1f} invoices/s  ({rate / workers:6.1f} per process)")
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Stress test: concurrent invoice number allocation
+
+Many threads allocate invoice numbers for the same day at once, mixing
+single numbers, preallocated blocks and transactions that roll back.
+Afterwards it checks the committed numbers are unique and gap-free
+(1..N for the day) and prints allocations per second.
+
+Needs a Postgres database with the app tables (uses SessionLocal). Uses a
+far-future day so real sequences are untouched, and removes it afterwards:
+
+    python benchmarks/invoice_sequence_stress.py --threads 32 --allocations 200
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.modules.transactions.models import InvoiceSequence  # noqa: E402
+from app.modules.transactions.services import InvoiceService  # noqa: E402
+
+
+DAY = datetime(2099, 12, 31)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Concurrent invoice number allocation")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--allocations", type=int, default=200, help="Allocations per thread")
+    parser.add_argument("--block-size", type=int, default=20)
+    parser.add_argument("--rollback-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    committed = []
+    lock = threading.Lock()
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        db = SessionLocal()
+        try:
+            for _ in range(args.allocations):
+                if rng.random() < 0.2:
+                    numbers = InvoiceService.allocate_invoice_numbers(db, DAY, args.block_size)
+                else:
+                    numbers = [InvoiceService._generate_invoice_number(db, DAY)]
+                if rng.random() < args.rollback_rate:
+                    db.rollback()
+                    continue
+                db.commit()
+                with lock:
+                    committed.extend(numbers)
+        finally:
+            db.close()
+
+    db = SessionLocal()
+    db.query(InvoiceSequence).filter(InvoiceSequence.day == DAY.date()).delete()
+    db.commit()
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            list(pool.map(worker, range(args.threads)))
+        elapsed = time.perf_counter() - started
+
+        sequences = sorted(int(number.rsplit("/", 1)[1]) for number in committed)
+        last_value = db.query(InvoiceSequence.last_value).filter(InvoiceSequence.day == DAY.date()).scalar()
+        print(f"{args.threads * args.allocations} allocations in {elapsed:.2f}s "
+              f"({args.threads * args.allocations / elapsed:.0f}/s), {len(sequences)} numbers committed")
+        ok = len(set(sequences)) == len(sequences) and sequences == list(range(1, len(sequences) + 1))
+        ok = ok and last_value == len(sequences)
+        print(f"unique + gap-free: {ok} (sequence row at {last_value})")
+        if not ok:
+            sys.exit(1)
+    finally:
+        db.query(InvoiceSequence).filter(InvoiceSequence.day == DAY.date()).delete()
+        db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Invoice storage backend check: store, read, ranges and signed URLs
+
+Runs against the backend configured by the app settings (.env), e.g. the
+MinIO stand-in from docker-compose:
+
+    docker compose --profile s3 up -d minio minio-setup
+    INVOICE_STORAGE_BACKEND=s3 INVOICE_S3_ACCESS_KEY=minioadmin INVOICE_S3_SECRET_KEY=minioadmin \\
+        python benchmarks/invoice_storage_check.py --files 200 --size-kb 80
+
+Stores --files random "PDFs" through staging_path/commit, reads them back
+through open(), fetches a byte range and a full file through a signed
+URL, then prints store / read / signed-download latency percentiles.
+For the local backend signed URLs point at the API (needs it running on
+--api, default http://localhost:8000); use --skip-signed to leave those out.
+"""
+import argparse
+import hashlib
+import os
+import sys
+import time
+from typing import List
+
+import httpx
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.modules.transactions.storage import get_storage  # noqa: E402
+
+
+def percentile(values: List[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))] if ordered else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the configured invoice storage backend")
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--size-kb", type=int, default=80)
+    parser.add_argument("--api", default="http://localhost:8000")
+    parser.add_argument("--skip-signed", action="store_true")
+    args = parser.parse_args()
+
+    storage = get_storage()
+    timings = {"store": [], "read": [], "signed_download": []}
+    failures = 0
+    with httpx.Client(base_url=args.api, timeout=30.0) as client:
+        for _ in range(args.files):
+            body = os.urandom(args.size_kb * 1024)
+            key = f"{hashlib.sha256(body).hexdigest()}.pdf"
+
+            t = time.perf_counter()
+            staging_path = storage.staging_path(key)
+            with open(staging_path, "wb") as file:
+                file.write(body)
+            storage.commit(key, staging_path)
+            timings["store"].append((time.perf_counter() - t) * 1000)
+
+            t = time.perf_counter()
+            reader = storage.open(key, 64 * 1024)
+            try:
+                data = b"".join(reader)
+            finally:
+                reader.close()
+            timings["read"].append((time.perf_counter() - t) * 1000)
+            if data != body or storage.size(key) != len(body):
+                failures += 1
+                continue
+
+            if args.skip_signed:
+                continue
+            url = storage.signed_url(key, "check.pdf", 60)
+            t = time.perf_counter()
+            full = client.get(url)
+            timings["signed_download"].append((time.perf_counter() - t) * 1000)
+            partial = client.get(url, headers={"Range": "bytes=100-199"})
+            if full.content != body or partial.status_code != 206 or partial.content != body[100:200]:
+                failures += 1
+
+    print(f"{storage.name} backend, {args.files} files of {args.size_kb} KiB, {failures} failed checks")
+    for step, values in timings.items():
+        if values:
+            print(f"  {step:16s} p50={percentile(values, 50):7.1f}ms  p95={percentile(values, 95):7.1f}ms  "
+                  f"max={max(values):7.1f}ms")
+    print(f"  evicted (max_bytes=0): {storage.evict(0)}")
+    storage.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Invoice HTML build + PDF conversion for 1 / 10 / 500-item orders
+
+Compares the old f-string builder (string concatenation per item, kept
+here for reference) with the precompiled Jinja2 template, then times the
+xhtml2pdf conversion of the template output. No database needed.
+
+    python benchmarks/invoice_template_bench.py --repeat 200 --pdf-repeat 5
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from decimal import Decimal
+from types import SimpleNamespace
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.modules.transactions.invoice_template import render_invoice_html  # noqa: E402
+from app.modules.transactions.pdf_worker import render_pdf  # noqa: E402
+
+
+def legacy_html(order, items, invoice_number: str) -> str:
+    """The previous InvoiceService._generate_pdf_html (abridged markup, same string building)"""
+    items_html = ""
+    for item in items:
+        items_html += f"""
+            <tr>
+                <td style="padding: 12px; border-bottom: 1px solid #ddd;">{item.item_name}</td>
+                <td style="padding: 12px; border-bottom: 1px solid #ddd; text-align: right;">Rp {float(item.price):,.2f}</td>
+            </tr>
+            """
+    return f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="utf-8">
+            <style>
+                body {{ font-family: Arial, sans-serif; margin: 40px; color: #333; }}
+                .header {{ text-align: center; margin-bottom: 40px; }}
+                .invoice-title {{ font-size: 32px; color: #2563eb; font-weight: bold; }}
+                .invoice-info {{ background: #f8fafc; padding: 20px; border-radius: 8px; margin-bottom: 30px; }}
+                .info-row {{ display: flex; justify-content: space-between; margin: 8px 0; }}
+                table {{ width: 100%; border-collapse: collapse; margin-bottom: 30px; }}
+                th {{ background: #2563eb; color: white; padding: 12px; text-align: left; }}
+                .total {{ font-size: 20px; font-weight: bold; text-align: right; padding: 20px; }}
+                .footer {{ text-align: center; margin-top: 50px; color: #64748b; font-size: 14px; }}
+            </style>
+        </head>
+        <body>
+            <div class="header"><div class="invoice-title">DIGADOIN</div><p>Invoice</p></div>
+            <div class="invoice-info">
+                <div class="info-row"><span><strong>Invoice Number:</strong></span><span>{invoice_number}</span></div>
+                <div class="info-row"><span><strong>Order ID:</strong></span><span>#{order.id}</span></div>
+                <div class="info-row"><span><strong>Date:</strong></span><span>{order.created_at.strftime('%d %B %Y')}</span></div>
+                <div class="info-row"><span><strong>User ID:</strong></span><span>{order.user_id}</span></div>
+            </div>
+            <table>
+                <thead><tr><th>Description</th><th style="text-align: right;">Price</th></tr></thead>
+                <tbody>{items_html}</tbody>
+            </table>
+            <div class="total">Total: Rp {float(order.total_price):,.2f}</div>
+            <div class="footer"><p>Thank you for your purchase!</p><p>For questions, contact support@digadoin.com</p></div>
+        </body>
+        </html>
+        """
+
+
+def fake_order(items: int):
+    order = SimpleNamespace(id=12345, user_id=42, created_at=datetime(2026, 10, 19),
+                            total_price=Decimal("150000") * items)
+    order_items = [SimpleNamespace(item_name=f"Website package #{i}", price=Decimal("150000"))
+                   for i in range(items)]
+    return order, order_items
+
+
+def time_ms(func, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Invoice HTML build and PDF conversion times")
+    parser.add_argument("--sizes", default="1,10,500")
+    parser.add_argument("--repeat", type=int, default=200, help="HTML builds per size")
+    parser.add_argument("--pdf-repeat", type=int, default=5, help="PDF conversions per size")
+    args = parser.parse_args()
+
+    render_invoice_html(*fake_order(1), "INV/20261019/00001")  # Compile the template once
+    out_dir = tempfile.mkdtemp()
+
+    print(f"{'items':>6} {'legacy html':>12} {'template html':>14} {'pdf':>10}")
+    for size in (int(value) for value in args.sizes.split(",")):
+        order, items = fake_order(size)
+        legacy = time_ms(lambda: legacy_html(order, items, "INV/20261019/00001"), args.repeat)
+        template = time_ms(lambda: render_invoice_html(order, items, "INV/20261019/00001"), args.repeat)
+
+        html = render_invoice_html(order, items, "INV/20261019/00001")
+        path = os.path.join(out_dir, f"{size}.pdf")
+        try:
+            pdf = f"{time_ms(lambda: render_pdf(html, path), args.pdf_repeat):8.1f}ms"
+        except Exception as e:
+            pdf = f"n/a ({type(e).__name__})"
+        print(f"{size:>6} {legacy:10.3f}ms {template:12.3f}ms {pdf:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: checkout latency against a local Midtrans Snap stub,
+fresh httpx.AsyncClient per payment (old behaviour) vs the shared
+pooled MidtransClient.
+
+Starts the stub with uvicorn on 127.0.0.1 (plain HTTP, so the saving shown
+is TCP setup only; against the real Snap API every fresh client also pays
+a TLS handshake):
+
+    python benchmarks/midtrans_client_bench.py --requests 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+import uuid
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from app.modules.transactions.midtrans import midtrans_client  # noqa: E402
+
+
+stub = FastAPI()
+
+
+@stub.post("/snap/v1/transactions")
+async def snap_transactions(payload: dict):
+    await asyncio.sleep(float(os.environ.get("STUB_LATENCY_MS", "5")) / 1000)
+    token = uuid.uuid4().hex
+    return {"token": token, "redirect_url": f"https://app.sandbox.midtrans.com/snap/v2/vtweb/{token}"}
+
+
+def start_stub(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def _payload(i: int) -> dict:
+    return {"transaction_details": {"order_id": f"ORDER-{i}", "gross_amount": 150000}}
+
+
+async def fresh_client_checkout(url: str, i: int):
+    async with httpx.AsyncClient() as client:
+        response = await client.post(url, json=_payload(i), timeout=30.0)
+        response.raise_for_status()
+        return response.json()
+
+
+async def pooled_checkout(url: str, i: int):
+    return await midtrans_client.post(url, _payload(i))
+
+
+async def run(name: str, checkout, url: str, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await checkout(url, i)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    print(f"{name:<14} p50={statistics.median(latencies):6.2f}ms "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1]:6.2f}ms "
+          f"throughput={total / elapsed:7.1f} req/s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Midtrans client reuse benchmark")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = start_stub(args.port)
+    url = f"http://127.0.0.1:{args.port}/snap/v1/transactions"
+    try:
+        await run("fresh client", fresh_client_checkout, url, args.requests, args.concurrency)
+        await midtrans_client.start()
+        await run("pooled client", pooled_checkout, url, args.requests, args.concurrency)
+        print(f"pooled metrics: {midtrans_client.get_metrics()}")
+    finally:
+        await midtrans_client.aclose()
+        server.should_exit = True
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,134 @@
+"""
+Benchmark: heap vs monthly-partitioned orders for the reporting queries
+
+Seeds the same synthetic orders into two scratch schemas (bench_heap and
+bench_part), converts bench_part with transactions/partitioning.py and runs
+the real ReportingService queries against both. For every query the SQL is
+captured and re-run with EXPLAIN ANALYZE to report how many partitions the
+planner actually scanned.
+
+Needs a Postgres database with the app tables created (public.orders is
+used as the column template):
+
+    python benchmarks/partitioning_bench.py --rows 5000000 --months 36
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from sqlalchemy import event, text  # noqa: E402
+from sqlalchemy.orm import Session  # noqa: E402
+
+from app.core.database import engine  # noqa: E402
+from app.modules.auth_user import models as auth_models  # noqa: E402,F401
+from app.modules.transactions.partitioning import convert_to_partitioned  # noqa: E402
+from app.modules.transactions.services import ReportingService  # noqa: E402
+
+
+SCHEMAS = ["bench_heap", "bench_part"]
+
+
+def seed(conn, rows: int, months: int):
+    conn.execute(text("CREATE SCHEMA bench_heap"))
+    conn.execute(text("CREATE SCHEMA bench_part"))
+    conn.execute(text("CREATE TABLE bench_heap.orders (LIKE public.orders INCLUDING ALL)"))
+    conn.execute(text(f"""
+        INSERT INTO bench_heap.orders (user_id, subscription_plan_id, status, total_price, created_at, updated_at)
+        SELECT 1 + (g % 50000), 1 + (g % 20),
+               (ARRAY['PAID', 'PAID', 'PAID', 'PENDING', 'CANCELLED', 'EXPIRED'])[1 + g % 6]::orderstatus,
+               (50000 + (g % 40) * 25000)::numeric(12, 2),
+               ts, ts
+        FROM (
+            SELECT g, now() - (random() * interval '{months} months') AS ts
+            FROM generate_series(1, :rows) AS g
+        ) seeded
+    """), {"rows": rows})
+    conn.execute(text("CREATE TABLE bench_part.orders (LIKE bench_heap.orders INCLUDING ALL)"))
+    conn.execute(text("INSERT INTO bench_part.orders SELECT * FROM bench_heap.orders"))
+    conn.execute(text("ANALYZE bench_heap.orders"))
+
+    conn.execute(text("SET LOCAL search_path TO bench_part, public"))
+    convert_to_partitioned(conn, "orders", months_ahead=1)
+
+
+def _scanned_relations(plan: dict, found: set):
+    if "Relation Name" in plan:
+        found.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        _scanned_relations(child, found)
+
+
+def run_query(schema: str, name: str, query, repeat: int) -> dict:
+    with engine.connect() as conn:
+        conn.execute(text(f"SET search_path TO {schema}, public"))
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if not statement.lstrip().upper().startswith(("SET", "EXPLAIN")):
+                statements.append((statement, parameters))
+
+        event.listen(conn, "before_cursor_execute", capture)
+        db = Session(bind=conn)
+        timings = []
+        for _ in range(repeat):
+            statements.clear()
+            started = time.perf_counter()
+            query(db)
+            timings.append((time.perf_counter() - started) * 1000)
+        event.remove(conn, "before_cursor_execute", capture)
+
+        scanned = set()
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql(f"EXPLAIN (ANALYZE, FORMAT JSON) {statement}", parameters).scalar()
+            _scanned_relations(plan[0]["Plan"], scanned)
+        db.close()
+
+    return {"query": name, "median_ms": statistics.median(timings), "relations": len(scanned)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Heap vs partitioned orders reporting benchmark")
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--months", type=int, default=36)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="Keep the bench schemas afterwards")
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    last_quarter = now - timedelta(days=90)
+    queries = [
+        ("revenue_by_day (last 90 days)",
+         lambda db: ReportingService.get_revenue_by_period(db, last_quarter, now, "day")),
+        ("revenue_by_month (all time)",
+         lambda db: ReportingService.get_revenue_by_period(db, group_by="month")),
+        ("conversion_rate (last 90 days)",
+         lambda db: ReportingService.get_conversion_rate(db, last_quarter, now)),
+        ("dashboard_metrics", ReportingService.get_dashboard_metrics),
+    ]
+
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        seed(conn, args.rows, args.months)
+    print(f"Seeded {args.rows} orders over {args.months} months in {time.perf_counter() - started:.1f}s")
+
+    try:
+        print(f"{'query':<34}{'heap ms':>10}{'part ms':>10}{'heap rels':>11}{'part rels':>11}")
+        for name, query in queries:
+            heap = run_query("bench_heap", name, query, args.repeat)
+            part = run_query("bench_part", name, query, args.repeat)
+            print(f"{name:<34}{heap['median_ms']:>10.1f}{part['median_ms']:>10.1f}"
+                  f"{heap['relations']:>11}{part['relations']:>11}")
+    finally:
+        if not args.keep:
+            with engine.begin() as conn:
+                for schema in SCHEMAS:
+                    conn.execute(text(f"DROP SCHEMA IF EXISTS {schema} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
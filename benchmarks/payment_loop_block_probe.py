@@ -0,0 +1,111 @@
+"""
+Event-loop block probe for PaymentService.create_payment_link
+
+Runs many concurrent payment-link creations while a probe coroutine wakes
+every few milliseconds and records how late it was. Every SQL statement is
+slowed down artificially (--query-delay-ms) and the gateway is an in-process
+httpx.MockTransport, so any lag above the budget means DB work ran on the
+event loop. Exits with status 1 when the budget is exceeded.
+
+Uses a throwaway SQLite file, no Postgres needed:
+
+    python benchmarks/payment_loop_block_probe.py --payments 50 --budget-ms 50
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import httpx  # noqa: E402
+from sqlalchemy import create_engine, event  # noqa: E402
+from sqlalchemy.dialects.postgresql import JSONB  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.database import Base  # noqa: E402
+from app.modules.auth_user import models as auth_models  # noqa: E402,F401
+from app.modules.transactions.midtrans import midtrans_client  # noqa: E402
+from app.modules.transactions.models import Order, OrderStatus  # noqa: E402
+from app.modules.transactions.services import PaymentService  # noqa: E402
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+async def probe(stop: asyncio.Event, interval: float, lags: list):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + interval
+        await asyncio.sleep(interval)
+        lags.append((loop.time() - expected) * 1000)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Event-loop block probe for payment creation")
+    parser.add_argument("--payments", type=int, default=50)
+    parser.add_argument("--query-delay-ms", type=float, default=20.0)
+    parser.add_argument("--gateway-latency-ms", type=float, default=30.0)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), "probe.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 60})
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine)
+
+    with SessionLocal() as db:
+        db.add_all([
+            Order(user_id=1, subscription_plan_id=1, status=OrderStatus.PENDING, total_price=Decimal("150000"))
+            for _ in range(args.payments)
+        ])
+        db.commit()
+        order_ids = [order.id for order in db.query(Order).all()]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def slow_query(conn, cursor, statement, parameters, context, executemany):
+        time.sleep(args.query_delay_ms / 1000)
+
+    async def snap(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(args.gateway_latency_ms / 1000)
+        token = f"tok-{time.perf_counter_ns()}"
+        return httpx.Response(200, json={"token": token, "redirect_url": f"https://snap.test/{token}"})
+
+    midtrans_client._client = httpx.AsyncClient(transport=httpx.MockTransport(snap))
+
+    async def create(order_id: int):
+        db = SessionLocal()
+        try:
+            return await PaymentService.create_payment_link(db, order_id, "http://localhost:8000")
+        finally:
+            db.close()
+
+    lags: list = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(stop, 0.005, lags))
+    started = time.perf_counter()
+    results = await asyncio.gather(*(create(order_id) for order_id in order_ids))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+    await midtrans_client.aclose()
+
+    created = sum(1 for result in results if result and result["transaction_id"])
+    worst = max(lags) if lags else 0.0
+    print(f"created {created}/{len(order_ids)} payment links in {elapsed:.2f}s")
+    print(f"event loop lag: max={worst:.1f}ms p50={sorted(lags)[len(lags) // 2]:.1f}ms samples={len(lags)} "
+          f"(budget {args.budget_ms}ms)")
+    if worst > args.budget_ms:
+        print("FAIL: event loop was blocked longer than the budget")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
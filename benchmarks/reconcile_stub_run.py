@@ -0,0 +1,140 @@
+"""
+Payment reconciliation against a local Midtrans status-API stub
+
+Starts a stub Midtrans with uvicorn: Snap /snap/v1/transactions and
+/v2/{order_id}/status (random settlement / expire / still-pending /
+not-found answers plus latency; ids it never issued get HTTP 404). Creates
+stale pending payments in a throwaway SQLite file through the Midtrans
+gateway's create_charge, so they store what the real code stores, then
+runs PaymentReconciler.reconcile with the pooled client. Prints the report
+and checks it against the seeded answers.
+
+    python benchmarks/reconcile_stub_run.py --payments 500 --concurrency 20
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+from sqlalchemy import create_engine, update  # noqa: E402
+from sqlalchemy.dialects.postgresql import JSONB  # noqa: E402
+from sqlalchemy.ext.compiler import compiles  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import Base  # noqa: E402
+from app.modules.auth_user import models as auth_models  # noqa: E402,F401
+from app.modules.transactions import outbox, reconciliation, status_stream  # noqa: E402
+from app.modules.transactions.gateways import get_gateway  # noqa: E402
+from app.modules.transactions.midtrans import midtrans_client  # noqa: E402
+from app.modules.transactions.models import Order, OrderStatus, Payment, PaymentGateway  # noqa: E402
+from app.modules.transactions.services import PaymentService  # noqa: E402
+
+
+@compiles(JSONB, "sqlite")
+def _jsonb_on_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+
+ANSWERS = ["settlement", "expire", "pending", "not_found"]
+answers = {}
+unknown_lookups = []
+stub = FastAPI()
+
+
+@stub.post("/snap/v1/transactions")
+async def create_transaction(request: Request):
+    order_id = (await request.json())["transaction_details"]["order_id"]
+    answers[order_id] = random.choice(ANSWERS)
+    token = uuid.uuid4().hex
+    return {"token": token, "redirect_url": f"https://app.sandbox.midtrans.com/snap/v2/vtweb/{token}"}
+
+
+@stub.get("/v2/{order_id}/status")
+async def transaction_status(order_id: str):
+    await asyncio.sleep(random.uniform(0.01, 0.05))
+    if order_id not in answers:
+        # Like Midtrans for anything that isn't an order_id / transaction_id (e.g. a Snap token)
+        unknown_lookups.append(order_id)
+        return JSONResponse({"status_code": "404", "status_message": "Transaction doesn't exist."}, status_code=404)
+    answer = answers[order_id]
+    if answer == "not_found":
+        return JSONResponse({"status_code": "404", "status_message": "Transaction doesn't exist."})
+    return {"transaction_id": str(uuid.uuid4()), "order_id": order_id, "transaction_status": answer,
+            "status_code": "200"}
+
+
+def start_stub(port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(stub, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Reconciliation run against a stub gateway")
+    parser.add_argument("--payments", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    engine = create_engine(f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'reconcile.db')}",
+                           connect_args={"check_same_thread": False, "timeout": 60})
+    Base.metadata.create_all(engine)
+    reconciliation.SessionLocal = sessionmaker(bind=engine)
+    # pg_notify is Postgres-only
+    outbox.notify = lambda db, channel, payload="": None
+    status_stream.notify = lambda db, channel, payload="": None
+    # pg_try_advisory_lock is Postgres-only too; a single process needs no pass lock
+    reconciliation.PaymentReconciler._acquire_lock = staticmethod(lambda: engine.connect())
+    reconciliation.PaymentReconciler._release_lock = staticmethod(lambda conn: conn.close())
+
+    server = start_stub(args.port)
+    settings.MIDTRANS_PAYMENT_URL = f"http://127.0.0.1:{args.port}/snap/v1/transactions"
+    settings.MIDTRANS_STATUS_URL = f"http://127.0.0.1:{args.port}/v2/{{transaction_id}}/status"
+
+    gateway = get_gateway(PaymentGateway.MIDTRANS)
+    stale = datetime.utcnow() - timedelta(hours=2)
+    try:
+        with reconciliation.SessionLocal() as db:
+            for _ in range(args.payments):
+                order = Order(user_id=1, subscription_plan_id=1, status=OrderStatus.PENDING,
+                              total_price=Decimal("150000"), created_at=stale)
+                db.add(order)
+                db.commit()
+                charge = await gateway.create_charge(order.id, order.total_price, 1, "http://localhost/finish")
+                PaymentService._save_payment(db, order.id, order.total_price, gateway.gateway, charge)
+            db.execute(update(Payment).values(created_at=stale))
+            db.commit()
+
+        report = await reconciliation.PaymentReconciler.reconcile(concurrency=args.concurrency)
+    finally:
+        await midtrans_client.aclose()
+        server.should_exit = True
+
+    expected_changed = sum(1 for answer in answers.values() if answer in ("settlement", "expire"))
+    print(f"report: {report}")
+    print(f"expected changed: {expected_changed}, unknown ids looked up: {len(unknown_lookups)}, "
+          f"client: {midtrans_client.get_metrics()}")
+    if (report["checked"] != args.payments or report["changed"] != expected_changed or report["errors"]
+            or unknown_lookups):
+        print("FAIL")
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
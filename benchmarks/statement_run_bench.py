@@ -0,0 +1,130 @@
+"""
+Monthly statement run: grouped aggregation and end-to-end throughput
+
+Against the configured database (.env). Optionally seeds --seed-users
+users with --orders-per-user paid orders in --period, then
+
+  1. walks every user of the period with the run's grouped query
+     (StatementService.aggregate, STATEMENT_BATCH_SIZE users per query)
+     and compares it with one query per user for the first --naive-users,
+  2. with --run, processes the period's statement run batch by batch
+     through the render pool and prints its progress and time. --stop-after N
+     stops after N batches; run again to see it resume from the cursor.
+
+    python benchmarks/statement_run_bench.py --period 2026-09 --seed-users 20000 --run
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.core.config import settings  # noqa: E402
+from app.core.database import SessionLocal  # noqa: E402
+from app.modules.auth_user.models import User  # noqa: E402
+from app.modules.transactions.models import Order, OrderStatus, SubscriptionPlan  # noqa: E402
+from app.modules.transactions.rendering import renderer  # noqa: E402
+from app.modules.transactions.statements import StatementService, generator, parse_period  # noqa: E402
+
+
+def seed(period_start, users: int, orders_per_user: int):
+    db = SessionLocal()
+    try:
+        plan_id = db.query(SubscriptionPlan.id).limit(1).scalar()
+        if plan_id is None:
+            raise SystemExit("Seeding needs at least one subscription plan")
+        tag = int(time.time())
+        for offset in range(0, users, 1000):
+            batch = [{"name": f"Statement Bench {tag}-{i}", "email": f"statement-bench-{tag}-{i}@example.com",
+                      "password": "x"} for i in range(offset, min(offset + 1000, users))]
+            user_ids = db.execute(User.__table__.insert().returning(User.__table__.c.id), batch).scalars().all()
+            db.execute(Order.__table__.insert(), [{
+                "user_id": user_id,
+                "subscription_plan_id": plan_id,
+                "status": OrderStatus.PAID,
+                "total_price": Decimal("150000") + index,
+                "created_at": datetime.combine(period_start, datetime.min.time()) + timedelta(days=index % 27),
+                "paid_at": datetime.combine(period_start, datetime.min.time()) + timedelta(days=index % 27, hours=1),
+            } for user_id in user_ids for index in range(orders_per_user)])
+            db.commit()
+        print(f"seeded {users} users x {orders_per_user} paid orders")
+    finally:
+        db.close()
+
+
+def aggregation(period_start, naive_users: int):
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        users, queries, after_user_id, first_ids = 0, 0, 0, []
+        while True:
+            rows = StatementService.aggregate(db, period_start, after_user_id, settings.STATEMENT_BATCH_SIZE)
+            queries += 1
+            if not rows:
+                break
+            users += len(rows)
+            first_ids.extend(row.user_id for row in rows[:max(0, naive_users - len(first_ids))])
+            after_user_id = rows[-1].user_id
+        grouped = time.perf_counter() - started
+        print(f"grouped query : {users} users in {grouped:.2f}s over {queries} queries "
+              f"({users / grouped if grouped else 0:8.0f} users/s)")
+
+        started = time.perf_counter()
+        for user_id in first_ids:
+            StatementService.aggregate(db, period_start, 0, 1, user_id=user_id)
+        naive = time.perf_counter() - started
+        if first_ids:
+            print(f"query per user: {len(first_ids)} users in {naive:.2f}s "
+                  f"({len(first_ids) / naive:8.0f} users/s)")
+    finally:
+        db.close()
+
+
+async def run(period_start, stop_after: int):
+    settings.STATEMENT_AUTO_RUN = False  # Only the benchmarked period
+    db = SessionLocal()
+    try:
+        print(f"run before: {StatementService.start_run(db, period_start)}")
+    finally:
+        db.close()
+    started = time.perf_counter()
+    batches = 0
+    while await generator.run_batch():
+        batches += 1
+        if stop_after and batches >= stop_after:
+            break
+    elapsed = time.perf_counter() - started
+    db = SessionLocal()
+    try:
+        progress = StatementService.get_run(db, period_start)
+    finally:
+        db.close()
+    print(f"run after : {progress}")
+    print(f"{batches} batches in {elapsed:.1f}s, render pool: {await renderer.get_metrics()}")
+    await renderer.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Monthly statement run benchmark")
+    parser.add_argument("--period", required=True, help="Finished month, YYYY-MM")
+    parser.add_argument("--seed-users", type=int, default=0)
+    parser.add_argument("--orders-per-user", type=int, default=3)
+    parser.add_argument("--naive-users", type=int, default=500)
+    parser.add_argument("--run", action="store_true")
+    parser.add_argument("--stop-after", type=int, default=0, help="Batches to process before stopping (0: all)")
+    args = parser.parse_args()
+
+    period_start = parse_period(args.period)
+    if args.seed_users:
+        seed(period_start, args.seed_users, args.orders_per_user)
+    aggregation(period_start, args.naive_users)
+    if args.run:
+        asyncio.run(run(period_start, args.stop_after))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Stress test: parallel duplicate Midtrans notifications
+
+Creates a throwaway order + pending payment, then from many threads at
+once (a) posts the same settlement notification into the webhook inbox and
+(b) calls PaymentService.handle_webhook directly, like concurrent inbox
+workers / reconciliation would. Afterwards it checks that:
+
+- the inbox stored the notification once
+- the payment is SUCCESS and the order PAID
+- exactly one order.paid outbox event was published
+
+Needs a Postgres database with the app tables (uses SessionLocal):
+
+    python benchmarks/webhook_dedupe_stress.py --threads 32 --rounds 5
+"""
+import argparse
+import os
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from app.core.database import SessionLocal  # noqa: E402
+from app.modules.auth_user.models import User  # noqa: E402
+from app.modules.transactions.gateways import get_gateway  # noqa: E402
+from app.modules.transactions.inbox import WebhookInboxService  # noqa: E402
+from app.modules.transactions.models import (  # noqa: E402
+    Order, OrderStatus, OutboxEvent, Payment, PaymentEvent, PaymentGateway, PaymentStatus,
+    PricingPlan, SubscriptionPlan, WebhookInbox
+)
+from app.modules.transactions.outbox import ORDER_PAID  # noqa: E402
+from app.modules.transactions.services import PaymentService  # noqa: E402
+
+
+def seed(db, tag: str):
+    user = User(name="stress", email=f"stress-{tag}@example.com", password="x")
+    plan = PricingPlan(name=f"stress-{tag}", price=Decimal("150000"))
+    db.add_all([user, plan])
+    db.flush()
+    subscription = SubscriptionPlan(pricing_plan_id=plan.id)
+    db.add(subscription)
+    db.flush()
+    order = Order(user_id=user.id, subscription_plan_id=subscription.id,
+                  status=OrderStatus.PENDING, total_price=Decimal("150000"))
+    db.add(order)
+    db.flush()
+    payment = Payment(order_id=order.id, transaction_id=f"ORDER-{order.id}-{tag}",
+                      amount=order.total_price, status=PaymentStatus.PENDING)
+    db.add(payment)
+    db.commit()
+    return user.id, plan.id, subscription.id, order.id, payment.id
+
+
+def cleanup(db, user_id, plan_id, subscription_id, order_id, payment_id, transaction_id):
+    db.query(OutboxEvent).filter(OutboxEvent.aggregate_id == order_id).delete()
+    db.query(PaymentEvent).filter(PaymentEvent.payment_id == payment_id).delete()
+    db.query(WebhookInbox).filter(WebhookInbox.transaction_id == transaction_id).delete()
+    db.query(Payment).filter(Payment.id == payment_id).delete()
+    db.query(Order).filter(Order.id == order_id).delete()
+    db.query(SubscriptionPlan).filter(SubscriptionPlan.id == subscription_id).delete()
+    db.query(PricingPlan).filter(PricingPlan.id == plan_id).delete()
+    db.query(User).filter(User.id == user_id).delete()
+    db.commit()
+
+
+def run_round(threads: int) -> bool:
+    tag = uuid.uuid4().hex[:12]
+    db = SessionLocal()
+    ids = seed(db, tag)
+    user_id, plan_id, subscription_id, order_id, payment_id = ids
+    transaction_id = f"ORDER-{order_id}-{tag}"  # The order_id sent to Snap
+    notification = {
+        "transaction_id": f"stress-{tag}",
+        "order_id": transaction_id,
+        "transaction_status": "settlement",
+        "status_code": "200",
+        "gross_amount": "150000.00",
+    }
+
+    parsed = get_gateway(PaymentGateway.MIDTRANS).parse_notification(notification)
+
+    def deliver(i: int):
+        session = SessionLocal()
+        try:
+            if i % 2:
+                return WebhookInboxService.receive(session, PaymentGateway.MIDTRANS, parsed)
+            return PaymentService.handle_webhook(session, notification)
+        finally:
+            session.close()
+
+    try:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(deliver, range(threads * 2)))
+
+        db.expire_all()
+        inbox_rows = db.query(WebhookInbox).filter(WebhookInbox.transaction_id == transaction_id).count()
+        paid_events = db.query(OutboxEvent).filter(
+            OutboxEvent.aggregate_id == order_id, OutboxEvent.event_type == ORDER_PAID
+        ).count()
+        order_status = db.query(Order.status).filter(Order.id == order_id).scalar()
+        payment_status = db.query(Payment.status).filter(Payment.id == payment_id).scalar()
+
+        ok = inbox_rows == 1 and paid_events == 1 and order_status == OrderStatus.PAID \
+            and payment_status == PaymentStatus.SUCCESS
+        print(f"{'OK  ' if ok else 'FAIL'} inbox_rows={inbox_rows} order_paid_events={paid_events} "
+              f"order={order_status.value} payment={payment_status.value}")
+        return ok
+    finally:
+        cleanup(db, *ids, transaction_id)
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel duplicate webhook stress test")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    results = [run_round(args.threads) for _ in range(args.rounds)]
+    if not all(results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,15 @@
+"""
+Unit tests run without a database: the settings only need placeholder
+connection values (the engine is created lazily and never connects).
+"""
+import os
+
+for name, value in {
+    "DB_USER": "test",
+    "DB_PASSWORD": "test",
+    "DB_SERVER": "localhost",
+    "DB_PORT": "5432",
+    "DB_NAME": "test",
+    "SECRET_KEY": "test",
+}.items():
+    os.environ.setdefault(name, value)
@@ -0,0 +1,81 @@
+"""
+Tests for the job queue helpers in app/core/background.py: lease claims
+and retry backoff
+"""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import Column, DateTime, Integer, String, create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, declarative_base
+
+from app.core.background import claim_due, retry_at
+
+
+Base = declarative_base()
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    status = Column(String(10), nullable=False, default="PENDING")
+    attempts = Column(Integer, nullable=False, default=0)
+    available_at = Column(DateTime, nullable=False)
+
+
+def _claim(batch_size: int = 10, **kwargs):
+    return claim_due(
+        Job, Job.id, Job.status, "PENDING", Job.available_at, Job.attempts, batch_size, 60, **kwargs
+    ).returning(Job.id, Job.attempts)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        now = datetime.utcnow()
+        session.add_all([
+            Job(id=1, available_at=now - timedelta(seconds=5)),
+            Job(id=2, available_at=now - timedelta(seconds=5)),
+            Job(id=3, available_at=now + timedelta(hours=1)),
+            Job(id=4, status="DONE", available_at=now - timedelta(seconds=5)),
+        ])
+        session.commit()
+        yield session
+
+
+def test_claim_leases_due_pending_rows(db):
+    claimed = db.execute(_claim()).all()
+    assert sorted(claimed) == [(1, 1), (2, 1)]
+    # Leased: not due again until the lease runs out
+    assert db.execute(_claim()).all() == []
+    assert db.get(Job, 1).available_at > datetime.utcnow() + timedelta(seconds=50)
+
+
+def test_claim_respects_batch_size_order_and_filters(db):
+    assert db.execute(_claim(batch_size=1, order_by=[Job.id.desc()])).all() == [(2, 1)]
+    assert db.execute(_claim(where=[Job.id != 1])).all() == []
+    assert db.execute(_claim()).all() == [(1, 1)]
+
+
+def test_claim_skips_rows_locked_by_other_workers():
+    sql = str(_claim().compile(dialect=postgresql.dialect()))
+    assert "FOR UPDATE SKIP LOCKED" in sql
+
+
+def test_retry_backs_off_exponentially_up_to_an_hour():
+    def delay(attempts, **kwargs):
+        return (retry_at(attempts, 100, **kwargs) - datetime.utcnow()).total_seconds()
+
+    assert delay(1) == pytest.approx(10, abs=1)
+    assert delay(3) == pytest.approx(40, abs=1)
+    assert delay(2, base_seconds=30) == pytest.approx(120, abs=1)
+    assert delay(20) == pytest.approx(3600, abs=1)
+
+
+def test_no_retry_once_out_of_attempts():
+    assert retry_at(4, 5) is not None
+    assert retry_at(5, 5) is None
+    assert retry_at(6, 5) is None
@@ -0,0 +1,287 @@
+"""
+Tests for app/core/resilience.py: circuit breaker, retry budget and the
+outbound call policy (retries, deadline, cancellation)
+"""
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core.resilience import CircuitBreaker, CircuitOpenError, OutboundPolicy, RetryBudget
+
+
+def _elapse(breaker: CircuitBreaker):
+    """Pretend the recovery period has passed"""
+    breaker.opened_at -= breaker.recovery_seconds
+
+
+def _status_error(code: int) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://gateway.test/status")
+    return httpx.HTTPStatusError("error", request=request, response=httpx.Response(code, request=request))
+
+
+def _policy(**kwargs) -> OutboundPolicy:
+    options = {"timeout": 1.0, "max_retries": 2, "base_delay": 0.0, "failure_threshold": 100}
+    options.update(kwargs)
+    return OutboundPolicy("test", **options)
+
+
+class Endpoint:
+    """Fake endpoint: raises the queued errors in order, then returns "ok" """
+
+    def __init__(self, *errors: Exception):
+        self.errors = list(errors)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return "ok"
+
+
+# ---------- CircuitBreaker ----------
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=3, recovery_seconds=30)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError) as error:
+        breaker.before_call()
+    assert error.value.retry_in > 0
+
+
+def test_breaker_success_resets_failure_count():
+    breaker = CircuitBreaker("test", failure_threshold=2, recovery_seconds=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 1
+
+
+def test_breaker_half_open_allows_a_single_trial():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_seconds=30)
+    breaker.record_failure()
+    _elapse(breaker)
+
+    breaker.before_call()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    breaker.before_call()
+
+
+def test_breaker_failed_trial_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=5, recovery_seconds=30)
+    for _ in range(5):
+        breaker.record_failure()
+    _elapse(breaker)
+
+    breaker.before_call()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+
+def test_breaker_release_frees_the_trial_without_an_outcome():
+    breaker = CircuitBreaker("test", failure_threshold=1, recovery_seconds=30)
+    breaker.record_failure()
+    _elapse(breaker)
+    breaker.before_call()
+
+    breaker.release()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.failures == 1
+    breaker.before_call()
+
+
+def test_breaker_reports_state_changes():
+    changes = []
+    breaker = CircuitBreaker("test", 1, 30, lambda name, previous, state: changes.append((previous, state)))
+    breaker.record_failure()
+    _elapse(breaker)
+    breaker.before_call()
+    breaker.record_success()
+    assert changes == [("closed", "open"), ("open", "half_open"), ("half_open", "closed")]
+
+
+# ---------- RetryBudget ----------
+
+def test_budget_starts_full_and_runs_out():
+    budget = RetryBudget(ratio=0.5, max_tokens=2)
+    assert budget.withdraw()
+    assert budget.withdraw()
+    assert not budget.withdraw()
+
+
+def test_budget_refills_by_ratio_up_to_the_cap():
+    budget = RetryBudget(ratio=0.5, max_tokens=2)
+    budget.tokens = 0
+    budget.deposit()
+    assert not budget.withdraw()
+    budget.deposit()
+    assert budget.withdraw()
+
+    for _ in range(10):
+        budget.deposit()
+    assert budget.tokens == 2
+
+
+# ---------- OutboundPolicy.call ----------
+
+@pytest.mark.asyncio
+async def test_call_returns_the_result():
+    policy = _policy()
+    assert await policy.call(Endpoint()) == "ok"
+    assert policy.metrics["successes"] == 1
+    assert policy.metrics["retries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_idempotent_call_retries_transient_errors():
+    policy = _policy()
+    endpoint = Endpoint(httpx.ReadTimeout("slow"), _status_error(503))
+    assert await policy.call(endpoint, idempotent=True) == "ok"
+    assert endpoint.calls == 3
+    assert policy.metrics["retries"] == 2
+
+
+@pytest.mark.asyncio
+async def test_retries_stop_after_max_retries():
+    policy = _policy(max_retries=1)
+    endpoint = Endpoint(_status_error(502), _status_error(502), _status_error(502))
+    with pytest.raises(httpx.HTTPStatusError):
+        await policy.call(endpoint, idempotent=True)
+    assert endpoint.calls == 2
+    assert policy.metrics["failures"] == 1
+
+
+@pytest.mark.asyncio
+async def test_non_idempotent_call_is_not_retried_once_sent():
+    policy = _policy()
+    endpoint = Endpoint(httpx.ReadTimeout("slow"))
+    with pytest.raises(httpx.ReadTimeout):
+        await policy.call(endpoint)
+    assert endpoint.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_non_idempotent_call_is_retried_when_never_sent():
+    policy = _policy()
+    endpoint = Endpoint(httpx.ConnectError("refused"), httpx.PoolTimeout("pool"))
+    assert await policy.call(endpoint) == "ok"
+    assert endpoint.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_non_transient_error_is_not_retried_nor_counted():
+    policy = _policy(failure_threshold=1)
+    endpoint = Endpoint(_status_error(400))
+    with pytest.raises(httpx.HTTPStatusError):
+        await policy.call(endpoint, idempotent=True)
+    assert endpoint.calls == 1
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+    assert policy.breaker.failures == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_is_transient():
+    policy = _policy()
+    endpoint = Endpoint(_status_error(429))
+    assert await policy.call(endpoint, idempotent=True) == "ok"
+    assert endpoint.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_stops_retries():
+    policy = _policy(retry_budget_ratio=0.0, retry_budget_max=1.0)
+    first = Endpoint(_status_error(503))
+    assert await policy.call(first, idempotent=True) == "ok"
+
+    second = Endpoint(_status_error(503))
+    with pytest.raises(httpx.HTTPStatusError):
+        await policy.call(second, idempotent=True)
+    assert second.calls == 1
+    assert policy.metrics["budget_exhausted"] == 1
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_rejects_without_calling():
+    policy = _policy(failure_threshold=1, max_retries=0)
+    with pytest.raises(httpx.ConnectError):
+        await policy.call(Endpoint(httpx.ConnectError("refused")))
+
+    endpoint = Endpoint()
+    with pytest.raises(CircuitOpenError):
+        await policy.call(endpoint)
+    assert endpoint.calls == 0
+    assert policy.metrics["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_timeout_is_one_deadline_for_all_attempts():
+    policy = _policy(timeout=0.05)
+    attempts = 0
+
+    async def hang():
+        nonlocal attempts
+        attempts += 1
+        await asyncio.sleep(1)
+
+    started = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        await policy.call(hang, idempotent=True)
+    assert time.monotonic() - started < 0.15
+    assert attempts == 1
+    assert policy.metrics["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_no_backoff_sleep_past_the_deadline():
+    policy = _policy(timeout=0.05, base_delay=10.0, max_delay=10.0)
+    policy._backoff = lambda attempt: 10.0
+    endpoint = Endpoint(httpx.ConnectError("refused"))
+
+    started = time.monotonic()
+    with pytest.raises(httpx.ConnectError):
+        await policy.call(endpoint)
+    assert time.monotonic() - started < 0.05
+    assert endpoint.calls == 1
+    assert policy.metrics["retries"] == 0
+
+
+@pytest.mark.asyncio
+async def test_cancelled_half_open_trial_releases_the_slot():
+    policy = _policy(failure_threshold=1, max_retries=0)
+    with pytest.raises(httpx.ConnectError):
+        await policy.call(Endpoint(httpx.ConnectError("refused")))
+    _elapse(policy.breaker)
+
+    started = asyncio.Event()
+
+    async def hang():
+        started.set()
+        await asyncio.sleep(10)
+
+    trial = asyncio.create_task(policy.call(hang))
+    await started.wait()
+    trial.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await trial
+
+    assert policy.breaker.state == CircuitBreaker.HALF_OPEN
+    assert policy.breaker.failures == 1
+    assert await policy.call(Endpoint()) == "ok"
+    assert policy.breaker.state == CircuitBreaker.CLOSED
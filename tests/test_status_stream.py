@@ -0,0 +1,76 @@
+"""
+Tests for the payment status broker: NOTIFY fan-out and the resync after
+a listener reconnect
+"""
+import json
+
+import pytest
+
+from app.modules.transactions import status_stream
+from app.modules.transactions.status_stream import PaymentStatusBroker
+
+
+def _event(order_id: int, order_status: str = "pending", payment_status: str = "pending"):
+    return {"order_id": order_id, "order_status": order_status, "payment_status": payment_status}
+
+
+def test_dispatch_reaches_only_that_orders_streams():
+    broker = PaymentStatusBroker()
+    first, other = broker.subscribe(1), broker.subscribe(2)
+    broker.dispatch(json.dumps(_event(1, "paid", "success")))
+    assert first.get_nowait() == _event(1, "paid", "success")
+    assert other.empty()
+
+
+def test_slow_stream_keeps_the_newest_status():
+    broker = PaymentStatusBroker()
+    queue = broker.subscribe(1)
+    for _ in range(PaymentStatusBroker.QUEUE_SIZE):
+        broker.dispatch(json.dumps(_event(1)))
+    broker.dispatch(json.dumps(_event(1, "paid", "success")))
+    assert queue.qsize() == PaymentStatusBroker.QUEUE_SIZE
+    while queue.qsize() > 1:
+        queue.get_nowait()
+    assert queue.get_nowait() == _event(1, "paid", "success")
+
+
+def test_unsubscribe_drops_empty_orders():
+    broker = PaymentStatusBroker()
+    queue = broker.subscribe(1)
+    broker.unsubscribe(1, queue)
+    broker.unsubscribe(1, queue)
+    assert broker.get_metrics() == {"orders": 0, "streams": 0}
+
+
+@pytest.mark.asyncio
+async def test_resync_pushes_a_fresh_snapshot_to_every_stream(monkeypatch):
+    read = []
+
+    def snapshots(order_ids):
+        read.append(sorted(order_ids))
+        return [_event(order_id, "paid", "success") for order_id in order_ids]
+
+    monkeypatch.setattr(status_stream, "_snapshots", snapshots)
+    broker = PaymentStatusBroker()
+    first, second, other = broker.subscribe(1), broker.subscribe(1), broker.subscribe(2)
+
+    broker.resync()
+    broker.resync()  # Already running: no second read
+    await broker._resync_task
+    assert read == [[1, 2]]
+    assert first.get_nowait() == second.get_nowait() == _event(1, "paid", "success")
+    assert other.get_nowait() == _event(2, "paid", "success")
+
+
+@pytest.mark.asyncio
+async def test_failed_resync_leaves_streams_open(monkeypatch):
+    def snapshots(order_ids):
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(status_stream, "_snapshots", snapshots)
+    broker = PaymentStatusBroker()
+    queue = broker.subscribe(1)
+    broker.resync()
+    await broker._resync_task
+    assert queue.empty()
+    assert broker.get_metrics() == {"orders": 1, "streams": 1}
@@ -0,0 +1,57 @@
+"""
+Tests for StatusTransitions: allowed order / payment status changes
+"""
+import pytest
+
+from app.modules.transactions.models import Order, OrderStatus, Payment, PaymentStatus
+from app.modules.transactions.services import StatusTransitions
+
+
+@pytest.mark.parametrize("target", [OrderStatus.PAID, OrderStatus.CANCELLED, OrderStatus.EXPIRED])
+def test_pending_order_moves_to_a_final_status(target):
+    order = Order(id=1, status=OrderStatus.PENDING)
+    assert StatusTransitions.apply_order(order, target)
+    assert order.status == target
+
+
+def test_paid_order_gets_paid_at():
+    order = Order(id=1, status=OrderStatus.PENDING)
+    StatusTransitions.apply_order(order, OrderStatus.PAID)
+    assert order.paid_at is not None
+
+
+def test_paid_order_can_only_be_refunded():
+    order = Order(id=1, status=OrderStatus.PAID)
+    assert not StatusTransitions.apply_order(order, OrderStatus.EXPIRED)
+    assert not StatusTransitions.apply_order(order, OrderStatus.PAID)
+    assert order.status == OrderStatus.PAID
+    assert StatusTransitions.apply_order(order, OrderStatus.REFUNDED)
+
+
+@pytest.mark.parametrize("status", [OrderStatus.EXPIRED, OrderStatus.CANCELLED, OrderStatus.REFUNDED])
+def test_closed_order_is_never_paid(status):
+    order = Order(id=1, status=status)
+    assert not StatusTransitions.apply_order(order, OrderStatus.PAID)
+    assert order.status == status
+    assert order.paid_at is None
+
+
+def test_pending_payment_succeeds_once():
+    payment = Payment(id=1, status=PaymentStatus.PENDING)
+    assert StatusTransitions.apply_payment(payment, PaymentStatus.SUCCESS)
+    assert payment.paid_at is not None
+    # Duplicate notification: no change
+    assert not StatusTransitions.apply_payment(payment, PaymentStatus.SUCCESS)
+
+
+@pytest.mark.parametrize("status", [PaymentStatus.SUCCESS, PaymentStatus.FAILED, PaymentStatus.CANCELLED])
+def test_final_payment_status_is_kept(status):
+    payment = Payment(id=1, status=status)
+    for target in PaymentStatus:
+        assert not StatusTransitions.apply_payment(payment, target)
+    assert payment.status == status
+
+
+def test_every_status_has_a_transition_entry():
+    assert set(StatusTransitions.ORDER) == set(OrderStatus)
+    assert set(StatusTransitions.PAYMENT) == set(PaymentStatus)
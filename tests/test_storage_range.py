@@ -0,0 +1,39 @@
+"""
+Tests for the invoice storage helpers: Range header parsing and key checks
+"""
+import pytest
+
+from app.modules.transactions.storage.base import check_key, is_storage_key, parse_range
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=100-", (100, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=990-2000", (990, 999)),
+    ("bytes=-5000", (0, 999)),
+    (" bytes=0-0 ", (0, 0)),
+])
+def test_single_range(header, expected):
+    assert parse_range(header, 1000) == expected
+
+
+@pytest.mark.parametrize("header", [None, "", "bytes=-", "bytes=0-1,5-9", "items=0-9", "bytes=a-b"])
+def test_whole_file_for_missing_or_unsupported_ranges(header):
+    assert parse_range(header, 1000) is None
+
+
+@pytest.mark.parametrize("header", ["bytes=1000-", "bytes=1000-1100", "bytes=10-5", "bytes=-0"])
+def test_unsatisfiable_range(header):
+    with pytest.raises(ValueError):
+        parse_range(header, 1000)
+
+
+def test_storage_keys():
+    key = "a" * 64 + ".pdf"
+    assert is_storage_key(key)
+    assert check_key(key) == key
+    for value in [None, "", "/var/invoices/INV-1.pdf", "../" + key, "A" * 64 + ".pdf"]:
+        assert not is_storage_key(value)
+    with pytest.raises(ValueError):
+        check_key("../etc/passwd")